@@ -0,0 +1,171 @@
+"""Measure prompt size, build time and time-to-first-token for the context builder.
+
+Builds the daily briefing context from a large synthetic inbox (10k messages
+by default, with promotions, reply threads and a few important messages past
+the first ten) three ways:
+
+    all      every item, as if nothing were cut off
+    slice    the old approach: first 10 emails / 15 events / 10 tasks
+    builder  utils.context_builder ranked, filtered and packed to the budget
+
+and reports tokens, build time, how many important messages made it into the
+prompt, and time-to-first-token of a streamed completion. The stub gateway
+charges --prefill-us-per-token per prompt token, like model prefill; pass
+--live to stream against API_GATEWAY_URL instead.
+
+Usage:
+    python benchmarks/context_builder.py [--messages 10000] [--prefill-us-per-token 150]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import stub_gateway  # noqa: E402
+
+IMPORTANT_SENDER = "@work.example.com"
+PROMO_SENDERS = ["deals@shop.example", "newsletter@news.example", "noreply@social.example"]
+
+
+def synthetic_inbox(messages: int, events: int, tasks: int, seed: int = 7) -> dict:
+    """Messages newest first; important ones are scattered so slicing misses most of them."""
+    rng = random.Random(seed)
+    now = datetime.now().astimezone()
+    inbox = []
+    for i in range(messages):
+        kind = rng.random()
+        received = now - timedelta(seconds=rng.uniform(0, 86400))
+        if kind < 0.35:
+            sender = rng.choice(PROMO_SENDERS)
+            subject = f"{rng.randint(10, 70)}% off everything - sale ends soon #{i}"
+        elif kind < 0.353:
+            sender = f"lead{i % 5}{IMPORTANT_SENDER}"
+            subject = f"Action required: contract review #{i}"
+        else:
+            sender = f"person{i % 400}@mail.example"
+            subject = ("Re: " if kind < 0.6 else "") + f"Weekend plans {i % 900}"
+        inbox.append({
+            "id": f"m{i}", "subject": subject, "sender": sender,
+            "snippet": "Lorem ipsum dolor sit amet " * 3, "received_at": received.isoformat(),
+            "important": IMPORTANT_SENDER in sender,
+        })
+    inbox.sort(key=lambda m: m["received_at"], reverse=True)
+
+    start = now.replace(minute=0, second=0, microsecond=0)
+    calendar = [
+        {"id": f"e{i}", "title": f"Meeting {i}",
+         "start": (start + timedelta(hours=rng.uniform(-4, 168))).isoformat(),
+         "end": (start + timedelta(hours=rng.uniform(-3, 169))).isoformat()}
+        for i in range(events)
+    ]
+    calendar.sort(key=lambda e: e["start"])
+    todo = [
+        {"id": f"t{i}", "title": f"Task {i}", "list_name": "Work",
+         "due": (now + timedelta(days=rng.uniform(-3, 14))).isoformat() if i % 3 else None}
+        for i in range(tasks)
+    ]
+    return {"messages": inbox, "events": calendar, "tasks": todo}
+
+
+def naive_context(data: dict, limit: int | None) -> str:
+    """The scripts' old hand-assembled context; ``limit=None`` includes everything."""
+    events, messages, tasks = data["events"], data["messages"], data["tasks"]
+    parts = [
+        "CALENDAR:\n" + "\n".join(f"- {e['title']} at {e['start']}" for e in events[:limit]),
+        f"EMAILS (last 24h, {len(messages)} total):\n"
+        + "\n".join(f"- {m['subject']} (from {m['sender']})" for m in messages[:limit]),
+        f"TASKS (due today, {len(tasks)} total):\n"
+        + "\n".join(f"- {t['title']} [{t['list_name']}]" for t in tasks[:limit]),
+    ]
+    return "\n\n".join(parts)
+
+
+def builder_context(data: dict, config: dict) -> str:
+    from utils.context_builder import ContextBuilder
+
+    builder = ContextBuilder.from_config(config)
+    builder.add_events(data["events"], "CALENDAR")
+    builder.add_emails(data["messages"], "EMAILS (last 24h)")
+    builder.add_tasks(data["tasks"], "TASKS (due today)")
+    return builder.build()
+
+
+def median_ms(fn, runs: int) -> tuple[float, object]:
+    samples, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def time_to_first_token(client, prompt: str, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        stream = client.ai_chat_stream(
+            [{"role": "user", "content": prompt}], max_sentences=1, cache=False
+        )
+        stream.read()
+        samples.append(stream.time_to_first_token)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=300)
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--token-budget", type=int, default=1500)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prefill-us-per-token", type=float, default=150.0)
+    parser.add_argument("--live", action="store_true", help="stream against API_GATEWAY_URL")
+    args = parser.parse_args()
+
+    from utils.context_builder import ContextRules
+    from utils.gateway import GatewayClient
+
+    config = {
+        "context": {"token_budget": args.token_budget, "important_senders": [IMPORTANT_SENDER]}
+    }
+    rules = ContextRules.from_config(config)
+    data = synthetic_inbox(args.messages, args.events, args.tasks)
+    important = [m for m in data["messages"] if m["important"]]
+
+    server = None
+    if not args.live:
+        settings = stub_gateway.StubSettings(prefill_us_per_token=args.prefill_us_per_token)
+        server, os.environ["API_GATEWAY_URL"] = stub_gateway.start(settings=settings)
+
+    print(
+        f"{len(data['messages'])} messages ({len(important)} important), "
+        f"{len(data['events'])} events, {len(data['tasks'])} tasks; budget {args.token_budget} tokens"
+    )
+    print(f"{'variant':<10} {'tokens':>8} {'build ms':>9} {'important':>10} {'ttft ms':>9}")
+    try:
+        with GatewayClient() as client:
+            for name, build in (
+                ("all", lambda: naive_context(data, None)),
+                ("slice", lambda: naive_context(data, 10)),
+                ("builder", lambda: builder_context(data, config)),
+            ):
+                build_ms, prompt = median_ms(build, args.runs)
+                found = sum(1 for m in important if m["subject"] in prompt)
+                ttft = time_to_first_token(client, prompt, args.runs)
+                print(
+                    f"{name:<10} {rules.tokens(prompt):>8} {build_ms:>9.1f} "
+                    f"{found:>4}/{len(important):<5} {ttft:>9.1f}"
+                )
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Measure gateway requests/sec with and without a shared, pooled client.
+
+"per-run client" opens a new GatewayClient (and connection) for every call,
+as each automation did with its own ``with GatewayClient()`` block;
+"shared client" reuses utils.gateway.get_client() and its keep-alive pool.
+Runs against a local stub gateway, so it measures client-side connection
+overhead only (each new client also builds an SSL context); TLS handshakes to
+the real gateway widen the gap further.
+
+Usage:
+    python benchmarks/gateway_pool.py [--requests 500] [--threads 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import stub_gateway  # noqa: E402
+
+
+def per_run_call() -> None:
+    from utils.gateway import GatewayClient
+
+    with GatewayClient() as client:
+        client.health()
+
+
+def shared_call() -> None:
+    from utils.gateway import get_client
+
+    get_client({}).health()
+
+
+def bench(call, requests: int, threads: int) -> float:
+    start = time.perf_counter()
+    if threads == 1:
+        for _ in range(requests):
+            call()
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for future in [pool.submit(call) for _ in range(requests)]:
+                future.result()
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    server, url = stub_gateway.start()
+    os.environ["API_GATEWAY_URL"] = url
+    try:
+        shared_call()  # warm up imports and the pool
+        for threads in sorted({1, args.threads}):
+            per_run = bench(per_run_call, args.requests, threads)
+            shared = bench(shared_call, args.requests, threads)
+            print(
+                f"{threads} thread(s): per-run client {per_run:8.0f} req/s, "
+                f"shared client {shared:8.0f} req/s ({shared / per_run:.1f}x)"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
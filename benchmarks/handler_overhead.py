@@ -0,0 +1,70 @@
+"""Measure per-request module loading overhead in the triggered handler.
+
+Compares re-executing the automation file on every request (the old
+behaviour, load_automation) with the startup module cache (get_automation).
+
+Usage:
+    python benchmarks/handler_overhead.py [--requests 2000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from triggered import handler  # noqa: E402
+
+SCRIPT = '''"""
+---
+name: bench-echo
+type: triggered
+path: /bench
+enabled: true
+---
+"""
+
+import json
+import datetime
+
+from utils import GatewayClient
+
+
+def main(payload=None):
+    return {"echo": payload}
+'''
+
+
+def bench(fn, file_path: str, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn(file_path).main({"n": 1})
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        script = Path(tmp) / "bench_echo.py"
+        script.write_text(SCRIPT)
+        file_path = str(script)
+
+        before = bench(handler.load_automation, file_path, args.requests)
+        handler.get_automation(file_path)
+        after = bench(handler.get_automation, file_path, args.requests)
+
+        handler.RELOAD_MODULES = True
+        reload_check = bench(handler.get_automation, file_path, args.requests)
+
+    print(f"per-request load (before):        {before:9.1f} us")
+    print(f"per-request cached (after):       {after:9.1f} us")
+    print(f"per-request cached + mtime check: {reload_check:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Compare buffered vs streamed decoding of a large /email/recent response.
+
+Starts the stub gateway in a subprocess (so its own allocations don't count)
+with --messages inbox entries, then finds the first --stop-after "relevant"
+messages three ways:
+
+    get        get_email_recent(): buffer and decode the whole body, then scan
+    iter       iter_email_recent(): parse items as they arrive, stop early
+    iter-all   iter_email_recent() read to the end (e.g. to count everything)
+
+and reports wall time, time to the first relevant item, and peak Python heap
+(tracemalloc, measured in a separate pass). Pass --page-size to have the stub
+paginate with page tokens; get_email_recent() only reads the first page.
+
+Usage:
+    python benchmarks/json_stream.py [--messages 50000] [--stop-after 5] [--page-size 0]
+"""
+
+import argparse
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx  # noqa: E402
+
+
+def relevant(message) -> bool:
+    # Roughly one message in 500 matters to the hypothetical caller
+    return message["subject"].endswith("499")
+
+
+def start_stub(messages: int, page_size: int) -> tuple[subprocess.Popen, str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [
+            sys.executable, str(Path(__file__).parent / "stub_gateway.py"),
+            "--port", str(port), "--items", str(messages), "--page-size", str(page_size),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            httpx.get(f"{url}/health", timeout=1).raise_for_status()
+            return process, url
+        except httpx.HTTPError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError("stub gateway did not start")
+            time.sleep(0.1)
+
+
+def scan(variant: str, client, stop_after: int) -> tuple[int, float | None]:
+    found, seen, first = 0, 0, None
+    start = time.perf_counter()
+    if variant == "get":
+        messages = client.get_email_recent(hours=24)["messages"]
+    else:
+        messages = client.iter_email_recent(hours=24)
+    for message in messages:
+        seen += 1
+        if relevant(message):
+            found += 1
+            first = first or time.perf_counter() - start
+            if found >= stop_after and variant != "iter-all":
+                break
+    return seen, first
+
+
+def run(variant: str, client, stop_after: int) -> dict:
+    # tracemalloc slows every allocation down, so time and memory are separate passes
+    start = time.perf_counter()
+    seen, first = scan(variant, client, stop_after)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    scan(variant, client, stop_after)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"ms": elapsed * 1000, "first_ms": (first or elapsed) * 1000, "peak": peak, "seen": seen}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--stop-after", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=0)
+    args = parser.parse_args()
+
+    from utils.gateway import GatewayClient
+
+    process, url = start_stub(args.messages, args.page_size)
+    print(
+        f"{args.messages} messages, stop after {args.stop_after} relevant, "
+        f"page size {args.page_size or 'unpaginated'}"
+    )
+    print(f"{'variant':<9} {'total ms':>9} {'first ms':>9} {'peak MB':>8} {'parsed':>8}")
+    try:
+        with GatewayClient(base_url=url) as client:
+            client.health()  # Open the connection outside the measurements
+            for variant in ("get", "iter", "iter-all"):
+                result = run(variant, client, args.stop_after)
+                print(
+                    f"{variant:<9} {result['ms']:>9.1f} {result['first_ms']:>9.1f} "
+                    f"{result['peak'] / 1e6:>8.1f} {result['seen']:>8}"
+                )
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
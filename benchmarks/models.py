@@ -0,0 +1,112 @@
+"""Measure parse time and retained memory of gateway list payloads: dicts vs projected models.
+
+Builds a synthetic /email/recent response (10k messages by default, with the
+bodies, headers and label lists a real inbox payload carries) and decodes it
+several ways:
+
+    json          json.loads into dicts (what response.json() does)
+    orjson        orjson.loads into dicts, if installed
+    models        utils.models.loads + projection to EmailMessage(--fields)
+
+For each it reports the median decode time and the memory still held by the
+result once the raw bytes and intermediate dicts are dropped (tracemalloc).
+
+Usage:
+    python benchmarks/models.py [--messages 10000] [--fields subject,sender]
+"""
+
+import argparse
+import gc
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import models  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def synthetic_payload(messages: int, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    now = datetime.now().astimezone()
+    inbox = []
+    for i in range(messages):
+        sender = f"person{i % 400}@mail.example"
+        inbox.append({
+            "id": f"m{i:08d}",
+            "thread_id": f"t{i // 3:08d}",
+            "subject": f"Weekend plans {i % 900} - {rng.choice(['lunch', 'hike', 'call'])}",
+            "sender": sender,
+            "to": ["me@example.com"],
+            "cc": [f"person{(i + k) % 400}@mail.example" for k in range(rng.randint(0, 3))],
+            "snippet": "Lorem ipsum dolor sit amet, consectetur adipiscing elit " * 2,
+            "body": "Sed ut perspiciatis unde omnis iste natus error sit voluptatem. " * 12,
+            "received_at": (now - timedelta(seconds=rng.uniform(0, 86400))).isoformat(),
+            "labels": ["INBOX", "UNREAD"] + (["IMPORTANT"] if i % 7 == 0 else []),
+            "category": rng.choice(["primary", "updates", "forums"]),
+            "headers": {"message-id": f"<{i}@mail.example>", "list-id": None, "x-priority": "3"},
+            "size_estimate": rng.randint(2000, 40000),
+        })
+    return json.dumps({"messages": inbox, "count": len(inbox)}).encode()
+
+
+def measure(decode, raw: bytes, runs: int) -> tuple[float, int]:
+    """Median decode time (ms) and bytes retained by the decoded result."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = decode(raw)
+        samples.append(time.perf_counter() - start)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result = decode(raw)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return statistics.median(samples) * 1000, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--fields", default="subject,sender", help="comma-separated model fields")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    fields = tuple(f.strip() for f in args.fields.split(",") if f.strip())
+    raw = synthetic_payload(args.messages)
+    variants = [("json", json.loads)]
+    if orjson is not None:
+        variants.append(("orjson", orjson.loads))
+    variants.append((
+        "models",
+        lambda raw: models.project_response(models.loads(raw), "messages", fields),
+    ))
+
+    print(
+        f"{args.messages} messages, {len(raw) / 1e6:.1f} MB payload; "
+        f"models keep {', '.join(fields)} (decoder: {models.loads.__module__})"
+    )
+    print(f"{'variant':<8} {'parse ms':>9} {'retained MB':>12} {'bytes/item':>11}")
+    for name, decode in variants:
+        parse_ms, retained = measure(decode, raw, args.runs)
+        print(
+            f"{name:<8} {parse_ms:>9.1f} {retained / 1e6:>12.1f} "
+            f"{retained / max(args.messages, 1):>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
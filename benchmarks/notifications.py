@@ -0,0 +1,92 @@
+"""Count /notify requests for a notification burst, sent directly vs coalesced.
+
+Several threads (standing in for automations finishing together, or a
+webhook burst on the triggered service) each send notifications over a short
+burst: a handful of titles, some repeated messages, and a few urgent ones.
+The same burst is sent through a client without notification rules (every
+notify() is a request) and with utils.notifications coalescing, and the
+report shows /notify requests, duplicates dropped and the longest any
+notification was held back.
+
+Usage:
+    python benchmarks/notifications.py [--threads 8] [--per-thread 25] [--window 2]
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import stub_gateway  # noqa: E402
+
+TITLES = ["Email alert", "Build", "Calendar change", "Task due", "Webhook"]
+
+
+def burst(client, threads: int, per_thread: int, burst_ms: float, seed: int) -> float:
+    """Send the burst from ``threads`` threads; returns wall seconds until all were submitted."""
+
+    def worker(index: int):
+        rng = random.Random(seed + index)
+        for i in range(per_thread):
+            # Every fourth message repeats an earlier one, as retried webhooks do
+            n = rng.randrange(max(i, 1)) if i % 4 == 3 else i
+            title = TITLES[(index + n) % len(TITLES)]
+            priority = 1 if rng.random() < 0.05 else 0
+            client.notify(title, f"{title} #{index}-{n}", priority=priority)
+            time.sleep(rng.uniform(0, 2 * burst_ms / per_thread) / 1000)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=25)
+    parser.add_argument("--burst-ms", type=float, default=1000.0)
+    parser.add_argument("--window", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stub delay per request")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from utils.gateway import GatewayClient
+    from utils.notifications import NotificationRules
+
+    settings = stub_gateway.StubSettings(latency_ms=args.latency_ms)
+    server, url = stub_gateway.start(settings=settings)
+    total = args.threads * args.per_thread
+    print(
+        f"{total} notifications from {args.threads} threads over {args.burst_ms:.0f} ms; "
+        f"window {args.window}s, max batch {args.max_batch}"
+    )
+    print(f"{'variant':<10} {'requests':>9} {'duplicates':>11} {'max wait s':>11} {'submit s':>9}")
+    try:
+        for name, rules in (
+            ("direct", None),
+            ("coalesced", NotificationRules(window=args.window, max_batch=args.max_batch)),
+        ):
+            before = server.requests
+            with GatewayClient(base_url=url, notifications=rules) as client:
+                submit = burst(client, args.threads, args.per_thread, args.burst_ms, args.seed)
+            stats = client.notifier.stats if client.notifier else None
+            print(
+                f"{name:<10} {server.requests - before:>9} "
+                f"{stats.duplicates if stats else 0:>11} "
+                f"{stats.max_wait_seconds if stats else 0:>11.2f} {submit:>9.2f}"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
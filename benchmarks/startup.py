@@ -0,0 +1,105 @@
+"""Measure the import cost of a Cloud Run Job execution end to end and enforce a budget.
+
+Runs ``python -X importtime runner.py <script>`` in a fresh interpreter against
+the stub gateway, so everything the execution imports counts: runner.py,
+utils.script, the script module and whatever its main() imports lazily. It
+subtracts what the bare interpreter imports at boot, reports the slowest
+imports and the wall time of the whole run, and exits non-zero if the import
+total exceeds the budget or a deploy/scheduler-only module gets imported.
+
+Usage:
+    python benchmarks/startup.py [--script scheduled/daily_context.py] [--budget-ms 500]
+        [--runs 5] [--top 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import stub_gateway  # noqa: E402
+
+ROOT = Path(__file__).parent.parent
+
+# Modules a job execution must never import
+FORBIDDEN = ("google.cloud", "utils.scheduler", "flask")
+
+
+def import_times(*args: str, env: dict | None = None) -> tuple[dict[str, int], float]:
+    """Run ``python -X importtime <args>``; return cumulative microseconds per imported
+    module (nested names keep their indentation) and the run's wall time in ms."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        sys.exit(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level after the separator
+        modules[name[1:].rstrip()] = int(cumulative)
+    return modules, elapsed
+
+
+def measure(script: str, env: dict) -> tuple[float, float, dict[str, int]]:
+    """Return import ms attributable to the job (excluding interpreter boot), wall ms of
+    the run, and per-module import times."""
+    boot, _ = import_times("-c", "pass")
+    run, wall = import_times("runner.py", script, env=env)
+    modules = {name: us for name, us in run.items() if name not in boot}
+    top_level = {name: us for name, us in modules.items() if not name.startswith(" ")}
+    return sum(top_level.values()) / 1000, wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--script", default="scheduled/daily_context.py")
+    parser.add_argument("--budget-ms", type=float, default=500.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    server, url = stub_gateway.start()
+    env = {**os.environ, "API_GATEWAY_URL": url}
+    totals, walls = [], []
+    modules = {}
+    for _ in range(args.runs):
+        total, wall, modules = measure(args.script, env)
+        totals.append(total)
+        walls.append(wall)
+    server.shutdown()
+
+    median = statistics.median(totals)
+    print(f"{args.script} imports: median {median:.1f} ms over {args.runs} runs "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}), budget {args.budget_ms:.0f} ms")
+    print(f"end-to-end run: median {statistics.median(walls):.1f} ms wall "
+          f"(min {min(walls):.1f}, max {max(walls):.1f})")
+    print("\nslowest imports (cumulative):")
+    for name, us in sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name.strip()}")
+
+    forbidden = sorted(name.strip() for name in modules if name.strip().startswith(FORBIDDEN))
+    if forbidden:
+        print(f"\nFAIL: job startup imports {', '.join(forbidden)}")
+        sys.exit(1)
+    if median > args.budget_ms:
+        print(f"\nFAIL: startup exceeds budget by {median - args.budget_ms:.1f} ms")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Local stand-in for the API gateway, for benchmarks and offline runs.
+
+Implements the endpoints GatewayClient calls, including streamed chat
+completions, over HTTP/1.1 with keep-alive. Latency, jitter, error rate and
+payload sizes are configurable so client-side changes can be measured
+without the live Cloud Run gateway.
+
+The email, calendar and task lists support since-cursors like the client's
+sync_* methods expect: every response carries a ``cursor``, and a request with
+``since=<cursor>`` returns only items changed after it plus ``deleted`` IDs.
+``--churn N`` adds N new messages before each email request, as if mail kept
+arriving between runs. ``--page-size N`` splits full lists into pages of N
+items linked by ``next_page_token`` (pass back as ``page_token=``).
+
+Usage:
+    python benchmarks/stub_gateway.py [--port 8765] [--latency-ms 50] [--error-rate 0.05]
+    API_GATEWAY_URL=http://127.0.0.1:8765 python runner.py scheduled/daily_context.py
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+COMPLETION = "All quiet today. Your standup is at 9:30. Rent is due. Nothing else is urgent."
+
+
+@dataclass
+class StubSettings:
+    latency_ms: float = 0.0  # added before every response
+    jitter_ms: float = 0.0  # latency varies uniformly by +/- this much
+    error_rate: float = 0.0  # fraction of requests answered with 503
+    items: int = 5  # events, messages and tasks per list response
+    stream_chunk_ms: float = 0.0  # delay between streamed completion chunks
+    churn: int = 0  # new messages added before each email list request
+    prefill_us_per_token: float = 0.0  # chat delay per prompt token (~4 chars), like model prefill
+    page_size: int = 0  # items per page of a full list response; 0 = no pagination
+    seed: int | None = None
+
+
+def _events(count: int) -> list[dict]:
+    start = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    return [
+        {
+            "id": f"event-{i}",
+            "title": f"Event {i}",
+            "start": (start + timedelta(hours=i * 5)).isoformat(),
+            "end": (start + timedelta(hours=i * 5, minutes=30)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def _message(i: int, received: datetime) -> dict:
+    return {
+        "id": f"message-{i}", "subject": f"Message {i}", "sender": f"sender{i}@example.com",
+        "snippet": "Lorem ipsum dolor sit amet " * 4, "received_at": received.isoformat(),
+    }
+
+
+def build_responses(items: int) -> dict[str, dict]:
+    """Canned JSON bodies keyed by path, with ``items`` entries per list."""
+    return {
+        "/health": {"status": "ok"},
+        "/health/integrations": {"integrations": {"calendar": "ok", "email": "ok"}},
+        "/context/now": {"time": datetime.now().isoformat(), "events": _events(min(items, 3))},
+        "/calendar/today": {"events": _events(min(items, 3))},
+        "/notify": {"status": "sent"},
+        "/ai/v1/chat/completions": {
+            "choices": [{"message": {"role": "assistant", "content": COMPLETION}}],
+        },
+    }
+
+
+class StubDataset:
+    """Mutable list endpoints with a change log, so ``since=<cursor>`` can return deltas.
+
+    The cursor is the sequence number of the last change; each item remembers
+    the sequence number of its last write.
+    """
+
+    LISTS = {"/email/recent": "messages", "/calendar/events": "events", "/tasks/upcoming": "tasks"}
+
+    def __init__(self, items: int):
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.items: dict[str, dict[str, tuple[int, dict]]] = {path: {} for path in self.LISTS}
+        self.deleted: dict[str, list[tuple[int, str]]] = {path: [] for path in self.LISTS}
+        now = datetime.now()
+        self.messages = items
+        for i in range(items):
+            self.put("/email/recent", _message(i, now - timedelta(minutes=10 * i)))
+        for event in _events(items):
+            self.put("/calendar/events", event)
+        for i in range(items):
+            self.put("/tasks/upcoming", {
+                "id": f"task-{i}", "title": f"Task {i}", "list_name": "Home", "due": None,
+            })
+
+    def put(self, path: str, item: dict) -> None:
+        """Add or update an item (matched by ``id``)."""
+        with self.lock:
+            self.seq += 1
+            self.items[path][item["id"]] = (self.seq, item)
+
+    def delete(self, path: str, item_id: str) -> None:
+        with self.lock:
+            if self.items[path].pop(item_id, None) is not None:
+                self.seq += 1
+                self.deleted[path].append((self.seq, item_id))
+
+    def new_message(self) -> None:
+        with self.lock:
+            self.messages += 1
+            i = self.messages
+        self.put("/email/recent", _message(i, datetime.now()))
+
+    def query(
+        self, path: str, since: str | None, page_token: str | None = None, page_size: int = 0
+    ) -> dict:
+        """The full list, or only changes after ``since`` (an earlier response's cursor).
+
+        With ``page_size``, a full list is returned in pages; ``page_token`` is
+        the previous page's ``next_page_token``.
+        """
+        try:
+            after = int(since) if since else None
+        except ValueError:
+            after = None
+        with self.lock:
+            entries = self.items[path].values()
+            items = [item for seq, item in entries if after is None or seq > after]
+            body = {self.LISTS[path]: items, "cursor": str(self.seq)}
+            if after is not None:
+                body["deleted"] = [item_id for seq, item_id in self.deleted[path] if seq > after]
+            else:
+                body["full"] = True
+                if page_size:
+                    offset = int(page_token or 0)
+                    body[self.LISTS[path]] = items[offset:offset + page_size]
+                    if offset + page_size < len(items):
+                        body["next_page_token"] = str(offset + page_size)
+        return body
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def settings(self) -> StubSettings:
+        return self.server.settings
+
+    def _send(self, status: int, body: dict, headers: dict | None = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_completion(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = COMPLETION.split(" ")
+        events = [
+            {"choices": [{"delta": {"content": word if i == 0 else " " + word}}]}
+            for i, word in enumerate(words)
+        ]
+        for event in events:
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            if self.settings.stream_chunk_ms:
+                time.sleep(self.settings.stream_chunk_ms / 1000)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes) -> None:
+        try:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client stopped reading early (stream cutoff)
+
+    def _respond(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"null") if length else None
+        settings = self.settings
+        rng = self.server.rng
+
+        with self.server.lock:
+            self.server.requests += 1
+            delay = settings.latency_ms + rng.uniform(-settings.jitter_ms, settings.jitter_ms)
+            fail = rng.random() < settings.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if fail:
+            self._send(503, {"error": "stub failure"}, {"Retry-After": "0"})
+            return
+
+        path, _, query = self.path.partition("?")
+        if path == "/ai/v1/chat/completions" and settings.prefill_us_per_token:
+            messages = (payload or {}).get("messages") or []
+            tokens = sum(len(str(m.get("content", ""))) for m in messages) / 4
+            time.sleep(tokens * settings.prefill_us_per_token / 1e6)
+        if path in StubDataset.LISTS:
+            if path == "/email/recent":
+                for _ in range(settings.churn):
+                    self.server.dataset.new_message()
+            params = parse_qs(query)
+            body = self.server.dataset.query(
+                path,
+                params.get("since", [None])[0],
+                params.get("page_token", [None])[0],
+                settings.page_size,
+            )
+            self._send(200, body)
+            return
+        if path == "/ai/v1/chat/completions" and isinstance(payload, dict) and payload.get("stream"):
+            self._stream_completion()
+            return
+        body = self.server.responses.get(path)
+        if body is None:
+            self._send(404, {"error": "not found"})
+        else:
+            self._send(200, body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], settings: StubSettings | None = None):
+        super().__init__(address, StubHandler)
+        self.settings = settings or StubSettings()
+        self.responses = build_responses(self.settings.items)
+        self.dataset = StubDataset(self.settings.items)
+        self.rng = random.Random(self.settings.seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients closing a cut-off stream early is expected, not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def describe(self) -> dict:
+        return asdict(self.settings)
+
+
+def start(
+    host: str = "127.0.0.1", port: int = 0, settings: StubSettings | None = None
+) -> tuple[StubServer, str]:
+    """Serve the stub on a background thread; returns the server and its base URL."""
+    server = StubServer((host, port), settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the stub's latency/error/payload options on a CLI parser."""
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--items", type=int, default=5, help="entries per list response")
+    parser.add_argument("--stream-chunk-ms", type=float, default=0.0)
+    parser.add_argument("--churn", type=int, default=0, help="new messages per email request")
+    parser.add_argument(
+        "--prefill-us-per-token", type=float, default=0.0, help="chat delay per prompt token"
+    )
+    parser.add_argument("--page-size", type=int, default=0, help="paginate full list responses")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def settings_from_args(args: argparse.Namespace) -> StubSettings:
+    return StubSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        items=args.items,
+        stream_chunk_ms=args.stream_chunk_ms,
+        churn=args.churn,
+        prefill_us_per_token=args.prefill_us_per_token,
+        page_size=args.page_size,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), settings_from_args(args))
+    print(f"Stub gateway on http://{args.host}:{args.port} {server.describe()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""End-to-end benchmark suite against the local stub gateway.
+
+Runs daily_context, weekly_context, a triggered handler request and scheduler
+dispatch against benchmarks/stub_gateway.py, reports latency percentiles and
+throughput, and writes the results to JSON so runs can be compared across
+commits.
+
+Usage:
+    python benchmarks/suite.py [--iterations 30] [--latency-ms 20 --jitter-ms 5]
+    python benchmarks/suite.py --compare .cache/benchmarks/<older>.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+import stub_gateway  # noqa: E402
+
+TRIGGERED_SCRIPT = '''"""
+---
+name: bench-triggered
+type: triggered
+path: /bench
+enabled: true
+---
+"""
+
+
+def main(payload=None, client=None):
+    return {
+        "events": len(client.get_calendar_events(days=1).get("events", [])),
+        "tasks": len(client.get_tasks_upcoming(days=1).get("tasks", [])),
+    }
+'''
+
+
+def summarize(samples: list[float], wall: float, errors: int = 0) -> dict:
+    """Latency percentiles (ms) and throughput (ops/s) for a list of durations in seconds."""
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+
+    return {
+        "n": len(ordered),
+        "errors": errors,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+        "ops_per_sec": round(len(ordered) / wall, 2),
+    }
+
+
+def timed(fn, iterations: int) -> dict:
+    """Time ``fn`` per call; failures (e.g. injected stub errors) are counted, not raised."""
+    try:
+        fn()  # warm up imports, module caches and the connection pool
+    except Exception:
+        pass
+    samples = []
+    errors = 0
+    wall_start = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            errors += 1
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - wall_start, errors)
+
+
+def bench_script(script: str, iterations: int) -> dict:
+    from utils.script import run_script
+
+    return timed(lambda: run_script(str(ROOT / script)), iterations)
+
+
+def bench_handler(iterations: int) -> dict:
+    from triggered import handler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        script = Path(tmp) / "bench_triggered.py"
+        script.write_text(TRIGGERED_SCRIPT)
+        handler.ROUTES["/bench"] = str(script)
+        handler.AUTOMATIONS["/bench"] = {
+            "name": "bench-triggered", "file": str(script), "path": "/bench",
+        }
+        client = handler.app.test_client()
+
+        def request():
+            response = client.post("/bench", json={"n": 1})
+            if response.status_code != 200:
+                raise RuntimeError(f"handler returned {response.status_code}: {response.json}")
+
+        try:
+            return timed(request, iterations)
+        finally:
+            handler.ROUTES.pop("/bench", None)
+            handler.AUTOMATIONS.pop("/bench", None)
+
+
+def bench_scheduler(iterations: int, concurrency: int) -> dict:
+    """Dispatch ``iterations`` runs of daily_context at once through JobRunner."""
+    from utils.cron import CronExpression
+    from utils.scheduler import JobRunner, ScheduledJob
+
+    config = {"scheduler": {"max_concurrency": concurrency, "default_overlap": "allow"}}
+    runner = JobRunner(config, logging.getLogger("bench"))
+    job = ScheduledJob(
+        script=str(ROOT / "scheduled/daily_context.py"),
+        cron=CronExpression("* * * * *"),
+        name="bench",
+    )
+
+    samples = []
+    all_done = threading.Event()
+    supervise = runner._supervise
+
+    def supervise_timed(job, dispatched=None):
+        supervise(job)
+        samples.append(time.perf_counter() - dispatched)
+        if len(samples) == iterations:
+            all_done.set()
+
+    wall_start = time.perf_counter()
+    for _ in range(iterations):
+        runner._supervise = lambda job, t=time.perf_counter(): supervise_timed(job, t)
+        runner.dispatch(job)
+    all_done.wait()
+    wall = time.perf_counter() - wall_start
+    runner.shutdown()
+    return summarize(samples, wall)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict, baseline: dict | None = None) -> None:
+    print(
+        f"{'benchmark':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9} {'errors':>7}"
+    )
+    for name, stats in results.items():
+        line = (
+            f"{name:<20} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+            f"{stats['p99_ms']:>9.2f} {stats['ops_per_sec']:>9.1f} {stats['errors']:>7}"
+        )
+        before = (baseline or {}).get(name)
+        if before:
+            change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            line += f"   p50 {change:+.1f}% vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4, help="scheduler max_concurrency")
+    parser.add_argument("--output", help="results file (default .cache/benchmarks/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare p50 against")
+    stub_gateway.add_arguments(parser)
+    args = parser.parse_args()
+
+    # Keep script logging (including tracebacks from injected errors) out of the report
+    logging.disable(logging.CRITICAL)
+    server, url = stub_gateway.start(settings=stub_gateway.settings_from_args(args))
+    os.environ["API_GATEWAY_URL"] = url
+
+    try:
+        results = {
+            "daily_context": bench_script("scheduled/daily_context.py", args.iterations),
+            "weekly_context": bench_script("scheduled/weekly_context.py", args.iterations),
+            "triggered_handler": bench_handler(args.iterations),
+            "scheduler_dispatch": bench_scheduler(args.iterations, args.concurrency),
+        }
+    finally:
+        server.shutdown()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "iterations": args.iterations,
+        "stub": server.describe(),
+        "stub_requests": server.requests,
+        "results": results,
+    }
+    output = Path(args.output or ROOT / ".cache" / "benchmarks" / f"{commit}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    baseline = json.loads(Path(args.compare).read_text())["results"] if args.compare else None
+    print_results(results, baseline)
+    print(f"\nWrote {output}")
+
+
+if __name__ == "__main__":
+    main()
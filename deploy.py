@@ -1,132 +1,145 @@
 """Deploy automations to GCP Cloud Run."""
 
 import argparse
+import hashlib
+import json
 import os
-import re
-from pathlib import Path
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable
 
-import yaml
 from dotenv import load_dotenv
 
+from utils.discovery import (
+    DEFAULT_TIMEZONE, discover_automations, discovery_errors, schedule_groups,
+)
+
 load_dotenv()
 
 PROJECT_ID = os.getenv("GCP_PROJECT_ID", "api-gateway-485017")
 REGION = os.getenv("GCP_REGION", "us-central1")
-IMAGE_URL = f"{REGION}-docker.pkg.dev/{PROJECT_ID}/automations/automations:latest"
-AUTOMATION_FOLDERS = ["scheduled", "triggered", "manual"]
+IMAGE_REPO = f"{REGION}-docker.pkg.dev/{PROJECT_ID}/automations/automations"
+# Deploy an immutable tag (CI sets IMAGE_TAG to the commit SHA) so a new image changes the
+# spec hash; with "latest" unchanged specs are skipped and new code is never rolled out
+IMAGE_TAG = os.getenv("IMAGE_TAG", "latest")
+IMAGE_URL = os.getenv("IMAGE_URL") or f"{IMAGE_REPO}:{IMAGE_TAG}"
 
 # Secret Manager secret name for API gateway key
 API_KEY_SECRET = os.getenv("API_KEY_SECRET", "api-key")
 
+# "wsgi" serves triggered automations with Flask on sync gunicorn workers,
+# "asgi" with triggered/asgi.py on uvicorn workers
+TRIGGERED_SERVER = os.getenv("TRIGGERED_SERVER", "wsgi")
 
-def parse_frontmatter(file_path: Path) -> dict[str, Any] | None:
-    """Extract YAML frontmatter from a Python file's docstring."""
-    content = file_path.read_text(encoding="utf-8")
-    match = re.search(r'^"""[\s]*---\s*(.*?)\s*---[\s]*"""', content, re.DOTALL)
-    
-    if not match:
-        return None
-    
-    try:
-        return yaml.safe_load(match.group(1))
-    except yaml.YAMLError as e:
-        print(f"Error parsing frontmatter in {file_path}: {e}")
-        return None
 
+PARENT = f"projects/{PROJECT_ID}/locations/{REGION}"
 
-def discover_automations() -> list[dict[str, Any]]:
-    """Scan folders and discover all automations with valid frontmatter."""
-    automations = []
-    base_path = Path(__file__).parent
-    
-    for folder in AUTOMATION_FOLDERS:
-        folder_path = base_path / folder
-        if not folder_path.exists():
-            continue
-        
-        for py_file in folder_path.glob("*.py"):
-            if py_file.name.startswith("_") or py_file.name == "handler.py":
-                continue
-            
-            frontmatter = parse_frontmatter(py_file)
-            if frontmatter and frontmatter.get("enabled", True):
-                automations.append({
-                    "file": str(py_file.relative_to(base_path)),
-                    "folder": folder,
-                    **frontmatter,
-                })
-    
-    return automations
+# Labels marking resources this tool owns (safe to delete when their script is removed)
+# and the hash of the spec they were deployed from (unchanged specs are skipped)
+MANAGED_LABELS = {"managed-by": "automations"}
+HASH_LABEL = "spec-hash"
 
+# Concurrent create/update/delete operations during sync
+DEPLOY_WORKERS = int(os.getenv("DEPLOY_WORKERS", "8"))
 
-def sync_scheduled(automation: dict, dry_run: bool = False) -> None:
-    """Create/update Cloud Run Job + Cloud Scheduler."""
-    from google.cloud import run_v2
-    from google.cloud import scheduler
+TRIGGERED_SERVICE = "automations-triggered"
 
-    name = automation["name"]
-    schedule = automation["schedule"]
-    timezone = automation.get("timezone", "America/New_York")
-    file_path = automation["file"]
 
-    job_name = f"projects/{PROJECT_ID}/locations/{REGION}/jobs/{name}"
-    scheduler_name = f"projects/{PROJECT_ID}/locations/{REGION}/jobs/{name}-trigger"
+@dataclass
+class Clients:
+    """GCP API clients used by sync, and the message modules specs are built from.
 
-    print(f"  → Job: {name} | Schedule: {schedule} ({timezone})")
+    Pass fakes with the same methods and message types to test offline; only
+    default() imports the google-cloud packages.
+    """
 
-    if dry_run:
-        return
+    jobs: Any
+    scheduler: Any
+    services: Any
+    run_types: Any  # google.cloud.run_v2: Job, Service, Container, EnvVar, ...
+    scheduler_types: Any  # google.cloud.scheduler: Job, HttpTarget, OAuthToken, ...
+
+    @classmethod
+    def default(cls) -> "Clients":
+        from google.cloud import run_v2
+        from google.cloud import scheduler
+
+        return cls(
+            jobs=run_v2.JobsClient(),
+            scheduler=scheduler.CloudSchedulerClient(),
+            services=run_v2.ServicesClient(),
+            run_types=run_v2,
+            scheduler_types=scheduler,
+        )
+
+
+@dataclass
+class Change:
+    action: str  # create | update | delete
+    kind: str  # job | scheduler | service
+    name: str
+    detail: str
+    apply: Callable[[], None]
+
+
+def spec_hash(message) -> str:
+    """Stable hash of a proto-plus message, short enough for a label value."""
+    data = json.loads(type(message).to_json(message))
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _container_env(run_v2):
+    """API key from Secret Manager, and JSON logs so Cloud Logging parses severity and trace."""
+    return [_api_key_env(run_v2), run_v2.EnvVar(name="AUTOMATIONS_LOG_JSON", value="1")]
+
+
+def _api_key_env(run_v2):
+    return run_v2.EnvVar(
+        name="API_GATEWAY_KEY",
+        value_source=run_v2.EnvVarSource(
+            secret_key_ref=run_v2.SecretKeySelector(
+                secret=f"projects/{PROJECT_ID}/secrets/{API_KEY_SECRET}",
+                version="latest",
+            )
+        ),
+    )
 
-    jobs_client = run_v2.JobsClient()
+
+def build_job(automation: dict, run_v2, image: str = IMAGE_URL):
+    """Cloud Run Job spec for a scheduled or manual automation, or a schedule group.
+
+    ``run_v2`` is the message module to build with (Clients.run_types).
+    """
+    files = automation.get("files", [automation["file"]])
     job = run_v2.Job(
+        labels=dict(MANAGED_LABELS),
         template=run_v2.ExecutionTemplate(
             template=run_v2.TaskTemplate(
                 containers=[run_v2.Container(
-                    image=IMAGE_URL,
+                    image=image,
                     command=["python"],
-                    args=["runner.py", file_path],
-                    env=[
-                        run_v2.EnvVar(
-                            name="API_GATEWAY_KEY",
-                            value_source=run_v2.EnvVarSource(
-                                secret_key_ref=run_v2.SecretKeySelector(
-                                    secret=f"projects/{PROJECT_ID}/secrets/{API_KEY_SECRET}",
-                                    version="latest",
-                                )
-                            ),
-                        ),
-                    ],
+                    args=["runner.py", *files],
+                    env=_container_env(run_v2),
                 )],
-                max_retries=1,
+                # Retrying a grouped run would repeat scripts that already succeeded
+                max_retries=1 if len(files) == 1 else 0,
             )
-        )
+        ),
     )
-    
-    job_exists = False
-    try:
-        jobs_client.get_job(name=job_name)
-        job_exists = True
-    except Exception:
-        pass
-    
-    if job_exists:
-        job.name = job_name
-        jobs_client.update_job(job=job).result()
-        print(f"    ✓ Updated job")
-    else:
-        jobs_client.create_job(
-            parent=f"projects/{PROJECT_ID}/locations/{REGION}",
-            job=job,
-            job_id=name,
-        ).result()
-        print(f"    ✓ Created job")
-    
-    scheduler_client = scheduler.CloudSchedulerClient()
-    scheduler_job = scheduler.Job(
-        name=scheduler_name,
-        schedule=schedule,
-        time_zone=timezone,
+    job.labels[HASH_LABEL] = spec_hash(job)
+    return job
+
+
+def build_scheduler_job(automation: dict, scheduler):
+    """Cloud Scheduler job that runs a scheduled automation's Cloud Run Job.
+
+    ``scheduler`` is the message module to build with (Clients.scheduler_types).
+    """
+    name = automation["name"]
+    return scheduler.Job(
+        name=f"{PARENT}/jobs/{name}-trigger",
+        schedule=automation["schedule"],
+        time_zone=automation.get("timezone", DEFAULT_TIMEZONE),
         http_target=scheduler.HttpTarget(
             uri=f"https://{REGION}-run.googleapis.com/apis/run.googleapis.com/v1/namespaces/{PROJECT_ID}/jobs/{name}:run",
             http_method=scheduler.HttpMethod.POST,
@@ -135,154 +148,254 @@ def sync_scheduled(automation: dict, dry_run: bool = False) -> None:
             ),
         ),
     )
-    
-    try:
-        scheduler_client.get_job(name=scheduler_name)
-        scheduler_client.update_job(job=scheduler_job)
-        print(f"    ✓ Updated scheduler")
-    except Exception:
-        scheduler_client.create_job(
-            parent=f"projects/{PROJECT_ID}/locations/{REGION}",
-            job=scheduler_job,
-        )
-        print(f"    ✓ Created scheduler")
 
 
-def sync_triggered(automations: list[dict], dry_run: bool = False) -> None:
-    """Create/update Cloud Run Service for triggered automations."""
-    from google.cloud import run_v2
-    
-    if not automations:
-        return
-    
-    service_name = "automations-triggered"
-    print(f"\n[triggered] Service: {service_name}")
-    for auto in automations:
-        print(f"  → Route: {auto.get('path', '/' + auto['name'])}")
-    
-    if dry_run:
-        return
-    
-    services_client = run_v2.ServicesClient()
+def build_service(run_v2, image: str = IMAGE_URL):
+    """Cloud Run Service spec serving all triggered automations."""
+    if TRIGGERED_SERVER == "asgi":
+        server_args = ["-k", "uvicorn.workers.UvicornWorker", "--bind", "0.0.0.0:8080",
+                       "triggered.asgi:app"]
+    else:
+        server_args = ["--bind", "0.0.0.0:8080", "triggered.handler:app"]
+
     service = run_v2.Service(
+        labels=dict(MANAGED_LABELS),
         template=run_v2.RevisionTemplate(
             containers=[run_v2.Container(
-                image=IMAGE_URL,
+                image=image,
                 command=["gunicorn"],
-                args=["--bind", "0.0.0.0:8080", "triggered.handler:app"],
+                args=server_args,
                 ports=[run_v2.ContainerPort(container_port=8080)],
-                env=[
-                    run_v2.EnvVar(
-                        name="API_GATEWAY_KEY",
-                        value_source=run_v2.EnvVarSource(
-                            secret_key_ref=run_v2.SecretKeySelector(
-                                secret=f"projects/{PROJECT_ID}/secrets/{API_KEY_SECRET}",
-                                version="latest",
-                            )
-                        ),
-                    ),
-                ],
+                env=_container_env(run_v2),
             )],
         ),
     )
-    
-    try:
-        services_client.update_service(service=service, allow_missing=True).result()
-        print(f"    ✓ Updated service")
-    except Exception:
-        services_client.create_service(
-            parent=f"projects/{PROJECT_ID}/locations/{REGION}",
-            service=service,
-            service_id=service_name,
-        ).result()
-        print(f"    ✓ Created service")
-
-
-def sync_manual(automation: dict, dry_run: bool = False) -> None:
-    """Create/update Cloud Run Job (no scheduler)."""
-    from google.cloud import run_v2
+    service.labels[HASH_LABEL] = spec_hash(service)
+    return service
 
-    name = automation["name"]
-    file_path = automation["file"]
-    job_name = f"projects/{PROJECT_ID}/locations/{REGION}/jobs/{name}"
 
-    print(f"  → Job: {name} (manual)")
+def group_by_slot(automations: list[dict]) -> list[dict]:
+    """Replace scheduled automations sharing a cron slot with one grouped job each.
 
-    if dry_run:
-        return
+    Slots with a single automation are left as they are.
+    """
+    grouped = []
+    files = set()
+    for name, members in schedule_groups(automations).items():
+        if len(members) < 2:
+            continue
+        member_files = [auto["file"] for auto in members]
+        files.update(member_files)
+        grouped.append({
+            "name": name,
+            "type": "scheduled",
+            "file": " + ".join(member_files),
+            "files": member_files,
+            "schedule": members[0]["schedule"],
+            "timezone": members[0].get("timezone", DEFAULT_TIMEZONE),
+        })
+    return [a for a in automations if a["file"] not in files] + grouped
+
+
+def _short_name(full_name: str) -> str:
+    return full_name.rsplit("/", 1)[-1]
+
+
+def fetch_actual(clients: Clients) -> dict[str, Any]:
+    """Fetch deployed Cloud Run jobs, Scheduler jobs and the triggered service in bulk."""
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        jobs = pool.submit(lambda: list(clients.jobs.list_jobs(parent=PARENT)))
+        schedulers = pool.submit(lambda: list(clients.scheduler.list_jobs(parent=PARENT)))
+        services = pool.submit(lambda: list(clients.services.list_services(parent=PARENT)))
+
+    return {
+        "jobs": {_short_name(j.name): j for j in jobs.result()},
+        "schedulers": {_short_name(j.name): j for j in schedulers.result()},
+        "services": {_short_name(s.name): s for s in services.result()},
+    }
+
+
+def _is_managed(resource) -> bool:
+    labels = dict(resource.labels)
+    return all(labels.get(k) == v for k, v in MANAGED_LABELS.items())
+
+
+def _scheduler_changed(actual, desired) -> bool:
+    return (
+        actual.schedule != desired.schedule
+        or actual.time_zone != desired.time_zone
+        or actual.http_target.uri != desired.http_target.uri
+    )
 
-    jobs_client = run_v2.JobsClient()
-    job = run_v2.Job(
-        template=run_v2.ExecutionTemplate(
-            template=run_v2.TaskTemplate(
-                containers=[run_v2.Container(
-                    image=IMAGE_URL,
-                    command=["python"],
-                    args=["runner.py", file_path],
-                    env=[
-                        run_v2.EnvVar(
-                            name="API_GATEWAY_KEY",
-                            value_source=run_v2.EnvVarSource(
-                                secret_key_ref=run_v2.SecretKeySelector(
-                                    secret=f"projects/{PROJECT_ID}/secrets/{API_KEY_SECRET}",
-                                    version="latest",
-                                )
-                            ),
-                        ),
-                    ],
-                )],
-                max_retries=1,
-            )
-        )
+
+def plan_sync(
+    automations: list[dict], actual: dict[str, Any], clients: Clients, image: str = IMAGE_URL
+) -> list[Change]:
+    """Diff desired resources against deployed ones and return the changes to apply.
+
+    The image is part of the job and service specs, so deploying a new tag updates them.
+    """
+    changes = []
+    desired_jobs = set()
+    desired_schedulers = set()
+
+    for auto in automations:
+        if auto.get("type") not in ("scheduled", "manual"):
+            continue
+        name = auto["name"]
+        desired_jobs.add(name)
+        job = build_job(auto, clients.run_types, image)
+        existing = actual["jobs"].get(name)
+        if existing is None:
+            changes.append(Change(
+                "create", "job", name, auto["file"],
+                lambda j=job, n=name: clients.jobs.create_job(
+                    parent=PARENT, job=j, job_id=n
+                ).result(),
+            ))
+        elif dict(existing.labels).get(HASH_LABEL) != job.labels[HASH_LABEL]:
+            job.name = existing.name
+            changes.append(Change(
+                "update", "job", name, auto["file"],
+                lambda j=job: clients.jobs.update_job(job=j).result(),
+            ))
+
+        if auto.get("type") == "scheduled":
+            trigger = build_scheduler_job(auto, clients.scheduler_types)
+            trigger_name = _short_name(trigger.name)
+            desired_schedulers.add(trigger_name)
+            existing = actual["schedulers"].get(trigger_name)
+            detail = f"{trigger.schedule} ({trigger.time_zone})"
+            if existing is None:
+                changes.append(Change(
+                    "create", "scheduler", trigger_name, detail,
+                    lambda t=trigger: clients.scheduler.create_job(parent=PARENT, job=t),
+                ))
+            elif _scheduler_changed(existing, trigger):
+                changes.append(Change(
+                    "update", "scheduler", trigger_name, detail,
+                    lambda t=trigger: clients.scheduler.update_job(job=t),
+                ))
+
+    triggered = [a for a in automations if a.get("type") == "triggered"]
+    if triggered:
+        service = build_service(clients.run_types, image)
+        existing = actual["services"].get(TRIGGERED_SERVICE)
+        routes = ", ".join(a.get("path", "/" + a["name"]) for a in triggered)
+        if existing is None:
+            changes.append(Change(
+                "create", "service", TRIGGERED_SERVICE, routes,
+                lambda: clients.services.create_service(
+                    parent=PARENT, service=service, service_id=TRIGGERED_SERVICE
+                ).result(),
+            ))
+        elif dict(existing.labels).get(HASH_LABEL) != service.labels[HASH_LABEL]:
+            service.name = existing.name
+            changes.append(Change(
+                "update", "service", TRIGGERED_SERVICE, routes,
+                lambda: clients.services.update_service(service=service).result(),
+            ))
+
+    # Remove managed jobs whose scripts are gone, and triggers no longer scheduled
+    managed_jobs = {name for name, job in actual["jobs"].items() if _is_managed(job)}
+    for name in sorted(managed_jobs - desired_jobs):
+        changes.append(Change(
+            "delete", "job", name, "script removed",
+            lambda n=actual["jobs"][name].name: clients.jobs.delete_job(name=n).result(),
+        ))
+    for trigger_name, trigger in sorted(actual["schedulers"].items()):
+        base = trigger_name.removesuffix("-trigger")
+        if base in managed_jobs and trigger_name not in desired_schedulers:
+            changes.append(Change(
+                "delete", "scheduler", trigger_name, "no longer scheduled",
+                lambda n=trigger.name: clients.scheduler.delete_job(name=n),
+            ))
+
+    return changes
+
+
+PLAN_SYMBOLS = {"create": "+", "update": "~", "delete": "-"}
+
+
+def print_plan(changes: list[Change], unchanged: int) -> None:
+    for change in changes:
+        symbol = PLAN_SYMBOLS[change.action]
+        print(f"  {symbol} {change.kind} {change.name} ({change.detail})")
+    counts = {action: sum(c.action == action for c in changes) for action in PLAN_SYMBOLS}
+    print(
+        f"\nPlan: {counts['create']} to add, {counts['update']} to change, "
+        f"{counts['delete']} to destroy, {unchanged} unchanged."
     )
-    
-    job_exists = False
-    try:
-        jobs_client.get_job(name=job_name)
-        job_exists = True
-    except Exception:
-        pass
-    
-    if job_exists:
-        job.name = job_name
-        jobs_client.update_job(job=job).result()
-        print(f"    ✓ Updated job")
-    else:
-        jobs_client.create_job(
-            parent=f"projects/{PROJECT_ID}/locations/{REGION}",
-            job=job,
-            job_id=name,
-        ).result()
-        print(f"    ✓ Created job")
 
 
-def cmd_sync(dry_run: bool = False) -> None:
-    """Sync all automations to GCP."""
+def apply_plan(changes: list[Change], workers: int = DEPLOY_WORKERS) -> list[str]:
+    """Apply changes concurrently; return error messages for any that failed."""
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(change.apply): change for change in changes}
+        for future in as_completed(futures):
+            change = futures[future]
+            try:
+                future.result()
+                print(f"    ✓ {change.action.capitalize()}d {change.kind} {change.name}")
+            except Exception as e:
+                errors.append(f"{change.action} {change.kind} {change.name}: {e}")
+                print(f"    ✗ Failed to {change.action} {change.kind} {change.name}: {e}")
+    return errors
+
+
+def cmd_sync(
+    dry_run: bool = False,
+    clients: Clients | None = None,
+    group_slots: bool = False,
+    image: str | None = None,
+) -> None:
+    """Sync all automations to GCP.
+
+    With ``group_slots``, scheduled automations that fire in the same cron slot
+    are deployed as one job running them together (``runner.py a.py b.py``).
+    ``image`` overrides IMAGE_URL; pass a commit tag or digest so new code rolls out.
+    """
+    image = image or IMAGE_URL
     print(f"{'[DRY RUN] ' if dry_run else ''}Syncing to {PROJECT_ID}/{REGION}")
-    print(f"Image: {IMAGE_URL}\n")
+    print(f"Image: {image}\n")
+    if image.endswith(":latest"):
+        print(
+            "⚠ Deploying the mutable :latest tag; jobs and services whose spec is otherwise "
+            "unchanged keep running the old image. Set IMAGE_TAG or --image.\n"
+        )
     
+    # A script dropped for a frontmatter typo would look deleted and lose its job and trigger
+    invalid = discovery_errors()
+    if invalid:
+        for rel_path, errors in invalid.items():
+            print(f"  ✗ {rel_path}: {'; '.join(errors)}")
+        raise SystemExit(
+            f"\n✗ {len(invalid)} automation(s) have invalid frontmatter; not syncing"
+        )
+
     automations = discover_automations()
-    if not automations:
-        print("No automations found.")
+    if group_slots:
+        automations = group_by_slot(automations)
+    clients = clients or Clients.default()
+    actual = fetch_actual(clients)
+    changes = plan_sync(automations, actual, clients, image)
+
+    desired_count = (
+        sum(a.get("type") in ("scheduled", "manual") for a in automations)
+        + sum(a.get("type") == "scheduled" for a in automations)
+        + any(a.get("type") == "triggered" for a in automations)
+    )
+    unchanged = desired_count - sum(c.action != "delete" for c in changes)
+    print_plan(changes, unchanged)
+
+    if dry_run or not changes:
         return
-    
-    scheduled = [a for a in automations if a.get("type") == "scheduled"]
-    triggered = [a for a in automations if a.get("type") == "triggered"]
-    manual = [a for a in automations if a.get("type") == "manual"]
-    
-    if scheduled:
-        print(f"[scheduled] {len(scheduled)} automation(s)")
-        for auto in scheduled:
-            sync_scheduled(auto, dry_run)
-    
-    if triggered:
-        sync_triggered(triggered, dry_run)
-    
-    if manual:
-        print(f"\n[manual] {len(manual)} automation(s)")
-        for auto in manual:
-            sync_manual(auto, dry_run)
-    
+
+    print()
+    errors = apply_plan(changes)
+    if errors:
+        raise SystemExit(f"\n✗ {len(errors)} change(s) failed")
     print("\n✓ Done!")
 
 
@@ -305,13 +418,23 @@ def main():
     
     sync_parser = subparsers.add_parser("sync", help="Sync to GCP")
     sync_parser.add_argument("--dry-run", action="store_true")
+    sync_parser.add_argument(
+        "--group-slots",
+        action="store_true",
+        help="Deploy scheduled scripts sharing a cron slot as one grouped job",
+    )
+    sync_parser.add_argument(
+        "--image",
+        help="Container image to deploy, e.g. <repo>:<commit sha> or <repo>@sha256:<digest> "
+        "(default: IMAGE_URL, or IMAGE_REPO:IMAGE_TAG)",
+    )
     
     subparsers.add_parser("status", help="List automations")
     
     args = parser.parse_args()
     
     if args.command == "sync":
-        cmd_sync(dry_run=args.dry_run)
+        cmd_sync(dry_run=args.dry_run, group_slots=args.group_slots, image=args.image)
     elif args.command == "status":
         cmd_status()
 
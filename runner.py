@@ -2,46 +2,116 @@
 Automation runner - execute automations on-demand or start scheduler.
 
 Usage:
-    python runner.py <script_path>  # Run once
-    python runner.py --scheduler    # Start scheduler
+    python runner.py <script_path>          # Run once
+    python runner.py <script> <script> ...  # Run several in one process
+    python runner.py --group <name>         # Run a schedule group (see deploy.py --group-slots)
+    python runner.py --scheduler            # Start scheduler
+    python runner.py --profile <script>     # Also trace the run and capture a cProfile
 """
 
 import sys
 import argparse
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 
-from utils.scheduler import run_script, start_scheduler
 from utils.logger import setup_logger
 from utils.config_loader import load_config
+from utils import tracing
+
+PROFILE_DIR = Path(".cache/profiles")
+
+
+@contextmanager
+def profiled(label: str, logger):
+    """Capture a cProfile of the block and log the hottest functions.
+
+    The .prof file opens in snakeviz, or renders as a flamegraph with flameprof.
+    """
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / f"{Path(label).stem}-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(15)
+        logger.info(f"Profile written to {path}\n{summary.getvalue()}")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run automation scripts")
     parser.add_argument(
-        "script",
-        nargs="?",
-        help="Path to script (e.g., scheduled/daily_summary.py)",
+        "scripts",
+        nargs="*",
+        help="Path(s) to script (e.g., scheduled/daily_summary.py)",
+    )
+    parser.add_argument(
+        "--group",
+        help="Run every scheduled script in a schedule group",
     )
     parser.add_argument(
         "--scheduler",
         action="store_true",
         help="Start the scheduler to run scripts on schedule",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Trace the run to the tracing path and save a cProfile under .cache/profiles",
+    )
 
     args = parser.parse_args()
 
     config = load_config()
     logger = setup_logger(__name__, config)
+    tracing.configure(config, enabled=True if args.profile else None)
 
+    # Import only what the chosen mode needs: a Cloud Run Job executing one
+    # script never loads the scheduler, cron engine or discovery index.
     if args.scheduler:
+        from utils.scheduler import start_scheduler
+
         start_scheduler()
-    elif args.script:
-        script_path = Path(args.script)
+    elif args.group or len(args.scripts) > 1:
+        scripts = list(args.scripts)
+        if args.group:
+            from utils.discovery import discover_automations, schedule_groups
+
+            members = schedule_groups(discover_automations()).get(args.group)
+            if not members:
+                logger.error(f"Unknown schedule group: {args.group}")
+                sys.exit(1)
+            scripts += [auto["file"] for auto in members if auto["file"] not in scripts]
+
+        from utils.script import run_batch
+
+        # One process and one gateway connection pool for the whole batch;
+        # a failing script doesn't stop the others but fails the run
+        logger.info(f"Running {len(scripts)} script(s): {', '.join(scripts)}")
+        with profiled(args.group or "batch", logger) if args.profile else nullcontext():
+            results = run_batch(scripts, config, logger)
+        failed = [script for script, error in results.items() if error]
+        if failed:
+            logger.error(f"{len(failed)} of {len(results)} script(s) failed: {', '.join(failed)}")
+            sys.exit(1)
+    elif args.scripts:
+        script_path = Path(args.scripts[0])
         if not script_path.exists():
             logger.error(f"Script not found: {script_path}")
             sys.exit(1)
+        from utils.script import run_script
+
         logger.info(f"Running script: {script_path}")
-        run_script(str(script_path))
+        with profiled(str(script_path), logger) if args.profile else nullcontext():
+            run_script(str(script_path))
     else:
         parser.print_help()
         sys.exit(1)
@@ -8,70 +8,97 @@ enabled: true
 ---
 """
 
+from contextlib import nullcontext
 from datetime import datetime
 
-from utils import GatewayClient, setup_logger, load_config
-
-
-def main():
+from utils import (
+    CompletionCache,
+    ContextBuilder,
+    GatewayClient,
+    GatewayPolicy,
+    ResponseCache,
+    gather_context,
+    setup_logger,
+    load_config,
+    sync,
+)
+
+
+def main(client: GatewayClient | None = None):
+    """Run the briefing; batch runs pass a shared ``client``."""
     config = load_config()
     logger = setup_logger(__name__, config)
 
     logger.info("Starting daily context")
 
-    with GatewayClient() as client:
-        health = client.health()
-        logger.info(f"Gateway: {health.get('status')}")
-
-        calendar = client.get_calendar_events(days=1)
-        events = calendar.get("events", [])
-
-        emails = client.get_email_recent(hours=24)
-        messages = emails.get("messages", [])
-
-        tasks = client.get_tasks_upcoming(days=1)
-        upcoming_tasks = tasks.get("tasks", [])
-
+    policy = client.policy if client else GatewayPolicy.from_config(config)
+    cache = client.cache if client else ResponseCache.from_config(config)
+    # Without a persisted snapshot a calendar sync is a full window_days fetch;
+    # /calendar/today is smaller
+    windowed_sync = sync.is_persistent(config)
+    context = gather_context({
+        "health": ("health", {}),
+        "calendar": (
+            "sync_calendar_events" if windowed_sync else "get_calendar_events", {"days": 1}
+        ),
+        "emails": ("sync_email_recent", {"hours": 24}),
+        "tasks": ("get_tasks_upcoming", {"days": 1, "fields": ("title", "due", "list_name")}),
+    }, cache=cache, policy=policy, client=client)
+    for source, error in context.errors.items():
+        logger.warning(f"Failed to fetch {source}: {error}")
+    # An empty briefing is only good news if the sources actually answered
+    failed = context.failed("calendar", "emails", "tasks")
+    if len(failed) == 3:
+        raise RuntimeError("Couldn't fetch calendar, emails, or tasks")
+    missing = f" Couldn't fetch {', '.join(failed)}." if failed else ""
+
+    logger.info(f"Gateway: {context.get('health', {}).get('status')}")
+    events = context.get("calendar", {}).get("events", [])
+    messages = context.get("emails", {}).get("messages", [])
+    upcoming_tasks = context.get("tasks", {}).get("tasks", [])
+
+    # A shared client belongs to the batch runner, which closes it
+    completions = None if client else CompletionCache.from_config(config)
+    with nullcontext(client) if client else GatewayClient(
+        policy=policy, completions=completions
+    ) as client:
         # Get current date for context
         today = datetime.now().strftime("%A, %B %d, %Y")
 
-        if not events and not messages and not upcoming_tasks:
+        # Rank, drop promotions and duplicates, and pack to the token budget locally
+        builder = ContextBuilder.from_config(config)
+        builder.add_events(events, "CALENDAR")
+        builder.add_emails(messages, "EMAILS (last 24h)")
+        builder.add_tasks(upcoming_tasks, "TASKS (due today)")
+        full_context = builder.build()
+        logger.info(f"Context: {builder.stats}")
+
+        if not full_context and failed:
+            message = f"Nothing to report from what loaded.{missing}"
+            client.notify(title="Good Morning", message=message)
+            logger.info(f"Nothing worth mentioning, but {', '.join(failed)} failed")
+            return
+        if not full_context:
             message = "You have a clear schedule, no urgent emails, and no tasks due today. Enjoy your day! ☀️"
             client.notify(title="Good Morning", message=message)
-            logger.info("No events, emails, or tasks - sent default message")
+            logger.info("No events, emails, or tasks worth mentioning - sent default message")
             return
 
-        context_parts = []
-
-        if events:
-            event_list = "\n".join([f"- {e['title']} at {e['start']}" for e in events])
-            context_parts.append(f"CALENDAR:\n{event_list}")
-
-        if messages:
-            recent_messages = messages[:10]
-            email_list = "\n".join([f"- {m['subject']} (from {m['sender']})" for m in recent_messages])
-            context_parts.append(f"EMAILS (last 24h, {len(messages)} total):\n{email_list}")
-
-        if upcoming_tasks:
-            task_list = "\n".join([
-                f"- {t['title']} [{t['list_name']}]"
-                for t in upcoming_tasks[:10]
-            ])
-            context_parts.append(f"TASKS (due today, {len(upcoming_tasks)} total):\n{task_list}")
-
-        full_context = "\n\n".join(context_parts)
-
         prompt = (
             f"Today is {today}. Here's my context:\n\n{full_context}\n\n"
             f"Give me a concise, casual, friendly 3-4 sentence morning briefing. "
             f"Skip greetings and don't mention today's date (I already know it's {today}). "
             f"Lead with the most important or time-sensitive thing. "
-            f"Ignore promotional emails and marketing content. "
         )
 
         try:
-            response = client.ai_chat([{"role": "user", "content": prompt}])
-            summary = response["choices"][0]["message"]["content"]
+            stream = client.ai_chat_stream(
+                [{"role": "user", "content": prompt}], max_sentences=4
+            )
+            summary = stream.read().strip()
+            logger.info(f"AI timings: {stream.timings()}")
+            if not summary:
+                raise ValueError("empty completion")
         except Exception as e:
             logger.warning(f"AI failed, falling back: {e}")
             summary = (
@@ -79,8 +106,9 @@ def main():
                 f"{len(messages)} email(s), and {len(upcoming_tasks)} task(s) due today. 📅"
             )
 
-        client.notify(title="Good Morning", message=summary)
+        client.notify(title="Good Morning", message=summary + missing)
         logger.info("Notification sent")
+        logger.info(f"Gateway stats: {client.stats.to_dict()}")
 
 
 if __name__ == "__main__":
@@ -8,46 +8,79 @@ enabled: true
 ---
 """
 
-from utils import GatewayClient, setup_logger, load_config
-
-
-def main():
+from contextlib import nullcontext
+
+from utils import (
+    CompletionCache,
+    ContextBuilder,
+    GatewayClient,
+    GatewayPolicy,
+    ResponseCache,
+    gather_context,
+    setup_logger,
+    load_config,
+    sync,
+)
+
+
+def main(client: GatewayClient | None = None):
+    """Run the briefing; batch runs pass a shared ``client``."""
     config = load_config()
     logger = setup_logger(__name__, config)
 
     logger.info("Starting weekly context")
 
-    with GatewayClient() as client:
-        health = client.health()
-        logger.info(f"Gateway: {health.get('status')}")
-
-        calendar = client.get_calendar_events(days=7)
-        events = calendar.get("events", [])
-
-        tasks = client.get_tasks_upcoming(days=7)
-        upcoming_tasks = tasks.get("tasks", [])
+    policy = client.policy if client else GatewayPolicy.from_config(config)
+    cache = client.cache if client else ResponseCache.from_config(config)
+    # Without a persisted snapshot a sync is a full window_days fetch; ask for 7 days
+    prefix = "sync" if sync.is_persistent(config) else "get"
+    context = gather_context({
+        "health": ("health", {}),
+        "calendar": (f"{prefix}_calendar_events", {"days": 7}),
+        "tasks": (f"{prefix}_tasks_upcoming", {"days": 7}),
+    }, cache=cache, policy=policy, client=client)
+    for source, error in context.errors.items():
+        logger.warning(f"Failed to fetch {source}: {error}")
+    # An empty preview is only good news if the sources actually answered
+    failed = context.failed("calendar", "tasks")
+    if len(failed) == 2:
+        raise RuntimeError("Couldn't fetch calendar or tasks")
+    missing = f" Couldn't fetch {', '.join(failed)}." if failed else ""
+
+    logger.info(f"Gateway: {context.get('health', {}).get('status')}")
+    events = context.get("calendar", {}).get("events", [])
+    upcoming_tasks = context.get("tasks", {}).get("tasks", [])
+
+    # A shared client belongs to the batch runner, which closes it
+    completions = None if client else CompletionCache.from_config(config)
+    with nullcontext(client) if client else GatewayClient(
+        policy=policy, completions=completions
+    ) as client:
+        builder = ContextBuilder.from_config(config)
+        builder.add_events(
+            events, "CALENDAR (next 7 days)", line=lambda e: f"- {e['title']} ({e['start'][:10]})"
+        )
+        builder.add_tasks(
+            upcoming_tasks,
+            "TASKS (next 7 days)",
+            line=lambda t: f"- {t['title']}"
+            + (f" (due {t['due'][:10]})" if t.get("due") else "")
+            + f" [{t['list_name']}]",
+        )
+        full_context = builder.build()
+        logger.info(f"Context: {builder.stats}")
 
-        if not events and not upcoming_tasks:
+        if not full_context and failed:
+            message = f"Nothing to report from what loaded.{missing}"
+            client.notify(title="Weekly Preview", message=message)
+            logger.info(f"Nothing worth mentioning, but {', '.join(failed)} failed")
+            return
+        if not full_context:
             message = "Your week looks wide open! No scheduled events or pressing tasks. Time to make some plans or just enjoy the freedom. 🌴"
             client.notify(title="Weekly Preview", message=message)
-            logger.info("No events or tasks - sent default message")
+            logger.info("No events or tasks worth mentioning - sent default message")
             return
 
-        context_parts = []
-
-        if events:
-            event_list = "\n".join([f"- {e['title']} ({e['start'][:10]})" for e in events[:15]])
-            context_parts.append(f"CALENDAR (next 7 days, {len(events)} total):\n{event_list}")
-
-        if upcoming_tasks:
-            task_list = "\n".join([
-                f"- {t['title']}" + (f" (due {t['due'][:10]})" if t.get('due') else "") + f" [{t['list_name']}]"
-                for t in upcoming_tasks[:15]
-            ])
-            context_parts.append(f"TASKS (next 7 days, {len(upcoming_tasks)} total):\n{task_list}")
-
-        full_context = "\n\n".join(context_parts)
-
         prompt = (
             f"Here's my week ahead:\n\n{full_context}\n\n"
             f"Give me a short, concise, 3-4 sentence weekly preview. "
@@ -57,8 +90,13 @@ def main():
         )
 
         try:
-            response = client.ai_chat([{"role": "user", "content": prompt}])
-            summary = response["choices"][0]["message"]["content"]
+            stream = client.ai_chat_stream(
+                [{"role": "user", "content": prompt}], max_sentences=4
+            )
+            summary = stream.read().strip()
+            logger.info(f"AI timings: {stream.timings()}")
+            if not summary:
+                raise ValueError("empty completion")
         except Exception as e:
             logger.warning(f"AI failed, falling back: {e}")
             summary = (
@@ -66,8 +104,9 @@ def main():
                 f"scheduled. Check your calendar for details. 📅"
             )
 
-        client.notify(title="Weekly Preview", message=summary)
+        client.notify(title="Weekly Preview", message=summary + missing)
         logger.info("Notification sent")
+        logger.info(f"Gateway stats: {client.stats.to_dict()}")
 
 
 if __name__ == "__main__":
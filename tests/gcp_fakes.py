@@ -0,0 +1,160 @@
+"""In-memory stand-ins for the Cloud Run and Cloud Scheduler clients deploy.py uses.
+
+fake_clients() returns a deploy.Clients whose API clients keep deployed
+resources in dicts and record every call, and whose message types mimic
+proto-plus messages closely enough for spec_hash(): keyword fields become
+attributes, ``labels`` is a dict, and ``to_json`` serializes the fields.
+"""
+
+import json
+from types import SimpleNamespace
+
+import deploy
+
+
+class Message:
+    def __init__(self, **fields):
+        self.name = ""
+        self.labels = {}
+        self.__dict__.update(fields)
+
+    @classmethod
+    def to_json(cls, message) -> str:
+        return json.dumps(_plain(message))
+
+
+def _plain(value):
+    if isinstance(value, Message):
+        return {k: _plain(v) for k, v in vars(value).items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+def _types(*names: str) -> SimpleNamespace:
+    return SimpleNamespace(**{name: type(name, (Message,), {}) for name in names})
+
+
+RUN_TYPES = _types(
+    "Job", "ExecutionTemplate", "TaskTemplate", "Container", "ContainerPort", "EnvVar",
+    "EnvVarSource", "SecretKeySelector", "Service", "RevisionTemplate",
+)
+SCHEDULER_TYPES = _types("Job", "HttpTarget", "OAuthToken")
+SCHEDULER_TYPES.HttpMethod = SimpleNamespace(POST="POST")
+
+
+class Operation:
+    """Long-running operation that has already finished."""
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+class _Store:
+    def __init__(self, kind: str, resources=()):
+        self.kind = kind
+        self.resources = {r.name: r for r in resources}
+        self.calls: list[tuple[str, str]] = []  # (method, short name)
+
+    def _list(self, parent: str) -> list:
+        return list(self.resources.values())
+
+    def _create(self, parent: str, resource, resource_id: str):
+        resource.name = resource.name or f"{parent}/{self.kind}/{resource_id}"
+        self.calls.append(("create", deploy._short_name(resource.name)))
+        self.resources[resource.name] = resource
+        return resource
+
+    def _update(self, resource):
+        self.calls.append(("update", deploy._short_name(resource.name)))
+        self.resources[resource.name] = resource
+        return resource
+
+    def _delete(self, name: str) -> None:
+        self.calls.append(("delete", deploy._short_name(name)))
+        del self.resources[name]
+
+
+class FakeJobsClient(_Store):
+    def __init__(self, jobs=()):
+        super().__init__("jobs", jobs)
+
+    def list_jobs(self, parent):
+        return self._list(parent)
+
+    def create_job(self, parent, job, job_id):
+        return Operation(self._create(parent, job, job_id))
+
+    def update_job(self, job):
+        return Operation(self._update(job))
+
+    def delete_job(self, name):
+        self._delete(name)
+        return Operation()
+
+
+class FakeSchedulerClient(_Store):
+    """Cloud Scheduler calls return the job itself, not an operation."""
+
+    def __init__(self, jobs=()):
+        super().__init__("jobs", jobs)
+
+    def list_jobs(self, parent):
+        return self._list(parent)
+
+    def create_job(self, parent, job):
+        return self._create(parent, job, "")
+
+    def update_job(self, job):
+        return self._update(job)
+
+    def delete_job(self, name):
+        self._delete(name)
+
+
+class FakeServicesClient(_Store):
+    def __init__(self, services=()):
+        super().__init__("services", services)
+
+    def list_services(self, parent):
+        return self._list(parent)
+
+    def create_service(self, parent, service, service_id):
+        return Operation(self._create(parent, service, service_id))
+
+    def update_service(self, service):
+        return Operation(self._update(service))
+
+
+def fake_clients(jobs=(), schedulers=(), services=()) -> deploy.Clients:
+    return deploy.Clients(
+        jobs=FakeJobsClient(jobs),
+        scheduler=FakeSchedulerClient(schedulers),
+        services=FakeServicesClient(services),
+        run_types=RUN_TYPES,
+        scheduler_types=SCHEDULER_TYPES,
+    )
+
+
+def deployed_job(automation: dict, image: str = deploy.IMAGE_URL, **labels):
+    """The Cloud Run job deploy.py would have created for ``automation``."""
+    job = deploy.build_job(automation, RUN_TYPES, image)
+    job.name = f"{deploy.PARENT}/jobs/{automation['name']}"
+    job.labels.update(labels)
+    return job
+
+
+def deployed_trigger(automation: dict):
+    return deploy.build_scheduler_job(automation, SCHEDULER_TYPES)
+
+
+def deployed_service(image: str = deploy.IMAGE_URL, **labels):
+    service = deploy.build_service(RUN_TYPES, image)
+    service.name = f"{deploy.PARENT}/services/{deploy.TRIGGERED_SERVICE}"
+    service.labels.update(labels)
+    return service
@@ -0,0 +1,43 @@
+import os
+
+from utils.config_loader import ConfigWatcher, load_config
+
+
+def write(path, text, bump):
+    path.write_text(text)
+    # Make sure the stamp moves even on filesystems with coarse mtimes
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+
+def test_watcher_sees_changes_another_caller_reloaded_first(tmp_path):
+    path = tmp_path / "config.yaml"
+    write(path, "scheduler:\n  max_concurrency: 2\nlogging:\n  level: INFO\n", 0)
+    calls = []
+    # A long interval keeps the background thread out of the way; the test polls
+    watcher = ConfigWatcher(lambda config, changed: calls.append(changed), str(path), 3600)
+    watcher.start()
+
+    write(path, "scheduler:\n  max_concurrency: 4\nlogging:\n  level: INFO\n", 1)
+    config = load_config(str(path))  # A script reloads before the watcher polls
+    assert config.get_int("scheduler.max_concurrency") == 4
+
+    assert watcher.poll() == {"scheduler"}
+    assert calls == [{"scheduler"}]
+    assert watcher.poll() == set()
+    assert calls == [{"scheduler"}]
+    watcher.stop()
+
+
+def test_watcher_ignores_rewrites_without_changes(tmp_path):
+    path = tmp_path / "config.yaml"
+    write(path, "logging:\n  level: INFO\n", 0)
+    calls = []
+    watcher = ConfigWatcher(lambda config, changed: calls.append(changed), str(path), 3600)
+    watcher.start()
+
+    write(path, "logging:\n  level: INFO  # touched\n", 1)
+
+    assert watcher.poll() == set()
+    assert calls == []
+    watcher.stop()
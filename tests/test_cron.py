@@ -0,0 +1,54 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils import scheduler
+from utils.cron import CronError, CronExpression, IntervalSchedule, parse_schedule
+
+START = datetime(2026, 10, 18, 8, 7, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("schedule, expression", [
+    ("daily", "0 9 * * *"),
+    ("hourly", "0 * * * *"),
+    ("every 30 minutes", "*/30 * * * *"),
+    ("every 120 minutes", "0 */2 * * *"),
+    ("15 6 * * 1-5", "15 6 * * 1-5"),
+])
+def test_cron_expressible_schedules(schedule, expression):
+    parsed = parse_schedule(schedule)
+    assert isinstance(parsed, CronExpression)
+    assert parsed.expression == expression
+
+
+@pytest.mark.parametrize("minutes", [45, 90])
+def test_uneven_minute_schedules_run_at_a_fixed_interval(minutes):
+    parsed = parse_schedule(f"every {minutes} minutes")
+    assert isinstance(parsed, IntervalSchedule)
+
+    first = parsed.next_after(START)
+    second = parsed.next_after(first)
+    assert START < first <= START + timedelta(minutes=minutes)
+    assert second - first == timedelta(minutes=minutes)
+
+
+@pytest.mark.parametrize("schedule", ["every minutes", "every 0 minutes", "whenever"])
+def test_malformed_schedules_are_rejected(schedule):
+    with pytest.raises(CronError):
+        parse_schedule(schedule)
+
+
+def test_load_jobs_keeps_legacy_interval_schedules(monkeypatch, caplog):
+    monkeypatch.setattr(scheduler, "discover_automations", lambda: [])
+    config = {"schedules": [
+        {"script": "scheduled/a.py", "schedule": "every 45 minutes"},
+        {"script": "scheduled/b.py", "schedule": "every 30 minutes"},
+    ]}
+    logger = logging.getLogger("test_cron")
+
+    with caplog.at_level(logging.WARNING, logger="test_cron"):
+        jobs = scheduler.load_jobs(config, logger)
+
+    assert [job.cron.expression for job in jobs] == ["every 45 minutes", "*/30 * * * *"]
+    assert "scheduled/a.py" in caplog.text and "scheduled/b.py" not in caplog.text
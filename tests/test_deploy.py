@@ -0,0 +1,160 @@
+import sys
+
+import pytest
+
+import deploy
+from utils.discovery import discover_automations, discovery_errors
+from gcp_fakes import deployed_job, deployed_service, deployed_trigger, fake_clients
+
+DAILY = {"name": "daily", "type": "scheduled", "file": "scheduled/daily.py",
+         "schedule": "0 9 * * *", "timezone": "Europe/Berlin"}
+BACKFILL = {"name": "backfill", "type": "manual", "file": "manual/backfill.py"}
+WEBHOOK = {"name": "webhook", "type": "triggered", "file": "triggered/webhook.py",
+           "path": "/webhook"}
+
+
+@pytest.fixture(autouse=True)
+def no_google_cloud(monkeypatch):
+    # Planning must not need the deploy-only google-cloud packages
+    for module in ("google", "google.cloud", "google.cloud.run_v2", "google.cloud.scheduler"):
+        monkeypatch.setitem(sys.modules, module, None)
+
+
+def plan(automations, clients):
+    changes = deploy.plan_sync(automations, deploy.fetch_actual(clients), clients)
+    return sorted((c.action, c.kind, c.name) for c in changes)
+
+
+def test_creates_missing_resources():
+    clients = fake_clients()
+    changes = deploy.plan_sync(
+        [DAILY, BACKFILL, WEBHOOK], deploy.fetch_actual(clients), clients
+    )
+
+    assert sorted((c.action, c.kind, c.name) for c in changes) == [
+        ("create", "job", "backfill"),
+        ("create", "job", "daily"),
+        ("create", "scheduler", "daily-trigger"),
+        ("create", "service", deploy.TRIGGERED_SERVICE),
+    ]
+    assert deploy.apply_plan(changes) == []
+    assert sorted(clients.jobs.calls) == [("create", "backfill"), ("create", "daily")]
+    assert clients.scheduler.calls == [("create", "daily-trigger")]
+    assert clients.services.calls == [("create", deploy.TRIGGERED_SERVICE)]
+    # A second sync finds everything in place
+    assert plan([DAILY, BACKFILL, WEBHOOK], clients) == []
+
+
+def test_unchanged_spec_hash_is_skipped():
+    clients = fake_clients(
+        jobs=[deployed_job(DAILY), deployed_job(BACKFILL)],
+        schedulers=[deployed_trigger(DAILY)],
+        services=[deployed_service()],
+    )
+
+    assert plan([DAILY, BACKFILL, WEBHOOK], clients) == []
+
+
+def test_new_image_updates_jobs_and_service():
+    old = f"{deploy.IMAGE_REPO}:abc123"
+    clients = fake_clients(
+        jobs=[deployed_job(DAILY, old), deployed_job(BACKFILL, old)],
+        schedulers=[deployed_trigger(DAILY)],
+        services=[deployed_service(old)],
+    )
+    actual = deploy.fetch_actual(clients)
+
+    assert deploy.plan_sync([DAILY, BACKFILL, WEBHOOK], actual, clients, old) == []
+    changes = deploy.plan_sync(
+        [DAILY, BACKFILL, WEBHOOK], actual, clients, f"{deploy.IMAGE_REPO}:def456"
+    )
+    assert sorted((c.action, c.kind, c.name) for c in changes) == [
+        ("update", "job", "backfill"),
+        ("update", "job", "daily"),
+        ("update", "service", deploy.TRIGGERED_SERVICE),
+    ]
+
+
+def test_updates_changed_resources():
+    moved = {**DAILY, "schedule": "30 7 * * *"}
+    clients = fake_clients(
+        jobs=[deployed_job(DAILY, **{deploy.HASH_LABEL: "stale"})],
+        schedulers=[deployed_trigger(DAILY)],
+        services=[deployed_service(**{deploy.HASH_LABEL: "stale"})],
+    )
+
+    changes = deploy.plan_sync([moved, WEBHOOK], deploy.fetch_actual(clients), clients)
+    assert sorted((c.action, c.kind, c.name) for c in changes) == [
+        ("update", "job", "daily"),
+        ("update", "scheduler", "daily-trigger"),
+        ("update", "service", deploy.TRIGGERED_SERVICE),
+    ]
+    assert deploy.apply_plan(changes) == []
+    assert plan([moved, WEBHOOK], clients) == []
+
+
+def test_destroys_managed_resources_whose_script_is_gone():
+    clients = fake_clients(
+        jobs=[deployed_job(DAILY), deployed_job(BACKFILL)],
+        schedulers=[deployed_trigger(DAILY)],
+    )
+
+    changes = deploy.plan_sync([BACKFILL], deploy.fetch_actual(clients), clients)
+    assert sorted((c.action, c.kind, c.name) for c in changes) == [
+        ("delete", "job", "daily"),
+        ("delete", "scheduler", "daily-trigger"),
+    ]
+    assert deploy.apply_plan(changes) == []
+    assert [deploy._short_name(name) for name in clients.jobs.resources] == ["backfill"]
+    assert clients.scheduler.resources == {}
+
+
+def test_trigger_removed_when_job_is_no_longer_scheduled():
+    clients = fake_clients(jobs=[deployed_job(DAILY)], schedulers=[deployed_trigger(DAILY)])
+
+    assert plan([{**DAILY, "type": "manual"}], clients) == [
+        ("delete", "scheduler", "daily-trigger"),
+    ]
+
+
+def test_unlabelled_resources_are_left_alone():
+    legacy = {"name": "legacy", "type": "scheduled", "file": "scheduled/legacy.py",
+              "schedule": "0 * * * *"}
+    job = deployed_job(legacy)
+    job.labels = {}  # Created by hand, not by deploy.py
+    clients = fake_clients(jobs=[job], schedulers=[deployed_trigger(legacy)])
+
+    assert plan([DAILY], clients) == [
+        ("create", "job", "daily"),
+        ("create", "scheduler", "daily-trigger"),
+    ]
+
+
+def test_cmd_sync_dry_run_prints_plan_without_applying(monkeypatch, capsys):
+    clients = fake_clients(jobs=[deployed_job(BACKFILL)])
+    monkeypatch.setattr(deploy, "discover_automations", lambda: [DAILY, BACKFILL])
+    monkeypatch.setattr(deploy, "discovery_errors", lambda: {})
+
+    deploy.cmd_sync(dry_run=True, clients=clients)
+
+    output = capsys.readouterr().out
+    assert "+ job daily" in output
+    assert "Plan: 2 to add, 0 to change, 0 to destroy, 1 unchanged." in output
+    assert clients.jobs.calls == [] and clients.scheduler.calls == []
+
+
+def test_cmd_sync_refuses_to_run_with_invalid_frontmatter(tmp_path, monkeypatch, capsys):
+    (tmp_path / "scheduled").mkdir()
+    (tmp_path / "scheduled" / "daily.py").write_text(
+        '"""\n---\nname: daily\ntype: scheduled\nschedule: "0 9 * * *"\n'
+        'timezone: Mars/Base\n---\n"""\n'
+    )
+    monkeypatch.setattr(deploy, "discover_automations", lambda: discover_automations(tmp_path))
+    monkeypatch.setattr(deploy, "discovery_errors", lambda: discovery_errors(tmp_path))
+    clients = fake_clients(jobs=[deployed_job(DAILY)], schedulers=[deployed_trigger(DAILY)])
+
+    with pytest.raises(SystemExit, match="invalid frontmatter"):
+        deploy.cmd_sync(clients=clients)
+
+    assert "scheduled/daily.py: unknown timezone: Mars/Base" in capsys.readouterr().out
+    assert clients.jobs.calls == [] and clients.scheduler.calls == []
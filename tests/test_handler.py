@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import pytest
+
+from triggered import handler
+
+ROUTES = {"/echo": "triggered/echo.py", "/later": "triggered/later.py"}
+AUTOMATIONS = {
+    "/echo": {"name": "echo", "file": "triggered/echo.py"},
+    "/later": {"name": "later", "file": "triggered/later.py", "mode": "async"},
+}
+
+
+class FakeJobs:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, route, file_path, payload):
+        self.submitted.append((route, payload))
+        return "job-1"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(handler, "ROUTES", ROUTES)
+    monkeypatch.setattr(handler, "AUTOMATIONS", AUTOMATIONS)
+    monkeypatch.setattr(handler, "JOBS", FakeJobs())
+    monkeypatch.setattr(
+        handler, "get_automation", lambda file_path: SimpleNamespace(main=lambda payload: payload)
+    )
+    return handler.app.test_client()
+
+
+@pytest.mark.parametrize("route", ["/echo", "/later"])
+def test_malformed_json_body_is_a_400(client, route):
+    response = client.post(route, data=b'{"broken": ', content_type="application/json")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "invalid JSON body"}
+    assert handler.JOBS.submitted == []
+
+
+def test_json_body_reaches_the_automation(client):
+    response = client.post("/echo", json={"x": 1})
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "success", "result": {"x": 1}}
+
+    assert client.post("/later", json={"x": 2}).status_code == 202
+    assert handler.JOBS.submitted == [("/later", {"x": 2})]
@@ -0,0 +1,42 @@
+import pytest
+
+from utils import history
+from utils.history import RunHistory, track_run
+
+
+@pytest.fixture
+def runs(tmp_path, monkeypatch):
+    store = RunHistory(str(tmp_path / "history.sqlite"))
+    monkeypatch.setattr(history, "_history", store)
+    monkeypatch.setattr(history, "_history_loaded", True)
+    yield store
+    store.close()
+
+
+def latest(store: RunHistory) -> dict:
+    return store.recent("job", 1)[0]
+
+
+def test_normal_exit_is_a_success(runs):
+    with track_run("job", "test"):
+        pass
+
+    assert latest(runs)["status"] == "success"
+
+
+def test_status_set_by_the_body_is_kept(runs):
+    with track_run("job", "test") as run:
+        run.note_error("exceeded 5s timeout", status="timed_out")
+
+    assert latest(runs)["status"] == "timed_out"
+    assert latest(runs)["error"] == "exceeded 5s timeout"
+
+
+@pytest.mark.parametrize("exception", [ValueError("bad"), SystemExit(3), KeyboardInterrupt()])
+def test_any_exception_is_an_error(runs, exception):
+    with pytest.raises(type(exception)):
+        with track_run("job", "test"):
+            raise exception
+
+    assert latest(runs)["status"] == "error"
+    assert latest(runs)["error"].startswith(type(exception).__name__)
@@ -0,0 +1,37 @@
+import pytest
+
+from utils.jobs import JobQueue
+
+
+EXCEPTIONS = {
+    "error": RuntimeError("boom"),
+    "exit": SystemExit(3),
+    "interrupt": KeyboardInterrupt(),
+}
+
+
+def raising_runner(job):
+    raise EXCEPTIONS[job["payload"]]
+
+
+@pytest.mark.parametrize("kind", EXCEPTIONS)
+def test_job_that_raises_is_marked_failed(tmp_path, kind):
+    path = str(tmp_path / "queue.jsonl")
+    queue = JobQueue(raising_runner, path=path, workers=1)
+    job_id = queue.submit("/route", "triggered/route.py", kind)
+    queue.shutdown(wait=True)
+
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["finished_at"] is not None
+    # The journal agrees, so a restart doesn't treat it as interrupted
+    assert JobQueue(raising_runner, path=path).get(job_id)["status"] == "failed"
+
+
+def test_job_result_is_recorded(tmp_path):
+    queue = JobQueue(lambda job: {"echo": job["payload"]}, path=str(tmp_path / "q.jsonl"))
+    job_id = queue.submit("/route", "triggered/route.py", 1)
+    queue.shutdown(wait=True)
+
+    assert queue.get(job_id)["status"] == "succeeded"
+    assert queue.get(job_id)["result"] == {"echo": 1}
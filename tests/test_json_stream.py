@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from utils.json_stream import NEXT_PAGE_KEY, ListStreamParser
+
+BODY = {
+    "cursor": 17,
+    "messages": [
+        {"id": "m1", "subject": 'Quote " and backslash \\ and ] } [ {', "labels": ["a", "b"]},
+        {"id": "m2", "subject": "café ☃ \\u escaped", "thread": [[1, 2], [], [[3]]]},
+        {"id": "m3", "messages": [{"nested": "same key as the list"}], "size": 1234567},
+        [],
+        "plain string item, with: punctuation",
+        -12.5e3,
+        None,
+    ],
+    "count": 7,
+    NEXT_PAGE_KEY: "token-\"2\"",
+}
+
+
+def parse(text: str, chunk_size: int) -> tuple[list, ListStreamParser]:
+    parser = ListStreamParser("messages")
+    items = []
+    for start in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[start:start + chunk_size]))
+    items.extend(parser.close())
+    return items, parser
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 10_000])
+def test_any_chunking_yields_the_same_items_and_meta(chunk_size, ensure_ascii):
+    # ensure_ascii=True splits \uXXXX escapes across chunks; indent adds whitespace
+    text = json.dumps(BODY, ensure_ascii=ensure_ascii, indent=1)
+
+    items, parser = parse(text, chunk_size)
+
+    assert items == BODY["messages"]
+    assert parser.items == len(BODY["messages"])
+    assert parser.meta == {"cursor": 17, "count": 7, NEXT_PAGE_KEY: 'token-"2"'}
+
+
+def test_items_are_returned_before_the_body_ends():
+    parser = ListStreamParser("messages")
+
+    assert parser.feed('{"messages": [{"id": 1}, {"id"') == [{"id": 1}]
+    assert parser.feed(': 2}, {"id": 3}], "count": 1') == [{"id": 2}, {"id": 3}]
+    assert parser.feed('2}') == []
+    assert parser.close() == []
+    assert parser.meta == {"count": 12}
+
+
+def test_missing_list_key_is_an_empty_list():
+    items, parser = parse('{"events": [1, 2], "next_page_token": null}', 4)
+    assert items == []
+    assert parser.meta == {"events": [1, 2], NEXT_PAGE_KEY: None}
+
+
+def test_truncated_body_raises_on_close():
+    text = json.dumps(BODY)
+    for end in range(len(text)):
+        parser = ListStreamParser("messages")
+        parser.feed(text[:end])
+        with pytest.raises(ValueError):
+            parser.close()
+
+
+@pytest.mark.parametrize("text", [
+    '["messages"]',
+    '{"messages" [1]}',
+    '{"messages": [1 2]}',
+    '{"messages": [1,, 2]}',
+    '{"messages": [1,]}',
+    '{"messages": [,1]}',
+    '{"a": 1 "messages": []}',
+    '{, "messages": []}',
+    '{"messages": [], }',
+    '{messages: []}',
+    '{"messages": [1]} trailing',
+])
+def test_malformed_body_raises(text):
+    parser = ListStreamParser("messages")
+    with pytest.raises(ValueError):
+        parser.feed(text)
+        parser.close()
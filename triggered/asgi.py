@@ -0,0 +1,267 @@
+"""ASGI server for triggered automations.
+
+Runs ``async def main()`` automations on the event loop and sync ones on a
+bounded thread pool, so a slow automation waiting on the gateway does not tie
+up a whole worker. Each route has a concurrency limit and a queue-depth cap;
+requests beyond the cap get 429, and beyond the service-wide cap 503.
+
+Run with:
+    uvicorn triggered.asgi:app --port 8080
+    gunicorn -k uvicorn.workers.UvicornWorker triggered.asgi:app
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from triggered.handler import (
+    AUTOMATIONS,
+    CONFIG,
+    JOBS,
+    PREWARM_ERRORS,
+    ROUTES,
+    client_kwargs,
+    get_automation,
+    is_background,
+)
+from utils.async_gateway import AsyncGatewayClient
+from utils.cache import CompletionCache, ResponseCache
+from utils.gateway import close_clients
+from utils.history import get_history, track_run
+from utils.notifications import NotificationRules
+from utils.retry import GatewayPolicy
+from utils.script import accepts_client
+from utils.tracing import span
+
+_config = CONFIG.get("triggered") or {}
+
+MAX_WORKERS = _config.get("max_workers", 8)
+MAX_CONCURRENCY = _config.get("max_concurrency", 4)
+MAX_QUEUE = _config.get("max_queue", 16)
+MAX_PENDING = _config.get("max_pending", 64)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="automation")
+
+
+class RouteLimiter:
+    """Concurrency limit plus a cap on how many requests may wait for a slot."""
+
+    def __init__(self, concurrency: int, max_queue: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the server's running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    @property
+    def full(self) -> bool:
+        return self.active >= self.concurrency and self.waiting >= self.max_queue
+
+
+_limiters = {
+    path: RouteLimiter(
+        meta.get("concurrency", MAX_CONCURRENCY), meta.get("max_queue", MAX_QUEUE)
+    )
+    for path, meta in AUTOMATIONS.items()
+}
+_pending = 0
+# Pooled async client for async main(payload, client=...), bound to the server's loop
+_async_client: AsyncGatewayClient | None = None
+
+
+def _get_async_client() -> AsyncGatewayClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncGatewayClient(
+            cache=ResponseCache.from_config(CONFIG, backend="memory"),
+            policy=GatewayPolicy.from_config(CONFIG),
+            completions=CompletionCache.from_config(CONFIG),
+            notifications=NotificationRules.from_config(CONFIG),
+        )
+    return _async_client
+
+
+async def run_automation(module, payload: dict | None):
+    """Await async main() directly; run sync main() on the bounded thread pool."""
+    if inspect.iscoroutinefunction(module.main):
+        if accepts_client(module.main):
+            return await module.main(payload, client=_get_async_client())
+        return await module.main(payload)
+    loop = asyncio.get_running_loop()
+    # Copy the context so spans opened in the worker thread nest under this request
+    call = functools.partial(
+        contextvars.copy_context().run, module.main, payload, **client_kwargs(module.main)
+    )
+    return await loop.run_in_executor(_executor, call)
+
+
+async def _send_json(send, status: int, body: dict, headers: list | None = None) -> None:
+    try:
+        data = json.dumps(body).encode()
+    except (TypeError, ValueError) as e:  # e.g. an automation returned a datetime or a set
+        status = 500
+        data = json.dumps({"error": f"result is not JSON-serializable: {e}"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), *(headers or [])],
+    })
+    await send({"type": "http.response.body", "body": data})
+
+
+async def _read_json(scope, receive) -> dict | None:
+    """Parse a JSON request body; raises ValueError (JSON or UTF-8 decoding) if malformed."""
+    headers = dict(scope.get("headers") or [])
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    if not body or not headers.get(b"content-type", b"").startswith(b"application/json"):
+        return None
+    return json.loads(body)
+
+
+async def _send_runs(send, name: str, scope) -> None:
+    """GET /automations/<name>/runs, as in triggered/handler.py."""
+    history = get_history(CONFIG)
+    if history is None:
+        await _send_json(send, 404, {"error": "run history is disabled"})
+        return
+    query = parse_qs(scope.get("query_string", b"").decode())
+    try:
+        limit = min(int(query.get("limit", ["50"])[0]), 500)
+        window = float(query.get("window", ["86400"])[0])
+    except ValueError:
+        await _send_json(send, 400, {"error": "limit and window must be numbers"})
+        return
+    await _send_json(send, 200, {
+        "automation": name,
+        "stats": history.stats(name, window),
+        "runs": history.recent(name, limit),
+    })
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # Let in-flight sync automations finish without blocking the event loop
+            await asyncio.to_thread(_executor.shutdown, wait=True)
+            JOBS.shutdown(wait=False)
+            if _async_client is not None:
+                await _async_client.aclose()
+            close_clients()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    global _pending
+
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    path = scope["path"]
+    if path == "/health":
+        status = "degraded" if PREWARM_ERRORS else "healthy"
+        await _send_json(send, 200, {
+            "status": status,
+            "routes": list(ROUTES.keys()),
+            "errors": PREWARM_ERRORS,
+            "pending": _pending,
+        })
+        return
+
+    if path.startswith("/jobs/") and scope["method"] == "GET":
+        job = JOBS.get(path.removeprefix("/jobs/"))
+        if job is None:
+            await _send_json(send, 404, {"error": "job not found"})
+        else:
+            await _send_json(send, 200, job)
+        return
+
+    if path.startswith("/automations/") and path.endswith("/runs") and scope["method"] == "GET":
+        await _send_runs(send, path.removeprefix("/automations/").removesuffix("/runs"), scope)
+        return
+
+    if path not in ROUTES:
+        await _send_json(send, 404, {"error": "not found", "routes": list(ROUTES.keys())})
+        return
+    if scope["method"] not in ("GET", "POST"):
+        await _send_json(send, 405, {"error": "method not allowed"})
+        return
+
+    if is_background(path):
+        try:
+            payload = await _read_json(scope, receive)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            await _send_json(send, 400, {"error": "invalid JSON body"})
+            return
+        job_id = JOBS.submit(path, ROUTES[path], payload)
+        await _send_json(send, 202, {
+            "status": "accepted",
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}",
+        })
+        return
+
+    limiter = _limiters[path]
+    if _pending >= MAX_PENDING:
+        await _send_json(send, 503, {"error": "service busy"}, [(b"retry-after", b"1")])
+        return
+    if limiter.full:
+        await _send_json(send, 429, {"error": "too many requests"}, [(b"retry-after", b"1")])
+        return
+
+    _pending += 1
+    limiter.waiting += 1
+    queued = True
+    try:
+        try:
+            payload = await _read_json(scope, receive)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            await _send_json(send, 400, {"error": "invalid JSON body"})
+            return
+
+        async with limiter.semaphore:
+            limiter.waiting -= 1
+            queued = False
+            limiter.active += 1
+            try:
+                module = get_automation(ROUTES[path])
+                if not hasattr(module, "main"):
+                    await _send_json(send, 500, {"error": "no main() function"})
+                    return
+                with (
+                    span("handle_request", route=path, method=scope["method"]),
+                    track_run(AUTOMATIONS[path]["name"], "handler", CONFIG),
+                ):
+                    result = await run_automation(module, payload)
+            except Exception as e:
+                await _send_json(send, 500, {"error": str(e)})
+                return
+            finally:
+                limiter.active -= 1
+        await _send_json(send, 200, {"status": "success", "result": result})
+    finally:
+        if queued:
+            limiter.waiting -= 1
+        _pending -= 1
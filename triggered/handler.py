@@ -1,70 +1,241 @@
 """Flask handler for triggered automations."""
 
+import asyncio
+import hashlib
 import importlib.util
+import inspect
+import os
 import re
 import sys
+import threading
 from pathlib import Path
+from types import ModuleType
 
-import yaml
 from flask import Flask, jsonify, request
+from werkzeug.exceptions import BadRequest
+
+from utils.config_loader import load_config, watch_config
+from utils.discovery import discover_automations
+from utils.gateway import get_client
+from utils.history import get_history, track_run
+from utils.jobs import JobQueue
+from utils.logger import apply_config as apply_logging_config, setup_logger
+from utils.script import accepts_client
+from utils.tracing import configure as configure_tracing, span
 
 app = Flask(__name__)
 BASE_PATH = Path(__file__).parent.parent
+CONFIG = load_config(str(BASE_PATH / "config" / "config.yaml"))
+configure_tracing(CONFIG)
+logger = setup_logger(__name__, CONFIG)
+
+
+def on_config_change(config, changed: set[str]) -> None:
+    """CONFIG is refreshed in place; re-apply the settings that were read at startup."""
+    if "logging" in changed:
+        apply_logging_config(config)
+    if "tracing" in changed:
+        configure_tracing(config)
+
+
+_watch = CONFIG.get("config_watch") or {}
+if _watch.get("enabled", True):
+    watch_config(on_config_change, str(CONFIG.path), _watch.get("interval", 2.0))
+
+# Re-check script mtimes on every request (local development only)
+RELOAD_MODULES = os.getenv("AUTOMATIONS_RELOAD", "").lower() in ("1", "true", "yes")
 
+# file path -> (module, mtime, content hash)
+_modules: dict[str, tuple[ModuleType, float, str]] = {}
+_modules_lock = threading.Lock()
 
-def load_automation(file_path: str):
+
+def _module_name(file_path: str) -> str:
+    """Give each automation its own sys.modules entry so routes don't clobber each other."""
+    return "automation_" + re.sub(r"\W", "_", str(Path(file_path).with_suffix("")))
+
+
+def load_automation(file_path: str) -> ModuleType:
     """Dynamically load an automation module."""
     full_path = BASE_PATH / file_path
-    spec = importlib.util.spec_from_file_location("automation", full_path)
+    name = _module_name(file_path)
+    spec = importlib.util.spec_from_file_location(name, full_path)
     module = importlib.util.module_from_spec(spec)
-    sys.modules["automation"] = module
     spec.loader.exec_module(module)
+    sys.modules[name] = module
     return module
 
 
-def discover_routes() -> dict[str, str]:
+def get_automation(file_path: str) -> ModuleType:
+    """Return the cached module for an automation, loading it on first use.
+
+    With AUTOMATIONS_RELOAD set, a changed mtime triggers a content hash check
+    and the module is reloaded only if the source actually changed.
+    """
+    cached = _modules.get(file_path)
+    if cached is not None and not RELOAD_MODULES:
+        return cached[0]
+
+    with _modules_lock:
+        cached = _modules.get(file_path)
+        full_path = BASE_PATH / file_path
+        mtime = full_path.stat().st_mtime
+        if cached is not None and cached[1] == mtime:
+            return cached[0]
+
+        digest = hashlib.sha256(full_path.read_bytes()).hexdigest()
+        if cached is not None and cached[2] == digest:
+            _modules[file_path] = (cached[0], mtime, digest)
+            return cached[0]
+
+        module = load_automation(file_path)
+        _modules[file_path] = (module, mtime, digest)
+        return module
+
+
+def prewarm(routes: dict[str, str]) -> dict[str, str]:
+    """Load every route's module up front; return errors keyed by route."""
+    errors = {}
+    for path, file_path in routes.items():
+        try:
+            get_automation(file_path)
+        except Exception as e:
+            errors[path] = str(e)
+            logger.error(f"Failed to pre-warm {path} ({file_path}): {e}")
+    return errors
+
+
+def discover_triggered() -> dict[str, dict]:
+    """Discover triggered automations, keyed by route, with their frontmatter."""
+    return {
+        auto.get("path", f"/{auto['name']}"): auto
+        for auto in discover_automations(BASE_PATH)
+        if auto.get("type") == "triggered"
+    }
+
+
+def discover_routes(automations: dict[str, dict] | None = None) -> dict[str, str]:
     """Discover triggered automations and their routes from frontmatter."""
-    routes = {}
-    triggered_path = BASE_PATH / "triggered"
-    
-    for py_file in triggered_path.glob("*.py"):
-        if py_file.name.startswith("_") or py_file.name == "handler.py":
-            continue
-        
-        content = py_file.read_text(encoding="utf-8")
-        match = re.search(r'^"""[\s]*---\s*(.*?)\s*---[\s]*"""', content, re.DOTALL)
-        
-        if match:
-            try:
-                fm = yaml.safe_load(match.group(1))
-                if fm.get("type") == "triggered" and fm.get("enabled", True):
-                    path = fm.get("path", f"/{fm['name']}")
-                    routes[path] = str(py_file.relative_to(BASE_PATH))
-            except yaml.YAMLError:
-                continue
-    
-    return routes
-
-
-ROUTES = discover_routes()
+    automations = discover_triggered() if automations is None else automations
+    return {path: meta["file"] for path, meta in automations.items()}
+
+
+def client_kwargs(main) -> dict:
+    """Inject the shared pooled GatewayClient into a sync ``main(payload, client=...)``."""
+    if inspect.iscoroutinefunction(main) or not accepts_client(main):
+        return {}
+    return {"client": get_client(CONFIG, cache_backend="memory")}
+
+
+def call_main(module: ModuleType, payload: dict | None):
+    """Call an automation's main(), driving it to completion if it is a coroutine."""
+    result = module.main(payload, **client_kwargs(module.main))
+    if inspect.iscoroutine(result):
+        result = asyncio.run(result)
+    return result
+
+
+def run_job(job: dict):
+    """Execute a queued background job (``mode: async`` automations)."""
+    name = AUTOMATIONS.get(job["route"], {}).get("name", job["route"])
+    with (
+        span("run_job", route=job["route"], job_id=job["id"]),
+        track_run(name, "job", CONFIG),
+    ):
+        module = get_automation(job["file"])
+        if not hasattr(module, "main"):
+            raise RuntimeError("no main() function")
+        return call_main(module, job["payload"])
+
+
+def is_background(path: str) -> bool:
+    return AUTOMATIONS[path].get("mode") == "async"
+
+
+AUTOMATIONS = discover_triggered()
+ROUTES = discover_routes(AUTOMATIONS)
+PREWARM_ERRORS = prewarm(ROUTES)
+
+_jobs_config = (CONFIG.get("triggered") or {}).get("jobs") or {}
+JOBS = JobQueue(
+    run_job,
+    path=str(BASE_PATH / _jobs_config.get("path", ".jobs/queue.jsonl")),
+    workers=_jobs_config.get("workers", 4),
+    retention=_jobs_config.get("retention", 500),
+    # Jobs cut off by a restart are only re-run for automations that opt in
+    requeue=lambda job: bool(AUTOMATIONS.get(job["route"], {}).get("requeue_interrupted")),
+)
 
 
 @app.route("/health")
 def health():
-    return jsonify({"status": "healthy", "routes": list(ROUTES.keys())})
+    status = "degraded" if PREWARM_ERRORS else "healthy"
+    return jsonify({"status": status, "routes": list(ROUTES.keys()), "errors": PREWARM_ERRORS})
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job)
+
+
+@app.route("/automations/<name>/runs")
+def automation_runs(name):
+    """Recent runs of an automation plus p50/p95 duration over a window.
+
+    Query params: ``limit`` (default 50) and ``window`` in seconds (default 86400).
+    """
+    history = get_history(CONFIG)
+    if history is None:
+        return jsonify({"error": "run history is disabled"}), 404
+    try:
+        limit = min(int(request.args.get("limit", 50)), 500)
+        window = float(request.args.get("window", 86400))
+    except ValueError:
+        return jsonify({"error": "limit and window must be numbers"}), 400
+
+    return jsonify({
+        "automation": name,
+        "stats": history.stats(name, window),
+        "runs": history.recent(name, limit),
+    })
 
 
 @app.route("/<path:path>", methods=["GET", "POST"])
 def handle_request(path):
     full_path = f"/{path}"
-    
+    with span("handle_request", route=full_path, method=request.method) as request_span:
+        response = _dispatch(full_path)
+        request_span.set(status_code=response[1] if isinstance(response, tuple) else 200)
+        return response
+
+
+def _dispatch(full_path: str):
     if full_path not in ROUTES:
         return jsonify({"error": "not found", "routes": list(ROUTES.keys())}), 404
-    
     try:
-        module = load_automation(ROUTES[full_path])
+        payload = request.get_json() if request.is_json else None
+    except BadRequest:
+        return jsonify({"error": "invalid JSON body"}), 400
+
+    if is_background(full_path):
+        job_id = JOBS.submit(full_path, ROUTES[full_path], payload)
+        return jsonify({
+            "status": "accepted",
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}",
+        }), 202
+
+    try:
+        module = get_automation(ROUTES[full_path])
         if hasattr(module, "main"):
-            result = module.main(request.json if request.is_json else None)
+            with (
+                span("automation.main", file=ROUTES[full_path]),
+                track_run(AUTOMATIONS[full_path]["name"], "handler", CONFIG),
+            ):
+                result = call_main(module, payload)
             return jsonify({"status": "success", "result": result})
         return jsonify({"error": "no main() function"}), 500
     except Exception as e:
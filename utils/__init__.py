@@ -1,5 +1,34 @@
-"""Shared utilities for automation scripts."""
+"""Shared utilities for automation scripts.
 
-from .config_loader import load_config
-from .logger import setup_logger
-from .gateway import GatewayClient
+Names are imported lazily on first access, so importing one submodule (e.g.
+utils.config_loader) doesn't pay for httpx and the gateway client.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "load_config": ".config_loader",
+    "setup_logger": ".logger",
+    "GatewayClient": ".gateway",
+    "get_client": ".gateway",
+    "AsyncGatewayClient": ".async_gateway",
+    "gather_context": ".async_gateway",
+    "ResponseCache": ".cache",
+    "CompletionCache": ".cache",
+    "ContextBuilder": ".context_builder",
+    "EmailMessage": ".models",
+    "Event": ".models",
+    "Task": ".models",
+    "NotificationDispatcher": ".notifications",
+    "GatewayPolicy": ".retry",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
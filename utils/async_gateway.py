@@ -0,0 +1,477 @@
+"""Async API Gateway client and concurrent context fetching."""
+
+import asyncio
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator
+
+import httpx
+
+from .gateway import (
+    _BaseGatewayClient, _calendar_request, _chat_payload, _note_cache, _note_sync,
+)
+from .tracing import span, traced
+
+if TYPE_CHECKING:
+    from . import models
+    from .gateway import GatewayClient
+    from .cache import CompletionCache, ResponseCache
+    from .notifications import NotificationRules
+    from .retry import GatewayPolicy
+    from .streaming import AsyncCachedChatStream, AsyncChatStream
+
+
+class AsyncGatewayClient(_BaseGatewayClient):
+    """Async counterpart of GatewayClient with the same method surface."""
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        cache: "ResponseCache | None" = None,
+        policy: "GatewayPolicy | None" = None,
+        completions: "CompletionCache | None" = None,
+        notifications: "NotificationRules | None" = None,
+    ):
+        super().__init__(base_url, api_key, cache, policy, completions)
+        if notifications is not None:
+            from .notifications import NotificationDispatcher
+
+            self.notifier = NotificationDispatcher(self._send_from_thread, notifications)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.policy.timeout_for("default"),
+            headers=self._headers,
+            http2=self.policy.http2(),
+            limits=self.policy.limits(),
+        )
+        self._revalidating: dict[str, asyncio.Task] = {}
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        endpoint: str = "default",
+        idempotent: bool = True,
+        stream: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        from .history import gateway_call
+
+        breaker = self._breaker(path)
+        self.stats.requests += 1
+        attempt = 0
+        with (
+            span("gateway.request", method=method, path=path) as request_span,
+            gateway_call(path),
+        ):
+            while True:
+                attempt += 1
+                request_span.set(attempts=attempt)
+                self._check_breaker(breaker, path)
+                request = self._client.build_request(
+                    method, path, timeout=self.policy.timeout_for(endpoint), **kwargs
+                )
+                try:
+                    response = await self._client.send(request, stream=stream)
+                except httpx.TransportError as e:
+                    delay = self._retry_delay(breaker, attempt, idempotent, error=e)
+                    if delay is None:
+                        raise
+                else:
+                    request_span.set(status_code=response.status_code)
+                    delay = self._retry_delay(breaker, attempt, idempotent, response=response)
+                    if delay is None and not response.is_error:
+                        return response
+                    await response.aclose()
+                    if delay is None:
+                        response.raise_for_status()
+                await asyncio.sleep(delay)
+
+    async def _fetch(self, path: str, params: dict | None = None) -> dict:
+        from . import models
+
+        data = models.loads((await self._request("GET", path, params=params)).content)
+        if self.cache is not None:
+            self.cache.store(path, params, data)
+        return data
+
+    async def _get(self, path: str, params: dict | None = None) -> dict:
+        if self.cache is None:
+            return await self._fetch(path, params)
+
+        hit = self.cache.lookup(path, params)
+        _note_cache(hit[1] if hit else "miss")
+        if hit is None:
+            return await self._fetch(path, params)
+
+        value, state = hit
+        if state == "stale":
+            from .cache import cache_key
+
+            key = cache_key(path, params)
+            if key not in self._revalidating:
+                task = asyncio.create_task(self._fetch(path, params))
+                task.add_done_callback(lambda _: self._revalidating.pop(key, None))
+                self._revalidating[key] = task
+        return value
+
+    @traced("gateway.notify")
+    async def notify(self, title: str, message: str, priority: int = 0) -> dict:
+        """Send a push notification via the gateway, coalesced like GatewayClient.notify()."""
+        if self.notifier is None:
+            return await self.send_notification(title, message, priority)
+        self._loop = asyncio.get_running_loop()
+        # A full or urgent digest is sent by waiting on this loop, so submit off it
+        return await asyncio.to_thread(self.notifier.submit, title, message, priority)
+
+    def _send_from_thread(self, title: str, message: str, priority: int) -> dict:
+        # The dispatcher sends from its own thread (or a to_thread worker)
+        return asyncio.run_coroutine_threadsafe(
+            self.send_notification(title, message, priority), self._loop
+        ).result()
+
+    async def send_notification(self, title: str, message: str, priority: int = 0) -> dict:
+        """Send a push notification now, bypassing coalescing."""
+        response = await self._request(
+            "POST",
+            "/notify",
+            endpoint="notify",
+            idempotent=False,
+            json={"title": title, "message": message, "priority": priority},
+            headers={"Idempotency-Key": os.urandom(16).hex()},
+        )
+        return response.json()
+
+    @traced("gateway.health")
+    async def health(self) -> dict:
+        """Get gateway health status."""
+        return await self._get("/health")
+
+    @traced("gateway.integrations")
+    async def integrations(self) -> dict:
+        """Get integration status."""
+        return await self._get("/health/integrations")
+
+    @traced("gateway.context_now")
+    async def context_now(self) -> dict:
+        """Get aggregated context snapshot."""
+        return await self._get("/context/now")
+
+    @traced("gateway.ai_chat")
+    async def ai_chat(
+        self,
+        messages: list[dict],
+        model: str | None = None,
+        stream: bool = False,
+        cache: bool = True,
+    ) -> dict:
+        """Send a chat completion request."""
+        if stream:
+            return await self.ai_chat_stream(messages, model, cache=cache).read_completion()
+        hit = self._cached_completion(messages, model, cache)
+        if hit is not None:
+            return {**hit[0], "cached": hit[1]}
+        payload = _chat_payload(messages, model, stream=False)
+        response = await self._request(
+            "POST", "/ai/v1/chat/completions", endpoint="ai_chat", json=payload
+        )
+        result = response.json()
+        self._store_completion(messages, model, cache, result)
+        return result
+
+    def ai_chat_stream(
+        self,
+        messages: list[dict],
+        model: str | None = None,
+        max_chars: int | None = None,
+        max_sentences: int | None = None,
+        cache: bool = True,
+    ) -> "AsyncChatStream | AsyncCachedChatStream":
+        """Stream a chat completion; iterate with ``async for``."""
+        from .streaming import AsyncCachedChatStream, AsyncChatStream
+
+        variant = {"stream": True, "max_chars": max_chars, "max_sentences": max_sentences}
+        hit = self._cached_completion(messages, model, cache, **variant)
+        if hit is not None:
+            return AsyncCachedChatStream(*hit)
+
+        payload = _chat_payload(messages, model, stream=True)
+
+        @asynccontextmanager
+        async def open_stream():
+            # Retries and the circuit breaker apply until the response headers arrive
+            response = await self._request(
+                "POST", "/ai/v1/chat/completions", endpoint="ai_chat", stream=True, json=payload
+            )
+            try:
+                yield response
+            finally:
+                await response.aclose()
+
+        def on_complete(text: str) -> None:
+            self._store_completion(messages, model, cache, text, **variant)
+
+        return AsyncChatStream(
+            open_stream, max_chars=max_chars, max_sentences=max_sentences, on_complete=on_complete
+        )
+
+    @traced("gateway.get_calendar_events")
+    async def get_calendar_events(
+        self, days: int = 1, fields: "models.FieldNames | None" = None
+    ) -> dict:
+        """Get calendar events for the next N days."""
+        from . import models
+
+        if self.cache is not None:
+            derived = self.cache.lookup_calendar(days)
+            if derived is not None:
+                return models.project_response(derived, "events", fields)
+        data = await self._get(*_calendar_request(days))
+        return models.project_response(data, "events", fields)
+
+    @traced("gateway.get_email_recent")
+    async def get_email_recent(
+        self, hours: int = 24, fields: "models.FieldNames | None" = None
+    ) -> dict:
+        """Get recent email messages from primary inbox."""
+        from . import models
+
+        data = await self._get("/email/recent", {"hours": hours})
+        return models.project_response(data, "messages", fields)
+
+    @traced("gateway.get_tasks_upcoming")
+    async def get_tasks_upcoming(
+        self, days: int = 7, fields: "models.FieldNames | None" = None
+    ) -> dict:
+        """Get upcoming tasks from configured lists."""
+        from . import models
+
+        data = await self._get("/tasks/upcoming", {"days": days})
+        return models.project_response(data, "tasks", fields)
+
+    async def _iter_list(
+        self, path: str, params: dict | None, list_key: str, fields: "models.FieldNames | None"
+    ) -> AsyncIterator:
+        from . import json_stream, models
+
+        decode = (lambda item: item) if fields is None else models.decoder(
+            models.MODELS[list_key], tuple(fields)
+        )
+        params = dict(params or {})
+        while True:
+            parser = json_stream.ListStreamParser(list_key)
+            response = await self._request("GET", path, params=params, stream=True)
+            try:
+                async for chunk in response.aiter_text():
+                    for item in parser.feed(chunk):
+                        yield decode(item)
+                for item in parser.close():
+                    yield decode(item)
+            finally:
+                await response.aclose()
+            page_token = parser.meta.get(json_stream.NEXT_PAGE_KEY)
+            if not page_token:
+                return
+            params[json_stream.PAGE_PARAM] = page_token
+
+    def iter_email_recent(
+        self, hours: int = 24, fields: "models.FieldNames | None" = None
+    ) -> AsyncIterator:
+        """Yield recent messages while the response is still arriving; use ``async for``."""
+        return self._iter_list("/email/recent", {"hours": hours}, "messages", fields)
+
+    def iter_calendar_events(
+        self, days: int = 1, fields: "models.FieldNames | None" = None
+    ) -> AsyncIterator:
+        """Yield calendar events while the response is still arriving; use ``async for``."""
+        return self._iter_list(*_calendar_request(days), "events", fields)
+
+    def iter_tasks_upcoming(
+        self, days: int = 7, fields: "models.FieldNames | None" = None
+    ) -> AsyncIterator:
+        """Yield upcoming tasks while the response is still arriving; use ``async for``."""
+        return self._iter_list("/tasks/upcoming", {"days": days}, "tasks", fields)
+
+    async def _sync(self, kind: str, amount: int, scope: str | None) -> dict:
+        from . import models, sync
+
+        store, scope, resource, params, snapshot = self._sync_plan(kind, amount, scope)
+        try:
+            response = await self._request("GET", resource.path, params=params)
+            body = models.loads(response.content)
+        except httpx.HTTPStatusError as e:
+            if snapshot is None or e.response.status_code != 410:
+                raise
+            params, snapshot = dict(resource.params), None
+            response = await self._request("GET", resource.path, params=params)
+            body = models.loads(response.content)
+        result = sync.apply(store, scope, resource, snapshot, body)
+        _note_sync(result)
+        return result
+
+    @traced("gateway.sync_email_recent")
+    async def sync_email_recent(self, hours: int = 24, scope: str | None = None) -> dict:
+        return await self._sync("email", hours, scope)
+
+    @traced("gateway.sync_calendar_events")
+    async def sync_calendar_events(self, days: int = 1, scope: str | None = None) -> dict:
+        return await self._sync("calendar", days, scope)
+
+    @traced("gateway.sync_tasks_upcoming")
+    async def sync_tasks_upcoming(self, days: int = 7, scope: str | None = None) -> dict:
+        return await self._sync("tasks", days, scope)
+
+    async def aclose(self):
+        """Send pending notifications and close the HTTP client once revalidations finish."""
+        if self.notifier is not None:
+            await asyncio.to_thread(self.notifier.close)
+        if self._revalidating:
+            await asyncio.gather(*self._revalidating.values(), return_exceptions=True)
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+
+@dataclass
+class ContextResult:
+    """Results of a concurrent context fetch.
+
+    Successful calls land in ``data``; failed or timed-out calls land in
+    ``errors`` so callers can degrade gracefully instead of aborting.
+    """
+
+    data: dict[str, Any] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.data.get(name, default)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def failed(self, *names: str) -> list[str]:
+        """The given sources that errored, in order."""
+        return [name for name in names if name in self.errors]
+
+
+async def agather_context(
+    calls: dict[str, tuple[str, dict]],
+    timeout: float | None = None,
+    timeouts: dict[str, float] | None = None,
+    client: AsyncGatewayClient | None = None,
+    cache: "ResponseCache | None" = None,
+    policy: "GatewayPolicy | None" = None,
+) -> ContextResult:
+    """Fetch several gateway sources concurrently.
+
+    Args:
+        calls: Mapping of result name to ``(method_name, kwargs)`` on AsyncGatewayClient,
+            e.g. ``{"calendar": ("get_calendar_events", {"days": 1})}``
+        timeout: Default per-call timeout in seconds; defaults to the policy's
+            retry budget so retries and backoff can finish
+        timeouts: Optional per-call timeout overrides keyed by result name
+        client: Existing client to reuse (a temporary one is created otherwise)
+        cache: Response cache for the temporary client
+        policy: Retry/breaker/timeout policy for the temporary client
+    """
+    timeouts = timeouts or {}
+    owns_client = client is None
+    client = client or AsyncGatewayClient(cache=cache, policy=policy)
+    if timeout is None:
+        timeout = client.policy.call_budget()
+
+    async def run(name: str, method: str, kwargs: dict) -> Any:
+        return await asyncio.wait_for(
+            getattr(client, method)(**kwargs), timeout=timeouts.get(name, timeout)
+        )
+
+    try:
+        names = list(calls)
+        outcomes = await asyncio.gather(
+            *(run(name, *calls[name]) for name in names), return_exceptions=True
+        )
+    finally:
+        if owns_client:
+            await client.aclose()
+
+    result = ContextResult()
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            result.errors[name] = f"timed out after {timeouts.get(name, timeout)}s"
+        elif isinstance(outcome, Exception):
+            result.errors[name] = str(outcome) or type(outcome).__name__
+        else:
+            result.data[name] = outcome
+    return result
+
+
+# Sync callers run gathers on one background loop, so a shared async client's
+# pooled connections survive between calls instead of dying with asyncio.run()'s loop
+_loop: asyncio.AbstractEventLoop | None = None
+_shared: "weakref.WeakKeyDictionary[GatewayClient, AsyncGatewayClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_shared_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _shared_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="gateway-async", daemon=True).start()
+        return _loop
+
+
+def _shared_client(client: "GatewayClient") -> AsyncGatewayClient:
+    """The async client paired with a sync one, sharing its settings, cache and policy."""
+    with _shared_lock:
+        shared = _shared.get(client)
+        if shared is None:
+            shared = AsyncGatewayClient(
+                client.base_url, client.api_key, cache=client.cache, policy=client.policy
+            )
+            shared.sync_store = client.sync_store
+            _shared[client] = shared
+        return shared
+
+
+def close_shared(client: "GatewayClient") -> None:
+    """Close the async client paired with ``client``, if gather_context made one."""
+    with _shared_lock:
+        shared = _shared.pop(client, None)
+    if shared is not None:
+        asyncio.run_coroutine_threadsafe(shared.aclose(), _background_loop()).result()
+
+
+def gather_context(
+    calls: dict[str, tuple[str, dict]],
+    timeout: float | None = None,
+    timeouts: dict[str, float] | None = None,
+    cache: "ResponseCache | None" = None,
+    policy: "GatewayPolicy | None" = None,
+    client: "GatewayClient | None" = None,
+) -> ContextResult:
+    """Synchronous wrapper around agather_context for scripts.
+
+    Passing the script's pooled GatewayClient reuses one async client (and its
+    connections) across calls; otherwise a temporary client is created and closed.
+    """
+    if client is None:
+        return asyncio.run(
+            agather_context(calls, timeout=timeout, timeouts=timeouts, cache=cache, policy=policy)
+        )
+    gather = agather_context(
+        calls, timeout=timeout, timeouts=timeouts, client=_shared_client(client)
+    )
+    return asyncio.run_coroutine_threadsafe(gather, _background_loop()).result()
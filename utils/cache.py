@@ -0,0 +1,320 @@
+"""Response cache for gateway calls with TTL, LRU eviction and stale-while-revalidate."""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+
+class MemoryCache:
+    """In-process LRU cache. Suited to the long-lived Flask service."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, stored_at: float | None = None) -> None:
+        with self._lock:
+            self._entries[key] = (value, stored_at or time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def keys(self, prefix: str = "") -> list[str]:
+        with self._lock:
+            return [k for k in self._entries if k.startswith(prefix)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """On-disk LRU cache so short-lived jobs can share responses across runs."""
+
+    def __init__(self, path: str = ".cache/gateway.sqlite", max_entries: int = 256):
+        import sqlite3  # Only jobs using the on-disk backend pay for this import
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float | None = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at or now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM entries WHERE key NOT IN "
+                "(SELECT key FROM entries ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def keys(self, prefix: str = "") -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+BACKENDS = {
+    "memory": MemoryCache,
+    "sqlite": SQLiteCache,
+}
+
+
+def cache_key(path: str, params: dict | None = None) -> str:
+    """Build a stable key from endpoint path and query params."""
+    query = "&".join(f"{k}={params[k]}" for k in sorted(params or {}))
+    return f"GET {path}?{query}" if query else f"GET {path}"
+
+
+class ResponseCache:
+    """TTL policy on top of a cache backend.
+
+    Entries younger than the endpoint TTL are fresh. Entries past the TTL but
+    within ``stale_while_revalidate`` seconds are served immediately while the
+    client refreshes them in the background.
+    """
+
+    def __init__(
+        self,
+        backend: MemoryCache | SQLiteCache | None = None,
+        ttls: dict[str, float] | None = None,
+        default_ttl: float = 0,
+        stale_while_revalidate: float = 0,
+    ):
+        self.backend = backend or MemoryCache()
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+
+    @classmethod
+    def from_config(cls, config: dict, backend: str | None = None) -> "ResponseCache | None":
+        """Build a cache from the ``cache`` section of config.yaml, or None if disabled.
+
+        Args:
+            config: Loaded configuration
+            backend: Override the configured backend (e.g. "memory" for the Flask service)
+        """
+        cache_config = config.get("cache") or {}
+        if not cache_config.get("enabled", False):
+            return None
+
+        backend_name = backend or cache_config.get("backend", "memory")
+        if backend_name not in BACKENDS:
+            raise ValueError(f"Unknown cache backend: {backend_name}")
+
+        backend_kwargs = {"max_entries": cache_config.get("max_entries", 256)}
+        if backend_name == "sqlite":
+            backend_kwargs["path"] = cache_config.get("path", ".cache/gateway.sqlite")
+
+        return cls(
+            backend=BACKENDS[backend_name](**backend_kwargs),
+            ttls=cache_config.get("ttl", {}),
+            default_ttl=cache_config.get("default_ttl", 0),
+            stale_while_revalidate=cache_config.get("stale_while_revalidate", 0),
+        )
+
+    def ttl_for(self, path: str) -> float:
+        return self.ttls.get(path, self.default_ttl)
+
+    def lookup(self, path: str, params: dict | None = None) -> tuple[Any, str] | None:
+        """Return ``(value, state)`` where state is "fresh" or "stale", or None on miss."""
+        ttl = self.ttl_for(path)
+        if ttl <= 0:
+            return None
+
+        entry = self.backend.get(cache_key(path, params))
+        if entry is None:
+            return None
+
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if age < ttl:
+            return value, "fresh"
+        if age < ttl + self.stale_while_revalidate:
+            return value, "stale"
+        return None
+
+    def store(self, path: str, params: dict | None, value: Any) -> None:
+        if self.ttl_for(path) > 0:
+            self.backend.set(cache_key(path, params), value)
+
+    def lookup_calendar(self, days: int) -> dict | None:
+        """Answer a calendar query from a fresh cached response covering a wider window."""
+        for key in self.backend.keys("GET /calendar/events?days="):
+            cached_days = int(key.rsplit("=", 1)[1])
+            if cached_days < days:
+                continue
+            hit = self.lookup("/calendar/events", {"days": cached_days})
+            if hit is None or hit[1] != "fresh":
+                continue
+            return filter_calendar(hit[0], days)
+        return None
+
+
+def filter_calendar(calendar: dict, days: int) -> dict:
+    """Narrow a calendar response to events starting within the next ``days`` days."""
+    cutoff = (date.today() + timedelta(days=days)).isoformat()
+    events = [e for e in calendar.get("events", []) if e.get("start", "")[:10] < cutoff]
+    return {**calendar, "events": events}
+
+
+# Lines of a prompt that differ between runs without changing what the summary says
+PROMO_LINE = re.compile(
+    r"no-?reply|newsletter|marketing|promo|deals?@|unsubscribe|% off|\bsale\b|webinar",
+    re.IGNORECASE,
+)
+_TIMESTAMP = re.compile(
+    r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:Z|[+-]\d{2}:?\d{2})?"
+)
+_COUNT = re.compile(r"\b\d+(?= (?:total|emails?|email\(s\)|messages?|unread)\b)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str, near: bool = False) -> str:
+    """Collapse whitespace; with ``near``, also mask timestamps and counts and drop promo lines."""
+    if near:
+        lines = [line for line in text.splitlines() if not PROMO_LINE.search(line)]
+        text = _COUNT.sub("#", _TIMESTAMP.sub("<time>", "\n".join(lines)))
+    return _SPACE.sub(" ", text).strip()
+
+
+def completion_key(
+    messages: list[dict], model: str | None, near: bool = False, **variant: Any
+) -> str:
+    """Hash of the normalized conversation, model and output options (e.g. max_sentences)."""
+    normalized = [
+        [m.get("role"), normalize_prompt(str(m.get("content", "")), near)] for m in messages
+    ]
+    variant = {k: v for k, v in variant.items() if v is not None}
+    data = json.dumps([model, normalized, variant], sort_keys=True)
+    return ("near " if near else "chat ") + hashlib.sha256(data.encode()).hexdigest()
+
+
+class CompletionCache:
+    """Chat completions keyed by a hash of the normalized prompt and model.
+
+    An exact hit means the conversation is unchanged. In ``near_duplicate`` mode
+    a prompt that differs only in timestamps, counts or promotional email lines
+    reuses the last completion for up to ``near_duplicate_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        backend: MemoryCache | SQLiteCache | None = None,
+        ttl: float = 21600,
+        near_duplicate: bool = False,
+        near_duplicate_ttl: float = 3600,
+    ):
+        self.backend = backend or MemoryCache()
+        self.ttl = ttl
+        self.near_duplicate = near_duplicate
+        self.near_duplicate_ttl = near_duplicate_ttl
+
+    @classmethod
+    def from_config(cls, config: dict) -> "CompletionCache | None":
+        """Build a cache from the ``completion_cache`` config section, or None if disabled."""
+        cache_config = config.get("completion_cache") or {}
+        if not cache_config.get("enabled", False):
+            return None
+
+        backend_name = cache_config.get("backend", "sqlite")
+        if backend_name not in BACKENDS:
+            raise ValueError(f"Unknown cache backend: {backend_name}")
+        backend_kwargs = {"max_entries": cache_config.get("max_entries", 128)}
+        if backend_name == "sqlite":
+            backend_kwargs["path"] = cache_config.get("path", ".cache/completions.sqlite")
+
+        return cls(
+            backend=BACKENDS[backend_name](**backend_kwargs),
+            ttl=cache_config.get("ttl", 21600),
+            near_duplicate=cache_config.get("near_duplicate", False),
+            near_duplicate_ttl=cache_config.get("near_duplicate_ttl", 3600),
+        )
+
+    def _get(self, key: str, ttl: float) -> Any:
+        entry = self.backend.get(key)
+        if entry is None or time.time() - entry[1] >= ttl:
+            return None
+        return entry[0]
+
+    def lookup(
+        self, messages: list[dict], model: str | None, **variant: Any
+    ) -> tuple[Any, str] | None:
+        """Return ``(completion, "exact" | "near")``, or None on miss."""
+        if self.ttl <= 0:
+            return None
+        value = self._get(completion_key(messages, model, **variant), self.ttl)
+        if value is not None:
+            return value, "exact"
+        if self.near_duplicate:
+            near_key = completion_key(messages, model, near=True, **variant)
+            value = self._get(near_key, min(self.ttl, self.near_duplicate_ttl))
+            if value is not None:
+                return value, "near"
+        return None
+
+    def store(self, messages: list[dict], model: str | None, value: Any, **variant: Any) -> None:
+        if self.ttl <= 0:
+            return
+        self.backend.set(completion_key(messages, model, **variant), value)
+        if self.near_duplicate:
+            self.backend.set(completion_key(messages, model, near=True, **variant), value)
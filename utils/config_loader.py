@@ -1,20 +1,218 @@
-import yaml
+"""Process-wide configuration loaded from config.yaml, .env and environment overrides.
+
+load_config() parses the file once per process and returns the same Config
+object on every call. If the file changes, the next call (or a ConfigWatcher)
+re-reads it and updates that object in place, so everything holding a
+reference sees the new values.
+
+Any setting can be overridden from the environment with
+``AUTOMATIONS__<SECTION>__<KEY>=value`` (values are parsed as YAML, so
+``AUTOMATIONS__SCHEDULER__MAX_CONCURRENCY=8`` is an int).
+"""
+
+import logging
+import os
+import threading
 from pathlib import Path
+from typing import Any, Callable
+
+import yaml
 from dotenv import load_dotenv
 
+ENV_PREFIX = "AUTOMATIONS__"
+
+_configs: dict[Path, "Config"] = {}
+_lock = threading.Lock()
+_dotenv_loaded = False
+_logger = logging.getLogger(__name__)
+
+
+class Config(dict):
+    """Parsed configuration with typed accessors for dotted keys."""
+
+    def __init__(self, path: Path, data: dict, stamp: tuple):
+        super().__init__(data)
+        self.path = path
+        self.stamp = stamp
+        self.version = 1
+
+    def get_path(self, key: str, default: Any = None) -> Any:
+        """Look up a dotted key, e.g. ``config.get_path("scheduler.max_concurrency")``."""
+        value: Any = self
+        for part in key.split("."):
+            if not isinstance(value, dict) or part not in value:
+                return default
+            value = value[part]
+        return default if value is None else value
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        return int(self.get_path(key, default))
+
+    def get_float(self, key: str, default: float = 0.0) -> float:
+        return float(self.get_path(key, default))
+
+    def get_str(self, key: str, default: str = "") -> str:
+        return str(self.get_path(key, default))
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        value = self.get_path(key, default)
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+
+    def section(self, name: str) -> dict:
+        """A top-level section, or an empty dict if missing or null."""
+        return self.get(name) or {}
+
+    def _refresh(self, data: dict, stamp: tuple) -> None:
+        """Replace contents in place, bumping ``version`` if any value changed."""
+        changed = _changed_sections(self, data)
+        # Update before deleting so concurrent readers never see an empty config
+        self.update(data)
+        for key in set(self) - set(data):
+            del self[key]
+        self.stamp = stamp
+        if changed:
+            self.version += 1
+
+
+def _changed_sections(old: dict, new: dict) -> set[str]:
+    """Top-level keys whose values differ between two configs."""
+    return {k for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
+
+
+def _apply_env_overrides(data: dict, environ: dict[str, str]) -> dict:
+    for name, raw in environ.items():
+        if not name.startswith(ENV_PREFIX):
+            continue
+        keys = [k.lower() for k in name[len(ENV_PREFIX):].split("__") if k]
+        if not keys:
+            continue
+        target = data
+        for key in keys[:-1]:
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            target = target[key]
+        try:
+            target[keys[-1]] = yaml.safe_load(raw)
+        except yaml.YAMLError:
+            target[keys[-1]] = raw
+    return data
 
-def load_config(config_path: str = "config/config.yaml") -> dict:
-    """Load configuration from YAML and .env files."""
-    env_path = Path(".env")
-    if env_path.exists():
-        load_dotenv(env_path)
 
-    config_file = Path(config_path)
+def _stamp(config_file: Path) -> tuple:
+    stat = config_file.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read(config_file: Path) -> dict:
+    with open(config_file, "r") as f:
+        data = yaml.safe_load(f) or {}
+    return _apply_env_overrides(data, dict(os.environ))
+
+
+def _load(config_path: str) -> "Config":
+    global _dotenv_loaded
+
+    config_file = Path(config_path).resolve()
     if not config_file.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
+    stamp = _stamp(config_file)
 
-    with open(config_file, "r") as f:
-        config = yaml.safe_load(f) or {}
+    config = _configs.get(config_file)
+    if config is not None and config.stamp == stamp:
+        return config
+
+    with _lock:
+        if not _dotenv_loaded:
+            env_path = Path(".env")
+            if env_path.exists():
+                load_dotenv(env_path)
+            _dotenv_loaded = True
+
+        config = _configs.get(config_file)
+        if config is None:
+            config = Config(config_file, _read(config_file), stamp)
+            _configs[config_file] = config
+        elif config.stamp != stamp:
+            config._refresh(_read(config_file), stamp)
+        return config
+
+
+def load_config(config_path: str = "config/config.yaml") -> Config:
+    """Load configuration from YAML and .env files.
+
+    Cached per process; the file is only re-parsed when its mtime or size changes.
+    """
+    return _load(config_path)
+
+
+class ConfigWatcher:
+    """Polls config.yaml and calls ``callback(config, changed_sections)`` when it changes.
+
+    Polling the mtime every few seconds keeps this dependency-free and works on
+    the bind mounts and network filesystems where inotify events are unreliable.
+    The watcher diffs against its own snapshot, so a load_config() call elsewhere
+    that picks up the change first doesn't hide it.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Config, set[str]], None],
+        config_path: str = "config/config.yaml",
+        interval: float = 2.0,
+    ):
+        self.callback = callback
+        self.config_path = config_path
+        self.interval = interval
+        self._seen: dict = {}
+        self._seen_stamp: tuple | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+
+    def start(self) -> "ConfigWatcher":
+        try:
+            config = _load(self.config_path)
+            self._seen, self._seen_stamp = dict(config), config.stamp
+        except (OSError, yaml.YAMLError) as e:
+            _logger.warning(f"Config watcher starting without a config: {e}")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def poll(self) -> set[str]:
+        """Reload if needed and call back with the sections changed since the last poll."""
+        try:
+            config = _load(self.config_path)
+        except (OSError, yaml.YAMLError) as e:
+            # Keep the last good config while the file is missing or half-written
+            _logger.warning(f"Config reload failed, keeping previous config: {e}")
+            return set()
+        if config.stamp == self._seen_stamp:
+            return set()
+        # Refreshes replace top-level values rather than mutating them, so a shallow
+        # copy is a stable snapshot
+        current = dict(config)
+        changed = _changed_sections(self._seen, current)
+        self._seen, self._seen_stamp = current, config.stamp
+        if changed:
+            try:
+                self.callback(config, changed)
+            except Exception as e:
+                _logger.exception(f"Config change handler failed: {e}")
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
 
 
-    return config
+def watch_config(
+    callback: Callable[[Config, set[str]], None],
+    config_path: str = "config/config.yaml",
+    interval: float = 2.0,
+) -> ConfigWatcher:
+    """Start a background watcher for config changes."""
+    return ConfigWatcher(callback, config_path, interval).start()
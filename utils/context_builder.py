@@ -0,0 +1,286 @@
+"""Prompt context builder: rank, filter and pack emails, events and tasks to a token budget.
+
+Instead of slicing the first N items and asking the model to ignore the
+noise, items are scored locally (sender and keyword rules, recency, due-date
+urgency, event proximity), promotional mail and duplicates are dropped, and
+the best items of each section are packed until the token budget is spent.
+Rules come from the ``context`` section of config.yaml.
+"""
+
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .sync import parse_time, start_of_day
+
+DEFAULT_KEYWORDS = [
+    "urgent", "asap", "action required", "deadline", "overdue", "invoice", "payment",
+    "due", "reminder", "security", "interview", "contract",
+]
+PROMO_LABELS = {"CATEGORY_PROMOTIONS", "CATEGORY_SOCIAL", "promotions", "social"}
+_REPLY_PREFIX = re.compile(r"^\s*((re|fwd?|aw|tr)\s*:\s*)+")
+# Marketing mail by sender or subject. Deliberately not "no-reply" or "promo":
+# security alerts, invoices and receipts come from no-reply senders too.
+# Text is lowercased once per item; case-sensitive patterns are several times
+# faster than re.IGNORECASE alternations over a 10k-message inbox
+_MARKETING = re.compile(
+    r"newsletter|marketing@|deals?@|offers?@|unsubscribe|\d+% off|\bsale ends\b"
+    r"|limited[- ]time|\bcoupon|\bwebinar\b|flash sale"
+)
+
+
+def _pattern(words: list[str]) -> re.Pattern | None:
+    # One alternation per rule list, so each item is matched in a single pass
+    if not words:
+        return None
+    return re.compile("|".join(re.escape(w.lower()) for w in words))
+
+
+@dataclass
+class ContextRules:
+    token_budget: int = 1500
+    chars_per_token: float = 4.0
+    important_senders: list[str] = field(default_factory=list)
+    important_keywords: list[str] = field(default_factory=lambda: list(DEFAULT_KEYWORDS))
+    promo_patterns: list[str] = field(default_factory=list)  # Extra sender/subject substrings
+    section_weights: dict[str, float] = field(
+        default_factory=lambda: {"emails": 0.4, "calendar": 0.35, "tasks": 0.25}
+    )
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ContextRules":
+        """Build rules from the ``context`` section of config.yaml."""
+        context_config = config.get("context") or {}
+        rules = cls()
+        for name in (
+            "token_budget", "chars_per_token", "important_senders", "important_keywords",
+            "promo_patterns",
+        ):
+            if context_config.get(name) is not None:
+                setattr(rules, name, context_config[name])
+        rules.section_weights = {
+            **rules.section_weights, **(context_config.get("section_weights") or {})
+        }
+        return rules
+
+    def tokens(self, text: str) -> int:
+        """Rough token estimate; good enough for budgeting without a tokenizer."""
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+@dataclass
+class Section:
+    name: str
+    title: str
+    lines: list[str]  # Best first
+    total: int  # Items received, before filtering
+    order: list[int] | None = None  # Display order (indices into lines); default best first
+    skipped: dict[str, int] = field(default_factory=dict)  # Reason -> count
+
+
+class ContextBuilder:
+    """Collects sections of ranked items and renders them within a token budget.
+
+    Example:
+        builder = ContextBuilder.from_config(config)
+        builder.add_emails(messages, "EMAILS (last 24h)")
+        builder.add_events(events, "CALENDAR")
+        prompt_context = builder.build()
+    """
+
+    def __init__(self, rules: ContextRules | None = None, now: float | None = None):
+        self.rules = rules or ContextRules()
+        self.now = now or time.time()
+        self.sections: list[Section] = []
+        self.stats: dict[str, Any] = {}
+        self._important_sender = _pattern(self.rules.important_senders)
+        self._keyword = _pattern(self.rules.important_keywords)
+        self._promo = _pattern(self.rules.promo_patterns)
+
+    @classmethod
+    def from_config(cls, config: dict, now: float | None = None) -> "ContextBuilder":
+        return cls(ContextRules.from_config(config), now)
+
+    def is_promotional(self, message: dict) -> bool:
+        """Marketing mail by label/category or pattern, unless an important sender or keyword."""
+        sender = (message.get("sender") or "").lower()
+        subject = (message.get("subject") or "").lower()
+        if self._important_sender and self._important_sender.search(sender):
+            return False
+        if self._keyword_score(f"{subject} {message.get('snippet') or ''}"):
+            return False
+        labels = message.get("labels") or message.get("labelIds") or []
+        if message.get("category") in PROMO_LABELS or PROMO_LABELS.intersection(labels):
+            return True
+        text = f"{sender} {subject}"
+        return bool(_MARKETING.search(text) or (self._promo and self._promo.search(text)))
+
+    def _keyword_score(self, text: str) -> float:
+        return 3.0 if self._keyword and self._keyword.search(text.lower()) else 0.0
+
+    def add_emails(
+        self,
+        messages: list[dict],
+        title: str = "EMAILS",
+        line: Callable[[dict], str] = lambda m: f"- {m['subject']} (from {m['sender']})",
+    ) -> "ContextBuilder":
+        """Rank messages by sender/keyword rules and recency; drop promotions and thread repeats."""
+        scored: dict[tuple, tuple[float, dict]] = {}
+        promotional = duplicates = 0
+        for message in messages:
+            if self.is_promotional(message):
+                promotional += 1
+                continue
+            sender = message.get("sender") or ""
+            subject = message.get("subject") or ""
+            score = 1.0 + self._keyword_score(f"{subject} {message.get('snippet') or ''}")
+            if self._important_sender and self._important_sender.search(sender.lower()):
+                score += 5.0
+            received = parse_time(message.get("received_at"))
+            if received is not None:
+                score += math.exp(-max(self.now - received, 0) / 43200)  # Half a day
+            key = (_REPLY_PREFIX.sub("", subject.lower()).strip(), sender.lower())
+            if key in scored:
+                duplicates += 1
+                if scored[key][0] >= score:
+                    continue
+            scored[key] = (score, message)
+
+        ranked = sorted(scored.values(), key=lambda s: s[0], reverse=True)
+        self.sections.append(Section(
+            "emails", title, [line(m) for _, m in ranked], len(messages),
+            skipped={"promotional": promotional, "duplicate": duplicates},
+        ))
+        return self
+
+    def add_events(
+        self,
+        events: list[dict],
+        title: str = "CALENDAR",
+        line: Callable[[dict], str] = lambda e: f"- {e['title']} at {e['start']}",
+    ) -> "ContextBuilder":
+        """Rank upcoming events by proximity (and keywords); list the kept ones chronologically.
+
+        Events that already ended today are kept, ranked below upcoming ones.
+        """
+        today = start_of_day(self.now)
+        seen = set()
+        kept = []
+        duplicates = past = 0
+        for event in events:
+            key = ((event.get("title") or "").strip().lower(), event.get("start"))
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            start = parse_time(event.get("start"))
+            end = parse_time(event.get("end")) or start
+            if end is not None and end < today:
+                past += 1
+                continue
+            if end is not None and end < self.now:
+                score = 0.5  # Earlier today
+            else:
+                hours_away = max((start or self.now) - self.now, 0) / 3600
+                score = 1.0 + 4.0 / (1.0 + hours_away / 12)
+            score += self._keyword_score(event.get("title") or "")
+            kept.append((score, start or math.inf, event))
+
+        ranked = sorted(kept, key=lambda k: k[0], reverse=True)
+        order = sorted(range(len(ranked)), key=lambda i: ranked[i][1])
+        self.sections.append(Section(
+            "calendar", title, [line(e) for _, _, e in ranked], len(events), order=order,
+            skipped={"duplicate": duplicates, "past": past},
+        ))
+        return self
+
+    def add_tasks(
+        self,
+        tasks: list[dict],
+        title: str = "TASKS",
+        line: Callable[[dict], str] = lambda t: f"- {t['title']} [{t.get('list_name') or ''}]",
+    ) -> "ContextBuilder":
+        """Rank tasks by due-date urgency (overdue first) and keywords."""
+        seen = set()
+        kept = []
+        duplicates = 0
+        for task in tasks:
+            key = (task.get("title") or "").strip().lower()
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            due = parse_time(task.get("due"))
+            if due is None:
+                score = 1.0
+            elif due < self.now:
+                score = 6.0  # Overdue
+            else:
+                score = 1.5 + 3.0 / (1.0 + (due - self.now) / 86400)
+            kept.append((score + self._keyword_score(task.get("title") or ""), task))
+
+        ranked = sorted(kept, key=lambda k: k[0], reverse=True)
+        self.sections.append(Section(
+            "tasks", title, [line(t) for _, t in ranked], len(tasks),
+            skipped={"duplicate": duplicates},
+        ))
+        return self
+
+    def _allocate(self) -> list[int]:
+        """How many lines of each section fit: weighted shares first, leftovers redistributed."""
+        rules = self.rules
+        headers = sum(rules.tokens(self._header(s, len(s.lines))) + 1 for s in self.sections)
+        budget = max(rules.token_budget - headers, 0)
+        costs = [[rules.tokens(text) + 1 for text in s.lines] for s in self.sections]
+        weights = [rules.section_weights.get(s.name, 0.25) for s in self.sections]
+        total_weight = sum(weights) or 1.0
+
+        counts = [0] * len(self.sections)
+        spent = 0
+        for i, section_costs in enumerate(costs):
+            share = budget * weights[i] / total_weight
+            used = 0
+            while counts[i] < len(section_costs) and used + section_costs[counts[i]] <= share:
+                used += section_costs[counts[i]]
+                counts[i] += 1
+            spent += used
+
+        # Hand unused budget to sections with items left, in order of weight
+        for i in sorted(range(len(costs)), key=lambda i: weights[i], reverse=True):
+            while counts[i] < len(costs[i]) and spent + costs[i][counts[i]] <= budget:
+                spent += costs[i][counts[i]]
+                counts[i] += 1
+        return counts
+
+    @staticmethod
+    def _header(section: Section, shown: int) -> str:
+        details = [f"{section.total} total"]
+        if shown < len(section.lines):
+            details.append(f"top {shown} shown")
+        details += [f"{n} {reason} skipped" for reason, n in section.skipped.items() if n]
+        return f"{section.title} ({', '.join(details)}):"
+
+    def build(self) -> str:
+        """Render non-empty sections within the token budget."""
+        parts = []
+        stats: dict[str, Any] = {}
+        for section, count in zip(self.sections, self._allocate()):
+            if not section.lines:
+                continue
+            indices = [i for i in (section.order or range(len(section.lines))) if i < count]
+            if not indices:
+                continue
+            lines = [section.lines[i] for i in indices]
+            parts.append("\n".join([self._header(section, count), *lines]))
+            stats[section.name] = {
+                "total": section.total,
+                "shown": count,
+                "ranked": len(section.lines),
+                **section.skipped,
+            }
+        text = "\n\n".join(parts)
+        stats["tokens"] = self.rules.tokens(text)
+        self.stats = stats
+        return text
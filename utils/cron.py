@@ -0,0 +1,198 @@
+"""Cron expression parsing and next-fire-time computation with timezone support."""
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+MONTH_NAMES = {
+    name: i for i, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"],
+        start=1,
+    )
+}
+DAY_NAMES = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# (min, max, names) for minute, hour, day of month, month, day of week
+FIELDS = [
+    (0, 59, {}),
+    (0, 23, {}),
+    (1, 31, {}),
+    (1, 12, MONTH_NAMES),
+    (0, 7, DAY_NAMES),
+]
+
+# Bound the search so an impossible expression (e.g. "0 0 31 2 *") fails instead of looping
+MAX_SEARCH_STEPS = 100_000
+
+
+class CronError(ValueError):
+    """Raised for malformed cron expressions."""
+
+
+def _parse_value(value: str, names: dict) -> int:
+    value = value.lower()
+    if value in names:
+        return names[value]
+    try:
+        return int(value)
+    except ValueError:
+        raise CronError(f"Invalid cron value: {value}") from None
+
+
+def _parse_field(field: str, low: int, high: int, names: dict) -> set[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = _parse_value(step_str, {})
+            if step < 1:
+                raise CronError(f"Invalid cron step: {step}")
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = _parse_value(start_str, names), _parse_value(end_str, names)
+        else:
+            start = _parse_value(part, names)
+            end = high if step > 1 else start
+
+        if not (low <= start <= high and low <= end <= high and start <= end):
+            raise CronError(f"Cron field out of range: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """A standard 5-field cron expression: minute hour day-of-month month day-of-week.
+
+    As in Vixie cron, when both day fields are restricted a day matches if
+    either field matches.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = expression.split()
+        if len(fields) != 5:
+            raise CronError(f"Expected 5 cron fields, got {len(fields)}: {expression!r}")
+
+        parsed = [_parse_field(f, *spec) for f, spec in zip(fields, FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}  # 7 is also Sunday
+        self.days_restricted = fields[2] != "*"
+        self.weekdays_restricted = fields[4] != "*"
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r})"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.isoweekday() % 7) in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, after: datetime, tz: ZoneInfo | None = None) -> datetime:
+        """Return the first fire time strictly after ``after``.
+
+        Matching happens on wall-clock time in ``tz`` (system local time when
+        None); the result is timezone-aware.
+
+        Args:
+            after: Aware datetime to search from
+            tz: Timezone the expression is written in
+        """
+        local = after.astimezone(tz) if tz else after.astimezone()
+        candidate = local.replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+
+        for _ in range(MAX_SEARCH_STEPS):
+            if candidate.month not in self.months:
+                year = candidate.year + candidate.month // 12
+                candidate = candidate.replace(
+                    year=year, month=candidate.month % 12 + 1, day=1, hour=0, minute=0
+                )
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                fire = candidate.replace(tzinfo=tz) if tz else candidate.astimezone()
+                if fire > after:
+                    return fire
+                # Wall time repeated or skipped by a DST change; keep searching
+                candidate += timedelta(minutes=1)
+
+        raise CronError(f"No fire time found for {self.expression!r}")
+
+
+class IntervalSchedule:
+    """Fires every ``minutes`` minutes, counted from the Unix epoch.
+
+    Keeps legacy "every N minutes" schedules that cron can't space evenly
+    (e.g. 45 or 90) working; same ``expression``/``next_after`` surface as
+    CronExpression.
+    """
+
+    def __init__(self, minutes: int):
+        if minutes < 1:
+            raise CronError(f"Invalid interval: {minutes} minutes")
+        self.minutes = minutes
+        self.expression = f"every {minutes} minutes"
+
+    def __repr__(self) -> str:
+        return f"IntervalSchedule({self.minutes})"
+
+    def next_after(self, after: datetime, tz: ZoneInfo | None = None) -> datetime:
+        """Return the first fire time strictly after ``after``, as an aware datetime in ``tz``."""
+        step = self.minutes * 60
+        fire = (int(after.timestamp() // step) + 1) * step
+        return datetime.fromtimestamp(fire, timezone.utc).astimezone(tz)
+
+
+def _interval_minutes(schedule: str) -> int:
+    try:
+        return int(schedule.split()[1])
+    except (IndexError, ValueError):
+        raise CronError(f"Invalid schedule format: {schedule}") from None
+
+
+def schedule_to_cron(schedule: str, at: str = "09:00") -> str:
+    """Translate legacy config.yaml schedules ("daily", "hourly", "every N minutes") to cron."""
+    schedule = schedule.strip().lower()
+    if schedule == "daily":
+        hour, minute = at.split(":")
+        return f"{int(minute)} {int(hour)} * * *"
+    if schedule == "hourly":
+        return "0 * * * *"
+    if "minute" in schedule:
+        minutes = _interval_minutes(schedule)
+        # */N restarts every hour (or day), so only even divisors fire at a steady interval
+        if 0 < minutes < 60 and 60 % minutes == 0:
+            return f"*/{minutes} * * * *"
+        if minutes == 1440:
+            return "0 0 * * *"
+        if minutes % 60 == 0 and 0 < minutes // 60 < 24 and 24 % (minutes // 60) == 0:
+            return f"0 */{minutes // 60} * * *"
+        raise CronError(
+            f"Cannot express {schedule!r} as an evenly spaced cron schedule; use a divisor "
+            "of 60 minutes or a whole number of hours dividing 24"
+        )
+    # Anything else is assumed to already be a cron expression
+    CronExpression(schedule)
+    return schedule
+
+
+def parse_schedule(schedule: str, at: str = "09:00") -> CronExpression | IntervalSchedule:
+    """Parse a config.yaml schedule.
+
+    "every N minutes" values that cron can't space evenly become an
+    IntervalSchedule instead of an error, as the pre-cron scheduler accepted them.
+    """
+    try:
+        return CronExpression(schedule_to_cron(schedule, at))
+    except CronError:
+        if "minute" not in schedule.lower():
+            raise
+        return IntervalSchedule(_interval_minutes(schedule.strip().lower()))
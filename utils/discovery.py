@@ -0,0 +1,240 @@
+"""Discover automations from the YAML frontmatter in their docstrings.
+
+Parsed frontmatter is kept in a JSON index keyed by file path with each file's
+mtime, size and content hash. Rebuilding the index only stats unchanged files,
+re-reading and re-parsing just the ones that changed, so startup and
+``deploy.py status`` stay cheap as the number of scripts grows.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import yaml
+
+from utils.cron import CronError, CronExpression
+
+BASE_PATH = Path(__file__).parent.parent
+AUTOMATION_FOLDERS = ["scheduled", "triggered", "manual"]
+INDEX_PATH = ".cache/automations_index.json"
+# Bump whenever validation rules or the fields stored per file change, so cached
+# entries (including their errors) are rebuilt instead of trusted
+INDEX_VERSION = 3
+
+FRONTMATTER_RE = re.compile(r'^"""[\s]*---\s*(.*?)\s*---[\s]*"""', re.DOTALL)
+
+AUTOMATION_TYPES = ("scheduled", "triggered", "manual")
+
+# Optional keys and the values they accept
+OPTION_VALUES = {
+    "mode": ("sync", "async"),
+    "executor": ("thread", "process"),
+    "overlap": ("skip", "queue", "allow"),
+}
+POSITIVE_NUMBER_KEYS = ("timeout", "concurrency", "max_queue")
+DEFAULT_TIMEZONE = "America/New_York"
+
+# Group names double as Cloud Run job names
+GROUP_RE = re.compile(r"^[a-z][a-z0-9-]{0,39}$")
+
+
+def parse_frontmatter(file_path: Path) -> dict[str, Any] | None:
+    """Extract YAML frontmatter from a Python file's docstring."""
+    content = file_path.read_text(encoding="utf-8")
+    return _parse_content(content, file_path)
+
+
+def _parse_content(content: str, file_path: Path) -> dict[str, Any] | None:
+    match = FRONTMATTER_RE.search(content)
+
+    if not match:
+        return None
+
+    try:
+        return yaml.safe_load(match.group(1))
+    except yaml.YAMLError as e:
+        print(f"Error parsing frontmatter in {file_path}: {e}")
+        return None
+
+
+def _read_frontmatter(content: str) -> tuple[dict[str, Any] | None, list[str]]:
+    """Frontmatter of a file and its schema errors; unparseable YAML is an error too."""
+    match = FRONTMATTER_RE.search(content)
+    if not match:
+        return None, []
+    try:
+        frontmatter = yaml.safe_load(match.group(1))
+    except yaml.YAMLError as e:
+        return None, [f"invalid YAML: {getattr(e, 'problem', None) or e}"]
+    return frontmatter, validate_frontmatter(frontmatter) if frontmatter else []
+
+
+def validate_frontmatter(fm: Any) -> list[str]:
+    """Return schema errors for a frontmatter block (empty if valid)."""
+    if not isinstance(fm, dict):
+        return ["frontmatter must be a mapping"]
+
+    errors = []
+    if not isinstance(fm.get("name"), str) or not fm["name"]:
+        errors.append("name is required")
+    if fm.get("type") not in AUTOMATION_TYPES:
+        errors.append(f"type must be one of {', '.join(AUTOMATION_TYPES)}")
+    if not isinstance(fm.get("enabled", True), bool):
+        errors.append("enabled must be true or false")
+
+    if fm.get("type") == "scheduled":
+        try:
+            CronExpression(str(fm.get("schedule", "")))
+        except CronError as e:
+            errors.append(f"schedule: {e}")
+        if "timezone" in fm:
+            try:
+                ZoneInfo(str(fm["timezone"]))
+            except (ZoneInfoNotFoundError, ValueError):
+                errors.append(f"unknown timezone: {fm['timezone']}")
+
+    if "group" in fm and not GROUP_RE.match(str(fm["group"])):
+        errors.append("group must be lowercase letters, digits and hyphens (max 40)")
+
+    if fm.get("type") == "triggered" and not str(fm.get("path", "/")).startswith("/"):
+        errors.append("path must start with /")
+
+    for key, allowed in OPTION_VALUES.items():
+        if key in fm and fm[key] not in allowed:
+            errors.append(f"{key} must be one of {', '.join(allowed)}")
+    for key in POSITIVE_NUMBER_KEYS:
+        if key in fm and (not isinstance(fm[key], (int, float)) or fm[key] <= 0):
+            errors.append(f"{key} must be a positive number")
+
+    return errors
+
+
+def _load_index(index_path: Path) -> dict[str, dict]:
+    try:
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return index.get("files", {})
+
+
+def _save_index(index_path: Path, files: dict[str, dict]) -> None:
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = index_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": INDEX_VERSION, "files": files}, indent=1), encoding="utf-8"
+        )
+        tmp_path.replace(index_path)
+    except OSError:
+        pass  # Read-only filesystem: the index is just a cache
+
+
+def build_index(
+    base_path: Path = BASE_PATH, index_path: str | None = INDEX_PATH
+) -> dict[str, dict]:
+    """Return the manifest of automation files, refreshing only changed entries.
+
+    Args:
+        base_path: Repository root containing the automation folders
+        index_path: JSON index location relative to base_path (None to skip persisting)
+    """
+    index_file = base_path / index_path if index_path else None
+    cached = _load_index(index_file) if index_file else {}
+    files = {}
+    changed = False
+
+    for folder in AUTOMATION_FOLDERS:
+        folder_path = base_path / folder
+        if not folder_path.exists():
+            continue
+
+        for py_file in sorted(folder_path.glob("*.py")):
+            if py_file.name.startswith("_") or py_file.name == "handler.py":
+                continue
+
+            rel_path = str(py_file.relative_to(base_path))
+            stat = py_file.stat()
+            entry = cached.get(rel_path)
+            if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                files[rel_path] = entry
+                continue
+
+            content = py_file.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()
+            changed = True
+            if entry and entry["hash"] == digest:
+                files[rel_path] = {**entry, "mtime": stat.st_mtime, "size": stat.st_size}
+                continue
+
+            frontmatter, errors = _read_frontmatter(content.decode("utf-8"))
+            files[rel_path] = {
+                "folder": folder,
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "hash": digest,
+                "frontmatter": frontmatter,
+                "errors": errors,
+            }
+
+    if index_file and (changed or files.keys() != cached.keys()):
+        _save_index(index_file, files)
+    return files
+
+
+def discover_automations(base_path: Path = BASE_PATH) -> list[dict[str, Any]]:
+    """Scan folders and discover all automations with valid frontmatter."""
+    automations = []
+
+    for rel_path, entry in build_index(base_path).items():
+        frontmatter = entry["frontmatter"]
+        if entry["errors"]:
+            print(f"Skipping {rel_path}: {'; '.join(entry['errors'])}")
+            continue
+        if not frontmatter:
+            continue
+        if frontmatter.get("enabled", True):
+            automations.append({
+                "file": rel_path,
+                "folder": entry["folder"],
+                **frontmatter,
+            })
+
+    return automations
+
+
+def discovery_errors(base_path: Path = BASE_PATH) -> dict[str, list[str]]:
+    """Files left out of discover_automations() because their frontmatter is invalid."""
+    return {rel_path: entry["errors"] for rel_path, entry in build_index(base_path).items()
+            if entry["errors"]}
+
+
+def schedule_groups(automations: list[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
+    """Group scheduled automations that fire in the same cron slot (schedule + timezone).
+
+    A slot is named after the ``group`` frontmatter of its members if any set one,
+    otherwise ``slot-<hash>`` derived from the schedule and timezone.
+    """
+    slots: dict[tuple[str, str], list[dict[str, Any]]] = {}
+    for auto in automations:
+        if auto.get("type") != "scheduled" or not auto.get("schedule"):
+            continue
+        key = (str(auto["schedule"]), auto.get("timezone", DEFAULT_TIMEZONE))
+        slots.setdefault(key, []).append(auto)
+
+    groups = {}
+    for (schedule, tz), members in slots.items():
+        named = sorted(m["group"] for m in members if m.get("group"))
+        digest = hashlib.sha256(f"{schedule} {tz}".encode()).hexdigest()[:8]
+        groups[named[0] if named else f"slot-{digest}"] = members
+    return groups
+
+
+if __name__ == "__main__":
+    # Pre-build the index, e.g. while building the container image
+    found = discover_automations()
+    print(f"Indexed {len(found)} automation(s)")
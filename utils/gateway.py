@@ -1,95 +1,536 @@
 """API Gateway client for automations."""
 
+import atexit
 import os
-from typing import Any
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
 
 import httpx
 
+# Needed to define the client's methods; everything else is imported where it is used,
+# so modules that only want close_clients() don't load caching, sync, models, etc.
+from .tracing import current_span, span, traced
 
-class GatewayClient:
-    def __init__(self, base_url: str | None = None, api_key: str | None = None):
-        self.base_url = base_url or os.getenv("API_GATEWAY_URL", "https://api-gateway-252332699398.us-central1.run.app")
-        self.api_key = api_key or os.getenv("API_GATEWAY_KEY", "")
-        
-        headers = {}
-        if self.api_key:
-            headers["X-API-Key"] = self.api_key
-        
-        self._client = httpx.Client(base_url=self.base_url, timeout=30.0, headers=headers)
+if TYPE_CHECKING:
+    from . import models, sync
+    from .cache import CompletionCache, ResponseCache
+    from .notifications import NotificationDispatcher, NotificationRules
+    from .retry import CircuitBreaker, GatewayPolicy
+    from .streaming import CachedChatStream, ChatStream
 
+DEFAULT_BASE_URL = "https://api-gateway-252332699398.us-central1.run.app"
+
+
+def _client_settings(base_url: str | None, api_key: str | None) -> tuple[str, str, dict]:
+    """Resolve base URL, API key and headers from arguments or environment."""
+    base_url = base_url or os.getenv("API_GATEWAY_URL", DEFAULT_BASE_URL)
+    api_key = api_key or os.getenv("API_GATEWAY_KEY", "")
+
+    headers = {}
+    if api_key:
+        headers["X-API-Key"] = api_key
+    return base_url, api_key, headers
+
+
+def _chat_payload(messages: list[dict], model: str | None, stream: bool) -> dict:
+    payload = {"messages": messages, "stream": stream}
+    if model:
+        payload["model"] = model
+    return payload
+
+
+def _note_cache(state: str) -> None:
+    # Tag the calling method's span with fresh / stale / miss
+    current = current_span()
+    if current is not None:
+        current.set(cache=state)
+
+
+def _note_sync(result: dict) -> None:
+    current = current_span()
+    if current is not None:
+        current.set(sync=result["sync"]["mode"], changed=result["sync"]["changed"])
+
+
+def _calendar_request(days: int) -> tuple[str, dict | None]:
+    # Use optimized today endpoint for a single day
+    return ("/calendar/today", None) if days == 1 else ("/calendar/events", {"days": days})
+
+
+class _BaseGatewayClient:
+    """Settings and retry/breaker bookkeeping shared by the sync and async clients."""
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        cache: "ResponseCache | None" = None,
+        policy: "GatewayPolicy | None" = None,
+        completions: "CompletionCache | None" = None,
+    ):
+        from .retry import GatewayPolicy, GatewayStats
+
+        self.base_url, self.api_key, self._headers = _client_settings(base_url, api_key)
+        self.cache = cache
+        self.completions = completions
+        # Coalesces notify() calls into digests when notification rules are configured
+        self.notifier: "NotificationDispatcher | None" = None
+        self.policy = policy or GatewayPolicy()
+        self.stats = GatewayStats()
+        # Snapshot store for sync_* methods; the process-wide one from config.yaml if unset
+        self.sync_store: "sync.SyncStore | None" = None
+
+    def _cached_completion(
+        self, messages: list[dict], model: str | None, use_cache: bool, **variant
+    ) -> tuple | None:
+        if not use_cache or self.completions is None:
+            return None
+        hit = self.completions.lookup(messages, model, **variant)
+        _note_cache(hit[1] if hit else "miss")
+        if hit is not None:
+            self.stats.completion_cache_hits += 1
+        return hit
+
+    def _store_completion(
+        self, messages: list[dict], model: str | None, use_cache: bool, value, **variant
+    ) -> None:
+        if not use_cache or self.completions is None:
+            return
+        try:
+            self.completions.store(messages, model, value, **variant)
+        except Exception:
+            pass  # The completion cache is best-effort; never fail a run over it
+
+    def _sync_plan(self, kind: str, amount: int, scope: str | None):
+        """Snapshot store, scope, resource, request params and snapshot for a sync_* call."""
+        from . import sync
+
+        store = self.sync_store or sync.get_sync_store()
+        resource = sync.RESOURCES[kind](amount, store.window_days if store else amount)
+        scope = scope or sync.default_scope()
+        return store, scope, resource, *sync.plan(store, scope, resource)
+
+    def _breaker(self, path: str) -> "CircuitBreaker":
+        from .retry import get_breaker
+
+        return get_breaker(
+            f"{self.base_url} {path}", self.policy.failure_threshold, self.policy.reset_timeout
+        )
+
+    def _check_breaker(self, breaker: "CircuitBreaker", path: str) -> None:
+        if not breaker.allow():
+            from .retry import CircuitOpenError
+
+            self.stats.breaker_rejections += 1
+            raise CircuitOpenError(f"Circuit open for {path}; gateway failing, not calling")
+        self.stats.attempts += 1
+
+    def _retry_delay(
+        self,
+        breaker: "CircuitBreaker",
+        attempt: int,
+        idempotent: bool,
+        response: httpx.Response | None = None,
+        error: Exception | None = None,
+    ) -> float | None:
+        """Record an attempt's outcome; return seconds to wait before retrying, or None to stop."""
+        if error is not None or response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        retry = self.policy.retry
+        if not retry.should_retry(attempt, idempotent, response=response, error=error):
+            if error is not None or response.is_error:
+                self.stats.failures += 1
+            return None
+
+        delay = retry.delay(attempt, response)
+        self.stats.retries += 1
+        self.stats.retry_wait_seconds += delay
+        return delay
+
+
+class GatewayClient(_BaseGatewayClient):
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        cache: "ResponseCache | None" = None,
+        policy: "GatewayPolicy | None" = None,
+        completions: "CompletionCache | None" = None,
+        notifications: "NotificationRules | None" = None,
+    ):
+        super().__init__(base_url, api_key, cache, policy, completions)
+        if notifications is not None:
+            from .notifications import NotificationDispatcher
+
+            self.notifier = NotificationDispatcher(self.send_notification, notifications)
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=self.policy.timeout_for("default"),
+            headers=self._headers,
+            http2=self.policy.http2(),
+            limits=self.policy.limits(),
+        )
+        self._revalidating: dict[str, threading.Thread] = {}
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        endpoint: str = "default",
+        idempotent: bool = True,
+        stream: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        """Send a request with the client's retry policy and the endpoint's circuit breaker.
+
+        With ``stream=True`` only the headers are read; the caller reads and closes the body.
+        """
+        from .history import gateway_call
+
+        breaker = self._breaker(path)
+        self.stats.requests += 1
+        attempt = 0
+        with (
+            span("gateway.request", method=method, path=path) as request_span,
+            gateway_call(path),
+        ):
+            while True:
+                attempt += 1
+                request_span.set(attempts=attempt)
+                self._check_breaker(breaker, path)
+                request = self._client.build_request(
+                    method, path, timeout=self.policy.timeout_for(endpoint), **kwargs
+                )
+                try:
+                    response = self._client.send(request, stream=stream)
+                except httpx.TransportError as e:
+                    delay = self._retry_delay(breaker, attempt, idempotent, error=e)
+                    if delay is None:
+                        raise
+                else:
+                    request_span.set(status_code=response.status_code)
+                    delay = self._retry_delay(breaker, attempt, idempotent, response=response)
+                    if delay is None and not response.is_error:
+                        return response
+                    response.close()
+                    if delay is None:
+                        response.raise_for_status()
+                time.sleep(delay)
+
+    def _fetch(self, path: str, params: dict | None = None) -> dict:
+        from . import models
+
+        data = models.loads(self._request("GET", path, params=params).content)
+        if self.cache is not None:
+            self.cache.store(path, params, data)
+        return data
+
+    def _get(self, path: str, params: dict | None = None) -> dict:
+        """GET a JSON endpoint, serving from the cache when one is configured."""
+        if self.cache is None:
+            return self._fetch(path, params)
+
+        hit = self.cache.lookup(path, params)
+        _note_cache(hit[1] if hit else "miss")
+        if hit is None:
+            return self._fetch(path, params)
+
+        value, state = hit
+        if state == "stale":
+            self._revalidate(path, params)
+        return value
+
+    def _revalidate(self, path: str, params: dict | None) -> None:
+        from .cache import cache_key
+
+        key = cache_key(path, params)
+        if key in self._revalidating:
+            return
+
+        def refresh():
+            try:
+                self._fetch(path, params)
+            except httpx.HTTPError:
+                pass  # Keep serving the stale entry until it expires
+            finally:
+                self._revalidating.pop(key, None)
+
+        thread = threading.Thread(target=refresh, daemon=True)
+        self._revalidating[key] = thread
+        thread.start()
+
+    @traced("gateway.notify")
     def notify(self, title: str, message: str, priority: int = 0) -> dict:
-        """Send a push notification via the gateway."""
-        response = self._client.post("/notify", json={
+        """Send a push notification via the gateway.
+
+        With notification rules configured (``notifications`` in config.yaml),
+        notifications below the immediate priority are held briefly and sent as
+        one digest per title; the result is then ``{"status": "queued"}`` or
+        ``{"status": "duplicate"}``. Pending digests are sent on close().
+        """
+        if self.notifier is not None:
+            return self.notifier.submit(title, message, priority)
+        return self.send_notification(title, message, priority)
+
+    def send_notification(self, title: str, message: str, priority: int = 0) -> dict:
+        """Send a push notification now, bypassing coalescing.
+
+        Only retried when the request provably never reached the gateway (or got
+        a 429), so a notification is not sent twice.
+        """
+        response = self._request("POST", "/notify", endpoint="notify", idempotent=False, json={
             "title": title,
             "message": message,
             "priority": priority,
-        })
-        response.raise_for_status()
+        }, headers={"Idempotency-Key": os.urandom(16).hex()})
         return response.json()
 
+    @traced("gateway.health")
     def health(self) -> dict:
         """Get gateway health status."""
-        response = self._client.get("/health")
-        response.raise_for_status()
-        return response.json()
+        return self._get("/health")
 
+    @traced("gateway.integrations")
     def integrations(self) -> dict:
         """Get integration status."""
-        response = self._client.get("/health/integrations")
-        response.raise_for_status()
-        return response.json()
+        return self._get("/health/integrations")
 
+    @traced("gateway.context_now")
     def context_now(self) -> dict:
         """Get aggregated context snapshot."""
-        response = self._client.get("/context/now")
-        response.raise_for_status()
-        return response.json()
+        return self._get("/context/now")
 
-    def ai_chat(self, messages: list[dict], model: str | None = None, stream: bool = False) -> dict:
-        """Send a chat completion request."""
-        payload = {"messages": messages, "stream": stream}
-        if model:
-            payload["model"] = model
-        response = self._client.post("/ai/v1/chat/completions", json=payload)
-        response.raise_for_status()
-        return response.json()
+    @traced("gateway.ai_chat")
+    def ai_chat(
+        self,
+        messages: list[dict],
+        model: str | None = None,
+        stream: bool = False,
+        cache: bool = True,
+    ) -> dict:
+        """Send a chat completion request.
 
-    def get_calendar_events(self, days: int = 1) -> dict:
+        With ``stream=True`` the completion is streamed and reassembled into the
+        same response shape; use ai_chat_stream() to consume deltas directly.
+        With a completion cache configured, an unchanged prompt returns the
+        previous completion (marked ``"cached"``) without calling the model;
+        pass ``cache=False`` to force a fresh one.
+        """
+        if stream:
+            return self.ai_chat_stream(messages, model, cache=cache).read_completion()
+        hit = self._cached_completion(messages, model, cache)
+        if hit is not None:
+            return {**hit[0], "cached": hit[1]}
+        payload = _chat_payload(messages, model, stream=False)
+        response = self._request(
+            "POST", "/ai/v1/chat/completions", endpoint="ai_chat", json=payload
+        )
+        result = response.json()
+        self._store_completion(messages, model, cache, result)
+        return result
+
+    def ai_chat_stream(
+        self,
+        messages: list[dict],
+        model: str | None = None,
+        max_chars: int | None = None,
+        max_sentences: int | None = None,
+        cache: bool = True,
+    ) -> "ChatStream | CachedChatStream":
+        """Stream a chat completion, yielding content deltas as they arrive.
+
+        Args:
+            messages: Chat messages
+            model: Optional model override
+            max_chars: Stop the stream once this many characters were received
+            max_sentences: Stop the stream after this many complete sentences
+            cache: Replay a cached completion for an unchanged prompt (default: True)
+        """
+        from .streaming import CachedChatStream, ChatStream
+
+        variant = {"stream": True, "max_chars": max_chars, "max_sentences": max_sentences}
+        hit = self._cached_completion(messages, model, cache, **variant)
+        if hit is not None:
+            return CachedChatStream(*hit)
+
+        payload = _chat_payload(messages, model, stream=True)
+
+        @contextmanager
+        def open_stream():
+            # Retries and the circuit breaker apply until the response headers arrive
+            response = self._request(
+                "POST", "/ai/v1/chat/completions", endpoint="ai_chat", stream=True, json=payload
+            )
+            try:
+                yield response
+            finally:
+                response.close()
+
+        def on_complete(text: str) -> None:
+            self._store_completion(messages, model, cache, text, **variant)
+
+        return ChatStream(
+            open_stream, max_chars=max_chars, max_sentences=max_sentences, on_complete=on_complete
+        )
+
+    @traced("gateway.get_calendar_events")
+    def get_calendar_events(self, days: int = 1, fields: "models.FieldNames | None" = None) -> dict:
         """Get calendar events for the next N days.
 
+        With a cache configured, a fresh response for a wider window (e.g. the
+        weekly job's 7 days) is filtered locally instead of calling the gateway.
+
         Args:
             days: Number of days to look ahead (default: 1 for today)
+            fields: Event fields to keep; events become compact models.Event
+                objects instead of dicts (default: all fields, as dicts)
         """
-        if days == 1:
-            # Use optimized today endpoint
-            response = self._client.get("/calendar/today")
-        else:
-            response = self._client.get(f"/calendar/events?days={days}")
-        response.raise_for_status()
-        return response.json()
+        from . import models
+
+        if self.cache is not None:
+            derived = self.cache.lookup_calendar(days)
+            if derived is not None:
+                return models.project_response(derived, "events", fields)
+        return models.project_response(self._get(*_calendar_request(days)), "events", fields)
 
-    def get_email_recent(self, hours: int = 24) -> dict:
+    @traced("gateway.get_email_recent")
+    def get_email_recent(self, hours: int = 24, fields: "models.FieldNames | None" = None) -> dict:
         """Get recent email messages from primary inbox.
 
         Args:
             hours: Number of hours to look back (default: 24)
+            fields: Message fields to keep, e.g. ``("subject", "sender")``; messages
+                become compact models.EmailMessage objects (default: all, as dicts)
         """
-        response = self._client.get(f"/email/recent?hours={hours}")
-        response.raise_for_status()
-        return response.json()
+        from . import models
+
+        return models.project_response(
+            self._get("/email/recent", {"hours": hours}), "messages", fields
+        )
 
-    def get_tasks_upcoming(self, days: int = 7) -> dict:
+    @traced("gateway.get_tasks_upcoming")
+    def get_tasks_upcoming(self, days: int = 7, fields: "models.FieldNames | None" = None) -> dict:
         """Get upcoming tasks from configured lists.
 
         Args:
             days: Number of days to look ahead for due dates (default: 7)
+            fields: Task fields to keep; tasks become compact models.Task objects
+                (default: all fields, as dicts)
         """
-        response = self._client.get(f"/tasks/upcoming?days={days}")
-        response.raise_for_status()
-        return response.json()
+        from . import models
+
+        return models.project_response(
+            self._get("/tasks/upcoming", {"days": days}), "tasks", fields
+        )
+
+    def _iter_list(
+        self, path: str, params: dict | None, list_key: str, fields: "models.FieldNames | None"
+    ) -> Iterator:
+        """Yield list items as they are parsed off the wire, following page tokens."""
+        from . import json_stream, models
+
+        decode = (lambda item: item) if fields is None else models.decoder(
+            models.MODELS[list_key], tuple(fields)
+        )
+        params = dict(params or {})
+        while True:
+            parser = json_stream.ListStreamParser(list_key)
+            response = self._request("GET", path, params=params, stream=True)
+            try:
+                for chunk in response.iter_text():
+                    yield from map(decode, parser.feed(chunk))
+                yield from map(decode, parser.close())
+            finally:
+                response.close()
+            page_token = parser.meta.get(json_stream.NEXT_PAGE_KEY)
+            if not page_token:
+                return
+            params[json_stream.PAGE_PARAM] = page_token
+
+    def iter_email_recent(
+        self, hours: int = 24, fields: "models.FieldNames | None" = None
+    ) -> Iterator:
+        """Like get_email_recent(), but yield messages while the response is still arriving.
+
+        Memory stays flat however large the inbox is, and breaking out of the
+        loop stops reading (and fetching further pages). Not cached.
+
+        Example:
+            for message in client.iter_email_recent(hours=168, fields=("subject", "sender")):
+                if "invoice" in message["subject"].lower():
+                    break
+
+        Args:
+            hours: Number of hours to look back (default: 24)
+            fields: Message fields to keep, as for get_email_recent() (default: all, as dicts)
+        """
+        return self._iter_list("/email/recent", {"hours": hours}, "messages", fields)
+
+    def iter_calendar_events(
+        self, days: int = 1, fields: "models.FieldNames | None" = None
+    ) -> Iterator:
+        """Like get_calendar_events(), but yield events while the response is still arriving."""
+        return self._iter_list(*_calendar_request(days), "events", fields)
+
+    def iter_tasks_upcoming(
+        self, days: int = 7, fields: "models.FieldNames | None" = None
+    ) -> Iterator:
+        """Like get_tasks_upcoming(), but yield tasks while the response is still arriving."""
+        return self._iter_list("/tasks/upcoming", {"days": days}, "tasks", fields)
+
+    def _sync(self, kind: str, amount: int, scope: str | None) -> dict:
+        """Fetch only what changed since the stored cursor and merge it into the snapshot."""
+        from . import models, sync
+
+        store, scope, resource, params, snapshot = self._sync_plan(kind, amount, scope)
+        try:
+            body = models.loads(self._request("GET", resource.path, params=params).content)
+        except httpx.HTTPStatusError as e:
+            if snapshot is None or e.response.status_code != 410:
+                raise
+            # The gateway expired the cursor; start over with a full sync
+            params, snapshot = dict(resource.params), None
+            body = models.loads(self._request("GET", resource.path, params=params).content)
+        result = sync.apply(store, scope, resource, snapshot, body)
+        _note_sync(result)
+        return result
+
+    @traced("gateway.sync_email_recent")
+    def sync_email_recent(self, hours: int = 24, scope: str | None = None) -> dict:
+        """Like get_email_recent(), but transfers only messages new since the last sync.
+
+        Args:
+            hours: Number of hours to look back (default: 24)
+            scope: Snapshot owner (default: the automation being run)
+        """
+        return self._sync("email", hours, scope)
+
+    @traced("gateway.sync_calendar_events")
+    def sync_calendar_events(self, days: int = 1, scope: str | None = None) -> dict:
+        """Like get_calendar_events(), but transfers only events changed since the last sync."""
+        return self._sync("calendar", days, scope)
+
+    @traced("gateway.sync_tasks_upcoming")
+    def sync_tasks_upcoming(self, days: int = 7, scope: str | None = None) -> dict:
+        """Like get_tasks_upcoming(), but transfers only tasks changed since the last sync."""
+        return self._sync("tasks", days, scope)
 
     def close(self):
-        """Close the underlying HTTP client."""
+        """Send pending notifications and close the HTTP client once revalidations finish."""
+        if self.notifier is not None:
+            self.notifier.close()
+        for thread in list(self._revalidating.values()):
+            thread.join()
+        # Only loaded if gather_context ran, so sync-only scripts still skip asyncio
+        async_gateway = sys.modules.get(f"{__package__}.async_gateway")
+        if async_gateway is not None:
+            async_gateway.close_shared(self)
         self._client.close()
 
     def __enter__(self):
@@ -97,3 +538,63 @@ class GatewayClient:
 
     def __exit__(self, *args):
         self.close()
+
+
+# Process-wide pooled clients, keyed by base URL, API key and cache backend
+_clients: dict[tuple, GatewayClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(config: dict | None = None, cache_backend: str | None = None) -> GatewayClient:
+    """Return the shared GatewayClient for this process, creating it on first use.
+
+    Long-lived processes (scheduler, triggered service) reuse its keep-alive
+    connections instead of opening a new one per run. Callers must not close
+    it; close_clients() runs at interpreter exit.
+
+    Args:
+        config: Loaded configuration (loaded from config.yaml if omitted)
+        cache_backend: Override the configured cache backend (e.g. "memory")
+    """
+    base_url, api_key, _ = _client_settings(None, None)
+    key = (base_url, api_key, cache_backend)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None or client._client.is_closed:
+            from .cache import CompletionCache, ResponseCache
+            from .notifications import NotificationRules
+            from .retry import GatewayPolicy
+
+            if config is None:
+                from .config_loader import load_config
+
+                config = load_config()
+            client = GatewayClient(
+                cache=ResponseCache.from_config(config, backend=cache_backend),
+                policy=GatewayPolicy.from_config(config),
+                completions=CompletionCache.from_config(config),
+                notifications=NotificationRules.from_config(config),
+            )
+            _clients[key] = client
+        return client
+
+
+def close_clients() -> None:
+    """Close every shared client; safe to call more than once."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_clients)
+
+
+def __getattr__(name: str):
+    # The async client lives in its own module so sync-only scripts skip importing asyncio
+    if name in ("AsyncGatewayClient", "ContextResult", "agather_context", "gather_context"):
+        from . import async_gateway
+
+        return getattr(async_gateway, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,267 @@
+"""Append-only run history with per-automation latency statistics.
+
+Every execution (runner, scheduler, triggered handler) appends one compact row
+to a SQLite database in WAL mode, so the scheduler, worker processes and the
+web service can write concurrently while readers query without blocking.
+Rows older than the retention window are deleted during periodic compaction.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+# Compact (delete expired rows) after this many inserts
+COMPACT_EVERY = 1000
+
+
+@dataclass
+class RunRecord:
+    """Outcome of one execution, filled in while it runs."""
+
+    automation: str
+    source: str
+    run_id: str = field(default_factory=lambda: os.urandom(8).hex())
+    started_at: float = field(default_factory=time.time)
+    duration_ms: float = 0.0
+    status: str = "running"
+    error: str | None = None
+    # path -> [calls, total ms]
+    gateway: dict[str, list] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _recorded: bool = field(default=False, repr=False)  # Row written to the history
+
+    def note_call(self, path: str, elapsed_ms: float, calls: int = 1) -> None:
+        with self._lock:
+            entry = self.gateway.setdefault(path, [0, 0.0])
+            entry[0] += calls
+            entry[1] = round(entry[1] + elapsed_ms, 2)
+
+    def note_error(self, message: str, status: str | None = None) -> None:
+        """Attach an error raised on the run's behalf, e.g. by a notification sent after it.
+
+        Goes into the run's ``error`` (and ``status``, if given) while it is in
+        progress, otherwise into its history row.
+        """
+        with self._lock:
+            self.error = (f"{self.error}; {message}" if self.error else message)[:500]
+            self.status = status or self.status
+            if not self._recorded or _history is None:
+                return
+            try:
+                _history.update(self.run_id, self.status, self.error)
+            except Exception:
+                pass  # History is best-effort
+
+
+_current_run: ContextVar[RunRecord | None] = ContextVar("current_run", default=None)
+
+
+def current_run() -> RunRecord | None:
+    return _current_run.get()
+
+
+@contextmanager
+def gateway_call(path: str) -> Iterator[None]:
+    """Attribute the time of a gateway request (including retries) to the run in progress."""
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.note_call(path, (time.perf_counter() - start) * 1000)
+
+
+class RunHistory:
+    """SQLite-backed store of run records."""
+
+    def __init__(self, path: str = ".cache/history.sqlite", retention_days: float = 30):
+        import sqlite3
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " id INTEGER PRIMARY KEY,"
+            " run_id TEXT,"
+            " automation TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " started_at REAL NOT NULL,"
+            " duration_ms REAL NOT NULL,"
+            " status TEXT NOT NULL,"
+            " error TEXT,"
+            " gateway TEXT);"
+            "CREATE INDEX IF NOT EXISTS runs_by_automation ON runs (automation, started_at);"
+            "CREATE INDEX IF NOT EXISTS runs_by_duration ON runs (automation, duration_ms);"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        if "run_id" not in columns:  # Stores created before run IDs were recorded
+            self._conn.execute("ALTER TABLE runs ADD COLUMN run_id TEXT")
+        self.compact()
+
+    def record(self, run: RunRecord) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, automation, source, started_at, duration_ms, status, "
+                "error, gateway) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run.run_id,
+                    run.automation,
+                    run.source,
+                    run.started_at,
+                    round(run.duration_ms, 2),
+                    run.status,
+                    run.error,
+                    json.dumps(run.gateway) if run.gateway else None,
+                ),
+            )
+            self._conn.commit()
+            self._inserts += 1
+            due = self._inserts % COMPACT_EVERY == 0
+        if due:
+            self.compact()
+
+    def update(self, run_id: str, status: str, error: str | None) -> None:
+        """Change the outcome of a recorded run."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, error = ? WHERE run_id = ?", (status, error, run_id)
+            )
+            self._conn.commit()
+
+    def recent(self, automation: str, limit: int = 50, since: float | None = None) -> list[dict]:
+        """Most recent runs of an automation, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, source, started_at, duration_ms, status, error, gateway FROM runs "
+                "WHERE automation = ? AND started_at >= ? ORDER BY started_at DESC LIMIT ?",
+                (automation, since or 0, limit),
+            ).fetchall()
+        return [
+            {
+                "run_id": run_id,
+                "source": source,
+                "started_at": started_at,
+                "duration_ms": duration_ms,
+                "status": status,
+                "error": error,
+                "gateway": json.loads(gateway) if gateway else {},
+            }
+            for run_id, source, started_at, duration_ms, status, error, gateway in rows
+        ]
+
+    def stats(self, automation: str, window_seconds: float = 86400) -> dict:
+        """Run count, failures and p50/p95 duration over the last ``window_seconds``."""
+        since = time.time() - window_seconds
+        with self._lock:
+            count, failures = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(status != 'success'), 0) FROM runs "
+                "WHERE automation = ? AND started_at >= ?",
+                (automation, since),
+            ).fetchone()
+            percentiles = {
+                f"p{p}_ms": self._percentile(automation, since, count, p) for p in (50, 95)
+            }
+        return {
+            "window_seconds": window_seconds,
+            "runs": count,
+            "failures": failures,
+            **percentiles,
+        }
+
+    def _percentile(self, automation: str, since: float, count: int, p: int) -> float | None:
+        if not count:
+            return None
+        row = self._conn.execute(
+            "SELECT duration_ms FROM runs WHERE automation = ? AND started_at >= ? "
+            "ORDER BY duration_ms LIMIT 1 OFFSET ?",
+            (automation, since, min(count - 1, int(p / 100 * count))),
+        ).fetchone()
+        return row[0]
+
+    def compact(self) -> int:
+        """Delete runs past the retention window; return how many were removed."""
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM runs WHERE started_at < ?", (cutoff,))
+            self._conn.commit()
+            if deleted.rowcount:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_history: RunHistory | None = None
+_history_loaded = False
+_history_lock = threading.Lock()
+
+
+def get_history(config: dict | None = None) -> RunHistory | None:
+    """Return the process-wide history store, or None if disabled in config.yaml."""
+    global _history, _history_loaded
+    if _history_loaded:
+        return _history
+    with _history_lock:
+        if not _history_loaded:
+            if config is None:
+                from utils.config_loader import load_config
+
+                config = load_config()
+            history_config = config.get("history") or {}
+            if history_config.get("enabled", True):
+                _history = RunHistory(
+                    history_config.get("path", ".cache/history.sqlite"),
+                    history_config.get("retention_days", 30),
+                )
+            _history_loaded = True
+        return _history
+
+
+@contextmanager
+def track_run(automation: str, source: str, config: dict | None = None) -> Iterator[RunRecord]:
+    """Record the enclosed execution in the run history.
+
+    A normal exit is a success unless the body (or a scheduler timeout) already
+    set another status; any exception, including SystemExit, is an error.
+    """
+    run = RunRecord(automation=automation, source=source)
+    token = _current_run.set(run)
+    start = time.perf_counter()
+    try:
+        yield run
+    except BaseException as e:
+        with run._lock:
+            run.status = "error"
+            run.error = f"{type(e).__name__}: {e}"[:500]
+        raise
+    else:
+        with run._lock:
+            if run.status == "running":
+                run.status = "success"
+    finally:
+        _current_run.reset(token)
+        run.duration_ms = (time.perf_counter() - start) * 1000
+        with run._lock:  # Errors noted from now on update the written row
+            try:
+                history = get_history(config)
+                if history is not None:
+                    history.record(run)
+            except Exception:
+                pass  # History is best-effort; never fail a run over it
+            run._recorded = True
@@ -0,0 +1,171 @@
+"""In-process background job queue with a persistent local journal.
+
+Every state change is appended to a JSON-lines file, so queued jobs are run
+after a restart. A job that was running when the process died is marked
+"interrupted", or re-queued if ``requeue`` says the automation is safe to
+re-run. Only the most recent finished jobs are kept for status lookups, and
+the journal is compacted on startup and whenever it grows well past the jobs
+it still describes.
+
+The queue lives in one process: run the service with a single worker process
+(gunicorn's default) so only one queue replays the journal.
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+PENDING_STATUSES = ("queued", "running")
+# Rewrite the journal once it holds this many lines more than twice the jobs kept
+COMPACT_SLACK = 100
+
+
+class JobQueue:
+    def __init__(
+        self,
+        runner: Callable[[dict], Any],
+        path: str = ".jobs/queue.jsonl",
+        workers: int = 4,
+        retention: int = 500,
+        requeue: Callable[[dict], bool] | None = None,
+    ):
+        """Create the queue and resume any jobs left unfinished by a previous process.
+
+        Args:
+            runner: Called with the job record; its return value becomes the job result
+            path: Journal file
+            workers: Worker threads executing jobs
+            retention: Finished jobs kept for status lookups
+            requeue: Called with a job that was running when the process died;
+                True re-runs it, otherwise it is marked "interrupted" (default)
+        """
+        self.runner = runner
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.retention = retention
+        self.requeue = requeue
+        self._jobs: dict[str, dict] = {}
+        self._finished: deque[str] = deque()  # IDs of finished jobs, oldest first
+        self._lines = 0  # Records in the journal file
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._recover()
+
+    def _recover(self) -> None:
+        """Replay the journal, settle interrupted jobs, compact, and re-enqueue queued jobs."""
+        jobs = self._read_journal()
+        pending = []
+        for job in jobs.values():
+            if job["status"] == "running":
+                if self.requeue is not None and self.requeue(job):
+                    job["status"] = "queued"
+                else:
+                    job.update(
+                        status="interrupted",
+                        error="interrupted by a restart",
+                        finished_at=time.time(),
+                    )
+            if job["status"] == "queued":
+                pending.append(job)
+        finished = [j for j in jobs.values() if j["status"] not in PENDING_STATUSES]
+        finished.sort(key=lambda j: j.get("finished_at") or 0)
+
+        with self._lock:
+            self._jobs = {j["id"]: j for j in finished + pending}
+            self._finished = deque(j["id"] for j in finished)
+            self._prune()
+            self._compact()
+
+        for job in pending:
+            self._executor.submit(self._run, job["id"])
+
+    def _read_journal(self) -> dict[str, dict]:
+        jobs = {}
+        if not self.path.exists():
+            return jobs
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn write from a crash
+                jobs[record["id"]] = record
+        return jobs
+
+    def _save(self, job: dict) -> None:
+        with self._lock:
+            self._jobs[job["id"]] = job
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(job) + "\n")
+            self._lines += 1
+            if job["status"] not in PENDING_STATUSES:
+                self._finished.append(job["id"])
+                self._prune()
+            if self._lines > 2 * len(self._jobs) + COMPACT_SLACK:
+                self._compact()
+
+    def _prune(self) -> None:
+        # Drop the oldest finished jobs past the retention limit (caller holds the lock)
+        while len(self._finished) > self.retention:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def _compact(self) -> None:
+        # Rewrite the journal with one record per job kept (caller holds the lock)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for job in self._jobs.values():
+                f.write(json.dumps(job) + "\n")
+        tmp_path.replace(self.path)
+        self._lines = len(self._jobs)
+
+    def submit(self, route: str, file: str, payload: Any = None) -> str:
+        """Queue an automation run and return its job ID."""
+        job = {
+            "id": uuid.uuid4().hex,
+            "route": route,
+            "file": file,
+            "payload": payload,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        self._save(job)
+        self._executor.submit(self._run, job["id"])
+        return job["id"]
+
+    def _run(self, job_id: str) -> None:
+        job = dict(self._jobs[job_id])
+        self._save({**job, "status": "running", "started_at": time.time()})
+        job = dict(self._jobs[job_id])
+        try:
+            result = self.runner(job)
+        except BaseException as e:
+            job.update(status="failed", error=str(e) or type(e).__name__, finished_at=time.time())
+            self._save(job)
+            if not isinstance(e, Exception):
+                raise  # Settled first, so SystemExit/KeyboardInterrupt don't leave it "running"
+            return
+        try:
+            json.dumps(result)
+        except TypeError:
+            result = repr(result)
+        job.update(status="succeeded", result=result, finished_at=time.time())
+        self._save(job)
+
+    def get(self, job_id: str) -> dict | None:
+        """Return a job's record, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work; queued jobs run on next start, running ones are settled then."""
+        self._executor.shutdown(wait=wait)
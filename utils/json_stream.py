@@ -0,0 +1,178 @@
+"""Incremental decoding of gateway list responses, one item at a time.
+
+List endpoints answer with one JSON object such as
+``{"messages": [{...}, {...}], "next_page_token": "..."}``. ListStreamParser
+is fed the body as it arrives and returns each list item as soon as it is
+complete, so memory stays bounded by one network chunk plus one item rather
+than the whole response. Other top-level keys (cursors, page tokens, counts)
+are collected in ``meta``.
+"""
+
+import json
+import re
+from typing import Any
+
+# Google-style pagination, as used by the Gmail, Calendar and Tasks APIs the gateway wraps
+NEXT_PAGE_KEY = "next_page_token"
+PAGE_PARAM = "page_token"
+
+_SPACE = re.compile(r"\s*")
+_GAP = re.compile(r"\s*(,)?\s*")  # Between list items
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")  # What a number cut off by a chunk may end with
+_decoder = json.JSONDecoder()
+
+_START, _KEY, _COLON, _VALUE, _ITEMS, _DONE = range(6)
+
+
+class ListStreamParser:
+    """Feed text chunks of a list response; get back the items of ``list_key`` as they complete.
+
+    Example:
+        parser = ListStreamParser("messages")
+        for chunk in response.iter_text():
+            for message in parser.feed(chunk):
+                ...
+        for message in parser.close():  # Items still buffered at the end
+            ...
+        next_page = parser.meta.get(NEXT_PAGE_KEY)
+    """
+
+    def __init__(self, list_key: str):
+        self.list_key = list_key
+        self.meta: dict[str, Any] = {}
+        self.items = 0
+        self._state = _START
+        self._key: str | None = None
+        # Last thing read in the current object or list: None (its opening bracket),
+        # "value" or ","; a missing or doubled comma is malformed
+        self._sep: str | None = None
+        self._buffer = ""
+        self._pos = 0
+        self._retry_at = 0  # Buffer length to wait for after an incomplete value
+
+    def feed(self, text: str) -> list:
+        """Accept the next chunk of the body; return the list items it completed."""
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        if len(self._buffer) < self._retry_at:
+            return []
+        self._retry_at = 0
+        return self._parse(final=False)
+
+    def close(self) -> list:
+        """Signal the end of the body and return the remaining items.
+
+        Raises ValueError if the body was truncated or malformed.
+        """
+        self._retry_at = 0
+        items = self._parse(final=True)
+        if self._state != _DONE or self._buffer[self._pos:].strip():
+            raise ValueError(f"Incomplete or malformed JSON list response for {self.list_key!r}")
+        return items
+
+    def _value(self, final: bool) -> tuple[bool, Any]:
+        """Decode the value at the cursor; (False, None) if it has not fully arrived yet."""
+        buffer = self._buffer
+        try:
+            value, end = _decoder.raw_decode(buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise self._malformed() from None
+            # Large items span many chunks; don't re-scan them on every small chunk
+            self._retry_at = 2 * (len(buffer) - self._pos)
+            return False, None
+        if not final and not isinstance(value, (dict, list, str)):
+            # A number or literal may continue in the next chunk ("-12" then ".5e3")
+            if _NUMBER_TAIL.match(buffer, end).end() == len(buffer):
+                return False, None
+        self._pos = end
+        return True, value
+
+    def _malformed(self) -> ValueError:
+        return ValueError(f"Malformed JSON list response for {self.list_key!r}")
+
+    def _separator(self, char: str, closing: str) -> bool:
+        """Consume a comma; True if ``char`` was one. Raises on a misplaced one or its absence."""
+        if char == ",":
+            if self._sep != "value":
+                raise self._malformed()
+            self._pos += 1
+            self._sep = ","
+            return True
+        if (char == closing and self._sep == ",") or (char != closing and self._sep == "value"):
+            raise self._malformed()
+        return False
+
+    def _parse(self, final: bool) -> list:
+        items = []
+        buffer = self._buffer
+        while True:
+            state = self._state
+            if state == _ITEMS:
+                # One regex per item: the whitespace and comma before it
+                gap = _GAP.match(buffer, self._pos)
+                self._pos = gap.end()
+                if gap.group(1):
+                    if self._sep != "value":
+                        raise self._malformed()
+                    self._sep = ","
+                if self._pos == len(buffer):
+                    break
+                char = buffer[self._pos]
+                if char == "]":
+                    if self._sep == ",":
+                        raise self._malformed()
+                    self._pos += 1
+                    self._state = _KEY
+                    self._sep = "value"
+                    continue
+                if char == "," or self._sep == "value":
+                    raise self._malformed()
+                complete, item = self._value(final)
+                if not complete:
+                    break
+                items.append(item)
+                self.items += 1
+                self._sep = "value"
+                continue
+
+            self._pos = _SPACE.match(buffer, self._pos).end()
+            if self._pos == len(buffer) or state == _DONE:
+                break
+            char = buffer[self._pos]
+            if state == _START:
+                if char != "{":
+                    raise ValueError(f"Expected a JSON object for {self.list_key!r}, got {char!r}")
+                self._pos += 1
+                self._state = _KEY
+                self._sep = None
+            elif state == _KEY:
+                if self._separator(char, "}"):
+                    continue
+                if char == "}":
+                    self._pos += 1
+                    self._state = _DONE
+                    continue
+                if char != '"':
+                    raise self._malformed()
+                complete, self._key = self._value(final)
+                if not complete:
+                    break
+                self._state = _COLON
+            elif state == _COLON:
+                if char != ":":
+                    raise self._malformed()
+                self._pos += 1
+                self._state = _VALUE
+            elif self._key == self.list_key and char == "[":
+                self._pos += 1
+                self._state = _ITEMS
+                self._sep = None
+            else:
+                complete, value = self._value(final)
+                if not complete:
+                    break
+                self.meta[self._key] = value
+                self._state = _KEY
+                self._sep = "value"
+        return items
@@ -1,37 +1,193 @@
+"""Process-wide, non-blocking logging setup.
+
+Loggers only enqueue records (QueueHandler); a single QueueListener thread
+formats and writes them to the console and optional rotating log files, so a
+slow terminal or disk never stalls a request. setup_logger() is idempotent:
+calling it on every run attaches the queue handler once per logger.
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+from utils.history import current_run
+from utils.tracing import current_span
+
+DEFAULT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_handlers: list[logging.Handler] = []  # Console/config file handlers owned by _listener
+_settings: Optional[tuple] = None
+_last_config: dict = {}
+_file_handlers: dict[str, logging.Handler] = {}
+_lock = threading.Lock()
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the current run and trace IDs in the emitting thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        run = current_run()
+        span = current_span()
+        record.run_id = run.run_id if run else "-"
+        record.trace_id = span.trace_id if span else "-"
+        record.span_id = span.span_id if span else "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, using the field names Cloud Logging recognizes."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "logger": record.name,
+        }
+        if getattr(record, "run_id", "-") != "-":
+            entry["run_id"] = record.run_id
+        if getattr(record, "trace_id", "-") != "-":
+            project = os.getenv("GCP_PROJECT_ID")
+            trace = f"projects/{project}/traces/{record.trace_id}" if project else record.trace_id
+            entry["logging.googleapis.com/trace"] = trace
+            entry["logging.googleapis.com/spanId"] = record.span_id
+        if record.exc_info:
+            entry["message"] += "\n" + self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _LoggerFilter(logging.Filter):
+    """Passes records from the loggers that asked for a particular log file."""
+
+    def __init__(self):
+        super().__init__()
+        self.names: set[str] = set()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.name in self.names
+
+
+def _make_formatter(log_config: dict) -> logging.Formatter:
+    env_json = os.getenv("AUTOMATIONS_LOG_JSON", "").lower() in ("1", "true", "yes")
+    if log_config.get("json", False) or env_json:
+        return JsonFormatter()
+    return logging.Formatter(log_config.get("format", DEFAULT_FORMAT))
+
+
+def _rotating_handler(path: str, log_config: dict) -> logging.Handler:
+    file_path = Path(path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        file_path,
+        maxBytes=log_config.get("max_bytes", 10 * 1024 * 1024),
+        backupCount=log_config.get("backup_count", 5),
+        encoding="utf-8",
+    )
+    handler.setFormatter(_make_formatter(log_config))
+    return handler
+
+
+def _start_listener(log_config: dict, force: bool = False) -> None:
+    """(Re)start the listener thread with handlers for ``log_config``. Caller holds _lock."""
+    global _listener, _listener_handlers, _settings, _last_config
+
+    settings = (
+        log_config.get("format"), log_config.get("json"), log_config.get("file"),
+        log_config.get("max_bytes"), log_config.get("backup_count"),
+    )
+    if _listener is not None and settings == _settings and not force:
+        return
+
+    console = logging.StreamHandler()
+    console.setFormatter(_make_formatter(log_config))
+    owned = [console]
+    if log_config.get("file"):
+        owned.append(_rotating_handler(log_config["file"], log_config))
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener_handlers:
+            handler.close()
+    _listener = logging.handlers.QueueListener(
+        _queue, *owned, *_file_handlers.values(), respect_handler_level=True
+    )
+    _listener_handlers = owned
+    _listener.start()
+    _settings = settings
+    _last_config = log_config
+
+
+def _stop_listener() -> None:
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()  # Drains queued records before returning
+            _listener = None
+
+
+atexit.register(_stop_listener)
+
+_queue_handler = logging.handlers.QueueHandler(_queue)
+_queue_handler.addFilter(ContextFilter())
+
 
 def setup_logger(
     name: str, config: Optional[dict] = None, log_file: Optional[str] = None
 ) -> logging.Logger:
+    """Return a logger that writes through the shared background listener.
 
+    Safe to call repeatedly (e.g. once per scheduled run): the queue handler
+    is attached only once, and the listener is rebuilt only when the logging
+    settings change.
+
+    Args:
+        name: Logger name
+        config: Loaded configuration; uses its ``logging`` section
+        log_file: Extra rotating log file for this logger's records
+    """
     logger = logging.getLogger(name)
+    logger.propagate = False
+
+    with _lock:
+        # Calls with a config apply its settings; calls without one (e.g. from
+        # utils modules) keep the current ones
+        log_config = (config.get("logging") or {}) if config is not None else _last_config
+        level = str(log_config.get("level", "INFO")).upper()
+        logger.setLevel(getattr(logging, level, logging.INFO))
 
-    if config and "logging" in config:
-        log_config = config["logging"]
-        level = getattr(logging, log_config.get("level", "INFO"))
-        fmt = log_config.get("format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    else:
-        level = logging.INFO
-        fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-
-    logger.setLevel(level)
-    
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(level)
-    console_formatter = logging.Formatter(fmt)
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
-    
-    if log_file:
-        file_path = Path(log_file)
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(level)
-        file_formatter = logging.Formatter(fmt)
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        added = log_file is not None and log_file not in _file_handlers
+        if added:
+            handler = _rotating_handler(log_file, log_config)
+            handler.addFilter(_LoggerFilter())
+            _file_handlers[log_file] = handler
+        if log_file:
+            _file_handlers[log_file].filters[0].names.add(name)
+
+        if config is not None or _listener is None or added:
+            _start_listener(log_config, force=added)
+
+        if _queue_handler not in logger.handlers:
+            logger.addHandler(_queue_handler)
 
     return logger
+
+
+def apply_config(config: dict) -> None:
+    """Re-apply ``config``'s logging section to every logger set up so far (hot reload)."""
+    with _lock:
+        log_config = config.get("logging") or {}
+        level = str(log_config.get("level", "INFO")).upper()
+        for logger in list(logging.Logger.manager.loggerDict.values()):
+            if isinstance(logger, logging.Logger) and _queue_handler in logger.handlers:
+                logger.setLevel(getattr(logging, level, logging.INFO))
+        if _listener is not None:
+            _start_listener(log_config)
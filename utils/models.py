@@ -0,0 +1,131 @@
+"""Compact models for gateway list items, decoded with field projection.
+
+Gateway list responses are nested dicts with every field of every item. When
+a caller passes ``fields=`` (e.g. ``client.get_email_recent(fields=("subject",
+"sender"))``) the items are decoded into ``__slots__`` objects holding only
+those fields, and the dicts and unused strings can be freed. Models keep
+dict-style access (``m["subject"]``, ``m.get("due")``), so code written
+against the dicts keeps working.
+"""
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, ClassVar, Iterable
+
+try:  # Optional; several times faster than json on large inbox payloads
+    import orjson
+
+    loads: Callable[[bytes | str], Any] = orjson.loads
+except ImportError:
+    loads = json.loads
+
+FieldNames = tuple[str, ...] | list[str]
+
+
+class _Model:
+    """Dict-style access for slotted models; fields left out by a projection are unset."""
+
+    __slots__ = ()
+    FIELDS: ClassVar[tuple[str, ...]]
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name: str, default: Any = None) -> Any:
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    def __contains__(self, name: str) -> bool:
+        return hasattr(self, name)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS if hasattr(self, name)}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"{type(self).__name__}({fields})"
+
+
+@dataclass(slots=True, repr=False, eq=False)
+class Event(_Model):
+    FIELDS: ClassVar[tuple[str, ...]] = (
+        "id", "title", "start", "end", "location", "description", "attendees",
+    )
+
+    id: str | None = None
+    title: str | None = None
+    start: str | None = None
+    end: str | None = None
+    location: str | None = None
+    description: str | None = None
+    attendees: list | None = None
+
+
+@dataclass(slots=True, repr=False, eq=False)
+class EmailMessage(_Model):
+    FIELDS: ClassVar[tuple[str, ...]] = (
+        "id", "subject", "sender", "snippet", "received_at", "labels", "category",
+    )
+
+    id: str | None = None
+    subject: str | None = None
+    sender: str | None = None
+    snippet: str | None = None
+    received_at: str | None = None
+    labels: list | None = None
+    category: str | None = None
+
+
+@dataclass(slots=True, repr=False, eq=False)
+class Task(_Model):
+    FIELDS: ClassVar[tuple[str, ...]] = ("id", "title", "due", "list_name", "notes", "status")
+
+    id: str | None = None
+    title: str | None = None
+    due: str | None = None
+    list_name: str | None = None
+    notes: str | None = None
+    status: str | None = None
+
+
+# list key in the gateway response -> model
+MODELS: dict[str, type[_Model]] = {"events": Event, "messages": EmailMessage, "tasks": Task}
+
+
+@lru_cache(maxsize=64)
+def decoder(model: type[_Model], fields: tuple[str, ...]) -> Callable[[dict], _Model]:
+    """Build a function that decodes one item dict into ``model`` with only ``fields`` set."""
+    unknown = set(fields) - set(model.FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Unknown {model.__name__} field(s) {sorted(unknown)}; choose from {model.FIELDS}"
+        )
+    # Slot descriptors' __set__ skips __init__ and attribute lookup for every item
+    setters = tuple((name, getattr(model, name).__set__) for name in fields)
+    new = object.__new__
+
+    def decode(item: dict) -> _Model:
+        obj = new(model)
+        get = item.get
+        for name, set_field in setters:
+            set_field(obj, get(name))
+        return obj
+
+    return decode
+
+
+def project(items: Iterable[dict], model: type[_Model], fields: Iterable[str]) -> list[_Model]:
+    """Decode item dicts into ``model`` objects holding only ``fields``."""
+    decode = decoder(model, tuple(fields))
+    return [decode(item) for item in items]
+
+
+def project_response(data: dict, list_key: str, fields: Iterable[str] | None) -> dict:
+    """Replace a list response's items with projected models; unchanged if ``fields`` is None."""
+    if fields is None:
+        return data
+    return {**data, list_key: project(data.get(list_key) or [], MODELS[list_key], fields)}
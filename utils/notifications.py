@@ -0,0 +1,218 @@
+"""Coalescing of push notifications into digests.
+
+When several automations finish at once, or a webhook burst hits the
+triggered service, each calling ``client.notify()`` would mean a separate
+/notify request and a separate push. A client with notification rules
+instead hands notifications to a NotificationDispatcher, which:
+
+- holds each one for at most ``window`` seconds, merging those with the same
+  title and priority into one digest (sent early once ``max_batch`` pile up)
+- drops a message identical to one accepted in the last ``dedup_seconds``
+- sends ``priority >= immediate_priority`` right away
+- sends whatever is pending when the client closes (end of a run, scheduler
+  or service shutdown, interpreter exit)
+
+A digest that fails to send is noted on the error of every run that
+contributed to it (in the run history if the run already finished).
+
+Rules come from the ``notifications`` section of config.yaml.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .history import RunRecord, current_run
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class NotificationRules:
+    window: float = 5.0  # Seconds a notification may wait for others to join its digest
+    max_batch: int = 10  # Send a digest early once it holds this many messages
+    immediate_priority: int = 1  # This priority and above skip coalescing
+    dedup_seconds: float = 300.0  # Identical title + message within this long is dropped
+
+    @classmethod
+    def from_config(cls, config: dict) -> "NotificationRules | None":
+        """Build rules from the ``notifications`` section of config.yaml, or None if disabled."""
+        notify_config = config.get("notifications") or {}
+        if not notify_config.get("coalesce", False):
+            return None
+        rules = cls()
+        for name in ("window", "max_batch", "immediate_priority", "dedup_seconds"):
+            if notify_config.get(name) is not None:
+                setattr(rules, name, notify_config[name])
+        return rules
+
+
+@dataclass
+class NotificationStats:
+    submitted: int = 0
+    sent: int = 0  # /notify requests made
+    coalesced: int = 0  # Notifications merged into another one's digest
+    duplicates: int = 0
+    failures: int = 0
+    max_wait_seconds: float = 0.0  # Longest a delivered notification was held
+
+    def to_dict(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "duplicates": self.duplicates,
+            "failures": self.failures,
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+        }
+
+
+@dataclass
+class Digest:
+    title: str
+    priority: int
+    messages: list[str] = field(default_factory=list)
+    first_at: float = field(default_factory=time.monotonic)
+    runs: list[RunRecord] = field(default_factory=list)  # Runs that submitted messages
+
+    def render(self) -> tuple[str, str]:
+        """Title and message to send; a single notification goes out unchanged."""
+        if len(self.messages) == 1:
+            return self.title, self.messages[0]
+        return f"{self.title} ({len(self.messages)})", "\n".join(f"• {m}" for m in self.messages)
+
+
+class NotificationDispatcher:
+    """Buffers notifications and sends them as per-title digests on a background thread.
+
+    Example:
+        dispatcher = NotificationDispatcher(client.send_notification, rules)
+        dispatcher.submit("Build", "Deploy finished")  # {"status": "queued", ...}
+        dispatcher.close()  # Sends anything still pending
+    """
+
+    def __init__(
+        self, send: Callable[[str, str, int], dict], rules: NotificationRules | None = None
+    ):
+        """Create a dispatcher; its thread starts with the first queued notification.
+
+        Args:
+            send: Delivers one notification immediately, e.g. GatewayClient.send_notification
+            rules: Coalescing window, batch size, immediate priority and dedup period
+        """
+        self._send = send
+        self.rules = rules or NotificationRules()
+        self.stats = NotificationStats()
+        self._pending: dict[tuple[str, int], Digest] = {}
+        self._recent: dict[tuple[str, str], float] = {}  # (title, message) -> accepted at
+        self._lock = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def submit(self, title: str, message: str, priority: int = 0) -> dict:
+        """Queue a notification, or send it now if urgent; returns what happened to it.
+
+        The result is the gateway's response when sent on this thread, otherwise
+        ``{"status": "queued"}`` or ``{"status": "duplicate"}``.
+        """
+        now = time.monotonic()
+        run = current_run()
+        with self._lock:
+            self.stats.submitted += 1
+            accepted_at = self._recent.get((title, message))
+            if accepted_at is not None and now - accepted_at < self.rules.dedup_seconds:
+                self.stats.duplicates += 1
+                return {"status": "duplicate"}
+            self._remember(title, message, now)
+
+            if self._closed or priority >= self.rules.immediate_priority:
+                digest = Digest(title, priority, [message], now)
+            else:
+                digest = self._pending.get((title, priority))
+                if digest is None:
+                    digest = Digest(title, priority, first_at=now)
+                    self._pending[(title, priority)] = digest
+                    self._start()
+                    self._lock.notify()
+                else:
+                    self.stats.coalesced += 1
+                digest.messages.append(message)
+                if run is not None and all(r is not run for r in digest.runs):
+                    digest.runs.append(run)
+                if len(digest.messages) < self.rules.max_batch:
+                    return {"status": "queued", "pending": len(digest.messages)}
+                del self._pending[(title, priority)]
+        return self._deliver(digest, raise_errors=True)
+
+    def flush(self) -> int:
+        """Send every pending digest now; returns how many were sent."""
+        with self._lock:
+            digests = list(self._pending.values())
+            self._pending.clear()
+        return sum(1 for digest in digests if self._deliver(digest) is not None)
+
+    def close(self) -> None:
+        """Flush pending digests and stop the background thread; later submits send directly."""
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _remember(self, title: str, message: str, now: float) -> None:
+        if len(self._recent) >= 1024:
+            cutoff = now - self.rules.dedup_seconds
+            self._recent = {k: t for k, t in self._recent.items() if t > cutoff}
+        self._recent[(title, message)] = now
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="notification-dispatcher", daemon=True
+            )
+            self._thread.start()
+
+    def _due(self, now: float) -> list[Digest]:
+        due = [k for k, d in self._pending.items() if now - d.first_at >= self.rules.window]
+        return [self._pending.pop(k) for k in due]
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                digests = self._due(time.monotonic())
+                while not digests and not self._closed:
+                    oldest = min((d.first_at for d in self._pending.values()), default=None)
+                    deadline = None if oldest is None else oldest + self.rules.window
+                    self._lock.wait(None if deadline is None else deadline - time.monotonic())
+                    digests = self._due(time.monotonic())
+                if not digests:
+                    return  # Closed; close() flushes the rest
+            for digest in digests:
+                self._deliver(digest)
+
+    def _deliver(self, digest: Digest, raise_errors: bool = False) -> dict | None:
+        title, message = digest.render()
+        try:
+            result = self._send(title, message, digest.priority)
+        except Exception as e:
+            with self._lock:
+                self.stats.failures += 1
+                for text in digest.messages:  # Let a retry through the dedup check
+                    self._recent.pop((digest.title, text), None)
+            if raise_errors:
+                raise  # The caller's run sees the exception itself
+            count = len(digest.messages)
+            error = f"Failed to send notification {title!r} ({count} message(s)): {e}"
+            _logger.warning(error)
+            for run in digest.runs:
+                run.note_error(error)
+            return None
+        with self._lock:
+            self.stats.sent += 1
+            self.stats.max_wait_seconds = max(
+                self.stats.max_wait_seconds, time.monotonic() - digest.first_at
+            )
+        return result
@@ -0,0 +1,220 @@
+"""Retry, backoff, circuit breaker and connection pool policy for gateway calls."""
+
+import importlib.util
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+# Failures where the request never reached the gateway, so even
+# non-idempotent calls (e.g. notify) are safe to resend.
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+TRANSIENT_ERRORS = (httpx.TransportError,)
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised without contacting the gateway while an endpoint's breaker is open."""
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    retry_statuses: frozenset[int] = frozenset({429, 502, 503, 504})
+
+    def should_retry(
+        self,
+        attempt: int,
+        idempotent: bool,
+        response: httpx.Response | None = None,
+        error: Exception | None = None,
+    ) -> bool:
+        """Decide whether a failed attempt (1-based) should be retried."""
+        if attempt >= self.max_attempts:
+            return False
+        if error is not None:
+            if isinstance(error, UNSENT_ERRORS):
+                return True
+            return idempotent and isinstance(error, TRANSIENT_ERRORS)
+        if response is None or response.status_code not in self.retry_statuses:
+            return False
+        # 429 means the request was rejected before processing
+        return idempotent or response.status_code == 429
+
+    def delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        """Seconds to wait before the next attempt: Retry-After if given, else full jitter."""
+        retry_after = _retry_after_seconds(response) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+
+def _retry_after_seconds(response: httpx.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets a single probe through after a cool-down."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(
+    key: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+) -> CircuitBreaker:
+    """Return the process-wide breaker for an endpoint, so all clients share its state."""
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(failure_threshold, reset_timeout)
+        return _breakers[key]
+
+
+@dataclass
+class GatewayPolicy:
+    """Retry, breaker, per-method timeout and connection pool settings for a gateway client."""
+
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    timeouts: dict[str, dict] = field(default_factory=lambda: {
+        "default": {"connect": 5.0, "read": 30.0},
+        "ai_chat": {"connect": 5.0, "read": 120.0},
+        "notify": {"connect": 5.0, "read": 10.0},
+    })
+    pool: dict = field(default_factory=lambda: {
+        "http2": "auto",
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "keepalive_expiry": 60.0,
+    })
+
+    @classmethod
+    def from_config(cls, config: dict) -> "GatewayPolicy":
+        """Build a policy from the ``gateway`` section of config.yaml."""
+        gateway_config = config.get("gateway") or {}
+        retry_config = gateway_config.get("retry") or {}
+        breaker_config = gateway_config.get("circuit_breaker") or {}
+
+        policy = cls()
+        policy.retry = RetryPolicy(
+            max_attempts=retry_config.get("max_attempts", policy.retry.max_attempts),
+            backoff_base=retry_config.get("backoff_base", policy.retry.backoff_base),
+            backoff_max=retry_config.get("backoff_max", policy.retry.backoff_max),
+            retry_statuses=frozenset(
+                retry_config.get("retry_statuses", policy.retry.retry_statuses)
+            ),
+        )
+        policy.failure_threshold = breaker_config.get("failure_threshold", policy.failure_threshold)
+        policy.reset_timeout = breaker_config.get("reset_timeout", policy.reset_timeout)
+        policy.timeouts.update(gateway_config.get("timeouts") or {})
+        policy.pool.update(gateway_config.get("pool") or {})
+        return policy
+
+    def timeout_for(self, endpoint: str) -> httpx.Timeout:
+        settings = self.timeouts.get(endpoint, self.timeouts["default"])
+        return httpx.Timeout(
+            connect=settings.get("connect", 5.0),
+            read=settings.get("read", 30.0),
+            write=settings.get("write", 30.0),
+            pool=settings.get("pool", 5.0),
+        )
+
+    def call_budget(self, endpoint: str = "default") -> float:
+        """Worst-case seconds for one call: every attempt timing out plus the longest backoffs."""
+        timeout = self.timeout_for(endpoint)
+        attempt = (timeout.connect or 0.0) + (timeout.read or 0.0)
+        retries = max(self.retry.max_attempts - 1, 0)
+        return self.retry.max_attempts * attempt + retries * self.retry.backoff_max
+
+    def http2(self) -> bool:
+        """Whether to negotiate HTTP/2; "auto" enables it only when h2 is installed."""
+        setting = self.pool.get("http2", "auto")
+        if setting == "auto":
+            return importlib.util.find_spec("h2") is not None
+        return bool(setting)
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.pool.get("max_connections", 20),
+            max_keepalive_connections=self.pool.get("max_keepalive_connections", 10),
+            keepalive_expiry=self.pool.get("keepalive_expiry", 60.0),
+        )
+
+
+@dataclass
+class GatewayStats:
+    """Counters describing how much work went into retries and breaker rejections."""
+
+    requests: int = 0
+    attempts: int = 0
+    retries: int = 0
+    retry_wait_seconds: float = 0.0
+    failures: int = 0
+    breaker_rejections: int = 0
+    completion_cache_hits: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "retry_wait_seconds": round(self.retry_wait_seconds, 3),
+            "failures": self.failures,
+            "breaker_rejections": self.breaker_rejections,
+            "completion_cache_hits": self.completion_cache_hits,
+        }
@@ -1,79 +1,348 @@
-import schedule
+import heapq
+import itertools
+import multiprocessing
+import threading
 import time
-import importlib.util
-import sys
-from pathlib import Path
-from utils.logger import setup_logger
-from utils.config_loader import load_config
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
 
+from utils.cron import CronError, CronExpression, IntervalSchedule, parse_schedule
+from utils.discovery import DEFAULT_TIMEZONE, discover_automations
+from utils.gateway import close_clients
+from utils.logger import apply_config as apply_logging_config, setup_logger
+from utils.config_loader import load_config, watch_config
+from utils.script import run_script
+from utils.tracing import configure as configure_tracing
 
-def run_script(script_path: str):
-    """Import and run a script module."""
-    script_file = Path(script_path)
-    if not script_file.exists():
-        logger = setup_logger(__name__)
-        logger.error(f"Script not found: {script_path}")
-        return
+OVERLAP_POLICIES = ("skip", "queue", "allow")
+EXECUTORS = ("thread", "process")
 
-    spec = importlib.util.spec_from_file_location("script_module", script_path)
-    module = importlib.util.module_from_spec(spec)
-    sys.modules["script_module"] = module
-    spec.loader.exec_module(module)
 
-    if hasattr(module, "main"):
-        module.main()
-    else:
-        logger = setup_logger(__name__)
-        logger.warning(f"Script {script_path} has no main() function")
+@dataclass
+class ScheduledJob:
+    script: str
+    cron: CronExpression | IntervalSchedule
+    tz: ZoneInfo | None = None
+    name: str = ""
+    options: dict = field(default_factory=dict)
 
+    def next_fire(self, after: datetime) -> datetime:
+        return self.cron.next_after(after, self.tz)
 
-def start_scheduler(config_path: str = "config/config.yaml"):
-    """Start the scheduler based on config.yaml schedules."""
-    config = load_config(config_path)
-    logger = setup_logger(__name__, config)
+    def describe(self) -> str:
+        tz_name = self.tz.key if self.tz else "local time"
+        return f"{self.script} at '{self.cron.expression}' ({tz_name})"
 
-    schedules_config = config.get("schedules", [])
+    def key(self) -> tuple:
+        """What determines when and how the job runs; equal keys need no re-plan."""
+        options = sorted((k, repr(v)) for k, v in self.options.items())
+        return self.cron.expression, self.tz.key if self.tz else None, tuple(options)
 
-    if not schedules_config:
-        logger.info("No schedules configured. Add schedules to config.yaml")
-        return
 
-    scheduled_count = 0
-    for sched in schedules_config:
-        script = sched.get("script")
-        schedule_type = sched.get("schedule", "daily")
-        schedule_time = sched.get("time", "09:00")
-        enabled = sched.get("enabled", True)
+def _run_in_process(script_path: str) -> None:
+    # Entry point for process-isolated runs; exits non-zero if the script raises.
+    # multiprocessing children skip atexit, so close the pooled client here
+    try:
+        run_script(script_path, source="scheduler")
+    finally:
+        close_clients()
+
+
+class JobRunner:
+    """Runs due jobs on worker threads or processes, bounded by a global concurrency limit.
+
+    Per job (frontmatter or config.yaml entry):
+        executor: "thread" (default) or "process"
+        timeout: seconds before the run is killed (process) or marked timed out (thread;
+            the thread can't be killed, but its concurrency slot is freed)
+        overlap: what to do when the job is due while still running —
+            "skip" (default), "queue" (run once more after it finishes), or "allow"
+    """
+
+    def __init__(self, config: dict, logger):
+        self.logger = logger
+        self.max_concurrency = (config.get("scheduler") or {}).get("max_concurrency", 4)
+        self.apply_config(config)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._running: dict[str, int] = {}
+        self._queued: set[str] = set()
+        self._processes: set[multiprocessing.Process] = set()
+        self._mp = multiprocessing.get_context("spawn")
+
+    def apply_config(self, config: dict) -> None:
+        """Pick up new scheduler defaults; max_concurrency only changes on restart."""
+        scheduler_config = config.get("scheduler") or {}
+        self.default_timeout = scheduler_config.get("default_timeout")
+        self.default_overlap = scheduler_config.get("default_overlap", "skip")
+        self.default_executor = scheduler_config.get("default_executor", "thread")
+        max_concurrency = scheduler_config.get("max_concurrency", 4)
+        if max_concurrency != self.max_concurrency:
+            self.logger.warning(
+                f"max_concurrency changed to {max_concurrency}; restart the scheduler to apply"
+            )
+
+    def _option(self, job: ScheduledJob, key: str, default, allowed=None):
+        value = job.options.get(key, default)
+        if allowed and value not in allowed:
+            self.logger.warning(f"{job.script}: invalid {key} {value!r}, using {default!r}")
+            return default
+        return value
+
+    def dispatch(self, job: ScheduledJob) -> None:
+        """Start a run of ``job`` without blocking, applying its overlap policy."""
+        overlap = self._option(job, "overlap", self.default_overlap, OVERLAP_POLICIES)
+        with self._lock:
+            if self._running.get(job.script) and overlap != "allow":
+                if overlap == "queue" and job.script not in self._queued:
+                    self._queued.add(job.script)
+                    self.logger.info(f"{job.script} still running; queued another run")
+                else:
+                    self.logger.info(f"{job.script} still running; skipping this run")
+                return
+            self._running[job.script] = self._running.get(job.script, 0) + 1
+
+        threading.Thread(
+            target=self._supervise, args=(job,), name=f"run-{job.name}", daemon=True
+        ).start()
+
+    def _supervise(self, job: ScheduledJob) -> None:
+        with self._slots:
+            start = time.monotonic()
+            executor = self._option(job, "executor", self.default_executor, EXECUTORS)
+            timeout = job.options.get("timeout", self.default_timeout)
+            self.logger.info(f"Running {job.script} ({executor})")
+            hung = None
+            try:
+                if executor == "process":
+                    status = self._run_process(job, timeout)
+                else:
+                    status, hung = self._run_thread(job, timeout)
+            except Exception as e:
+                status = f"failed: {e}"
+            self.logger.info(f"{job.script} {status} in {time.monotonic() - start:.1f}s")
+
+        if hung is not None:
+            # Other jobs may use the slot now, but overlap rules still see this run
+            hung.join()
+            self.logger.warning(
+                f"{job.script} returned after {time.monotonic() - start:.1f}s, past its timeout"
+            )
+        with self._lock:
+            self._running[job.script] -= 1
+            rerun = job.script in self._queued and not self._running[job.script]
+            self._queued.discard(job.script)
+        if rerun:
+            self.dispatch(job)
+
+    def _run_thread(
+        self, job: ScheduledJob, timeout: float | None
+    ) -> tuple[str, threading.Thread | None]:
+        """Run the script on a thread; returns the status and the thread if it timed out."""
+        errors = []
+        timed_out = threading.Event()
+
+        def target():
+            try:
+                run = run_script(job.script, source="scheduler")
+            except Exception as e:
+                errors.append(e)
+                self.logger.exception(f"{job.script} failed: {e}")
+                return
+            if run is not None and timed_out.is_set():
+                run.note_error(f"exceeded {timeout}s timeout", status="timed_out")
+
+        thread = threading.Thread(target=target, name=f"script-{job.name}", daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            # Threads can't be killed; the caller frees the slot and waits for it outside
+            timed_out.set()
+            self.logger.error(
+                f"{job.script} exceeded {timeout}s timeout; use executor: process to kill hung runs"
+            )
+            return f"timed out after {timeout}s", thread
+        return f"failed: {errors[0]}" if errors else "succeeded", None
+
+    def _run_process(self, job: ScheduledJob, timeout: float | None) -> str:
+        process = self._mp.Process(
+            target=_run_in_process, args=(job.script,), name=f"script-{job.name}"
+        )
+        process.start()
+        with self._lock:
+            self._processes.add(process)
+        try:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(5)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+                return f"killed after {timeout}s timeout"
+            return "succeeded" if process.exitcode == 0 else f"failed: exit code {process.exitcode}"
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+    def shutdown(self) -> None:
+        """Terminate process runs; thread runs are daemons and end with the scheduler."""
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            process.terminate()
+        close_clients()
 
-        if not enabled:
+
+def load_jobs(config: dict, logger) -> list[ScheduledJob]:
+    """Collect scheduled jobs from script frontmatter and config.yaml.
+
+    Frontmatter is the same source deploy.py uses for Cloud Scheduler, so local
+    and GCP schedules match. Entries in config.yaml's ``schedules`` override
+    frontmatter for the same script and may use the legacy "daily"/"hourly"/
+    "every N minutes" forms.
+    """
+    jobs: dict[str, ScheduledJob] = {}
+
+    for auto in discover_automations():
+        if auto.get("type") != "scheduled" or not auto.get("schedule"):
+            continue
+        try:
+            jobs[auto["file"]] = ScheduledJob(
+                script=auto["file"],
+                cron=CronExpression(auto["schedule"]),
+                tz=ZoneInfo(auto.get("timezone", DEFAULT_TIMEZONE)),
+                name=auto.get("name", auto["file"]),
+                options=auto,
+            )
+        except (CronError, KeyError, ValueError) as e:
+            logger.error(f"Invalid schedule in {auto['file']}: {e}")
+
+    for sched in config.get("schedules") or []:
+        script = sched.get("script")
+        if not sched.get("enabled", True):
             logger.info(f"Skipping disabled schedule: {script}")
+            jobs.pop(script, None)
             continue
+        try:
+            cron = parse_schedule(sched.get("schedule", "daily"), sched.get("time", "09:00"))
+            if isinstance(cron, IntervalSchedule):
+                logger.warning(
+                    f"Schedule for {script} ({cron.expression!r}) has no evenly spaced cron "
+                    "form; running it as a fixed interval. Prefer a divisor of 60 minutes, "
+                    "whole hours dividing 24, or a cron expression."
+                )
+            tz = ZoneInfo(sched["timezone"]) if sched.get("timezone") else None
+            jobs[script] = ScheduledJob(
+                script=script, cron=cron, tz=tz, name=script, options=sched
+            )
+        except (CronError, KeyError, ValueError) as e:
+            logger.error(f"Invalid schedule for {script}: {e}")
 
-        if schedule_type == "daily":
-            schedule.every().day.at(schedule_time).do(run_script, script_path=script)
-            logger.info(f"Scheduled {script} daily at {schedule_time}")
-        elif schedule_type == "hourly":
-            schedule.every().hour.do(run_script, script_path=script)
-            logger.info(f"Scheduled {script} hourly")
-        elif "minute" in schedule_type.lower():
-            try:
-                minutes = int(schedule_type.split()[1])
-                schedule.every(minutes).minutes.do(run_script, script_path=script)
-                logger.info(f"Scheduled {script} every {minutes} minutes")
-            except (IndexError, ValueError):
-                logger.error(f"Invalid schedule format: {schedule_type}")
-                continue
+    return list(jobs.values())
+
+
+def sleep_until(when: datetime, wake: threading.Event | None = None) -> bool:
+    """Sleep until an aware datetime; return False early if ``wake`` is set."""
+    while True:
+        remaining = (when - datetime.now(timezone.utc)).total_seconds()
+        if remaining <= 0:
+            return True
+        if wake is None:
+            time.sleep(remaining)
+        elif wake.wait(remaining):
+            return False
+
+
+def replan(
+    heap: list, current: dict[str, ScheduledJob], jobs: list[ScheduledJob], logger
+) -> dict[str, ScheduledJob]:
+    """Push heap entries for added or changed jobs; return the new script -> job map.
+
+    Entries for removed or replaced jobs stay in the heap and are dropped when
+    popped (they no longer match ``current``), so unchanged jobs keep their
+    next fire time untouched.
+    """
+    now = datetime.now(timezone.utc)
+    planned = {job.script: job for job in jobs}
+    for script in current.keys() - planned.keys():
+        logger.info(f"Unscheduled {script}")
+    for script, job in planned.items():
+        old = current.get(script)
+        if old is not None and old.key() == job.key():
+            planned[script] = old
+            continue
+        fire = job.next_fire(now)
+        heapq.heappush(heap, (fire, next(_sequence), job))
+        verb = "Rescheduled" if old is not None else "Scheduled"
+        logger.info(f"{verb} {job.describe()}, next run {fire.isoformat()}")
+    return planned
+
+
+# Tie-breaker so heap entries never compare ScheduledJob objects
+_sequence = itertools.count()
+
+
+def start_scheduler(config_path: str = "config/config.yaml"):
+    """Run scheduled scripts at their cron times.
+
+    Next fire times are kept in a heap and the loop sleeps exactly until the
+    earliest one, so jobs fire on time without periodic polling. Edits to
+    config.yaml are picked up while running: logging settings are re-applied
+    and only jobs whose schedule or options changed are re-planned.
+    """
+    config = load_config(config_path)
+    logger = setup_logger(__name__, config)
+    configure_tracing(config)
+
+    runner = JobRunner(config, logger)
+    heap: list = []
+    current = replan(heap, {}, load_jobs(config, logger), logger)
+    if not current:
+        logger.info(
+            "No schedules found. Add frontmatter to scheduled/ scripts or config.yaml; "
+            "waiting for config changes"
+        )
 
-        scheduled_count += 1
+    wake = threading.Event()
 
-    if scheduled_count == 0:
-        logger.info("No enabled schedules found")
-        return
+    def on_config_change(config, changed: set[str]) -> None:
+        logger.info(f"Config changed: {', '.join(sorted(changed))}")
+        if "logging" in changed:
+            apply_logging_config(config)
+        if "tracing" in changed:
+            configure_tracing(config)
+        if "scheduler" in changed:
+            runner.apply_config(config)
+        if changed & {"schedules", "scheduler"}:
+            wake.set()
 
-    logger.info(f"Scheduler started with {scheduled_count} schedule(s). Ctrl+C to stop.")
+    watch = config.get("config_watch") or {}
+    watcher = (
+        watch_config(on_config_change, config_path, watch.get("interval", 2.0))
+        if watch.get("enabled", True) else None
+    )
+    logger.info(
+        f"Scheduler started with {len(current)} schedule(s), "
+        f"max {runner.max_concurrency} concurrent run(s). Ctrl+C to stop."
+    )
     try:
         while True:
-            schedule.run_pending()
-            time.sleep(60)
+            if not heap:
+                wake.wait()
+            elif sleep_until(heap[0][0], wake):
+                _, _, job = heapq.heappop(heap)
+                if current.get(job.script) is not job:
+                    continue  # Removed or rescheduled since it was planned
+                runner.dispatch(job)
+                fire = job.next_fire(datetime.now(timezone.utc))
+                heapq.heappush(heap, (fire, next(_sequence), job))
+            if wake.is_set():
+                wake.clear()
+                current = replan(heap, current, load_jobs(config, logger), logger)
     except KeyboardInterrupt:
+        if watcher is not None:
+            watcher.stop()
+        runner.shutdown()
         logger.info("Scheduler stopped")
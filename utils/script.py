@@ -0,0 +1,121 @@
+import importlib.util
+import inspect
+import re
+import sys
+import time
+from pathlib import Path
+
+from utils.history import RunRecord, track_run
+from utils.logger import setup_logger
+from utils.tracing import span
+
+
+def accepts_client(func) -> bool:
+    """Whether ``main`` takes a ``client`` argument to receive a shared GatewayClient."""
+    try:
+        return "client" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def automation_name(script_file: Path) -> str:
+    """The frontmatter ``name`` of a script, falling back to its file name."""
+    from utils.discovery import parse_frontmatter
+
+    try:
+        frontmatter = parse_frontmatter(script_file) or {}
+    except (OSError, UnicodeDecodeError):
+        frontmatter = {}
+    return frontmatter.get("name") or script_file.stem.replace("_", "-")
+
+
+def run_script(script_path: str, client=None, source: str = "runner") -> RunRecord | None:
+    """Import and run a script module, recording the run in the run history.
+
+    Args:
+        script_path: Path to the script
+        client: GatewayClient passed to ``main(client=...)`` when main accepts it
+            (defaults to the process-wide pooled client from utils.gateway.get_client)
+        source: What started the run ("runner", "scheduler", ...), for the history
+
+    Returns the run's history record, or None if the script could not be run.
+    """
+    script_file = Path(script_path)
+    if not script_file.exists():
+        logger = setup_logger(__name__)
+        logger.error(f"Script not found: {script_path}")
+        return
+
+    with (
+        span("run_script", script=script_path),
+        track_run(automation_name(script_file), source) as run,
+    ):
+        # Per-script module name so concurrent runs of different scripts don't collide
+        module_name = "script_" + re.sub(r"\W", "_", str(script_file.with_suffix("")))
+        with span("script.import"):
+            spec = importlib.util.spec_from_file_location(module_name, script_path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+
+        if not hasattr(module, "main"):
+            logger = setup_logger(__name__)
+            logger.warning(f"Script {script_path} has no main() function")
+            return
+
+        with span("script.main"):
+            if accepts_client(module.main):
+                if client is None:
+                    from utils.gateway import get_client
+
+                    client = get_client()
+                module.main(client=client)
+            else:
+                module.main()
+    return run
+
+
+def run_batch(script_paths: list[str], config: dict, logger) -> dict[str, str | None]:
+    """Run several scripts in this process, sharing one GatewayClient and response cache.
+
+    Scripts run one after another; a failure is logged and the batch moves on.
+    Returns each script's error message, or None if it succeeded.
+    """
+    from utils.cache import CompletionCache, MemoryCache, ResponseCache
+    from utils.gateway import GatewayClient
+    from utils.notifications import NotificationRules
+    from utils.retry import GatewayPolicy
+
+    # Without a configured cache, still share responses for the life of the batch
+    cache = ResponseCache.from_config(config) or ResponseCache(
+        MemoryCache(), default_ttl=(config.get("batch") or {}).get("cache_ttl", 300)
+    )
+    results: dict[str, str | None] = {}
+
+    with (
+        GatewayClient(
+            cache=cache,
+            policy=GatewayPolicy.from_config(config),
+            completions=CompletionCache.from_config(config),
+            notifications=NotificationRules.from_config(config),
+        ) as client,
+        span("run_batch", scripts=len(script_paths)),
+    ):
+        for script_path in script_paths:
+            start = time.monotonic()
+            if not Path(script_path).exists():
+                results[script_path] = "script not found"
+            else:
+                try:
+                    run_script(script_path, client=client)
+                    results[script_path] = None
+                except Exception as e:
+                    logger.exception(f"{script_path} failed: {e}")
+                    results[script_path] = str(e) or type(e).__name__
+            status = results[script_path] or "succeeded"
+            if results[script_path]:
+                status = f"failed: {status}"
+            logger.info(f"{script_path} {status} in {time.monotonic() - start:.1f}s")
+        logger.info(f"Gateway stats: {client.stats.to_dict()}")
+
+    return results
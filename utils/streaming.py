@@ -0,0 +1,238 @@
+"""Server-sent event parsing and early cutoff for streamed AI chat completions."""
+
+import json
+import re
+import time
+from typing import AsyncIterator, Callable, Iterator
+
+from .history import current_run
+from .tracing import NOOP_SPAN, start_span
+
+CHAT_PATH = "/ai/v1/chat/completions"
+
+_SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+
+def parse_sse_line(line: str) -> str | None:
+    """Return the content delta carried by one SSE line, or None if it carries none."""
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if not data or data == "[DONE]":
+        return None
+    try:
+        chunk = json.loads(data)
+    except json.JSONDecodeError:
+        return None
+    choices = chunk.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content")
+
+
+def is_done(line: str) -> bool:
+    return line.startswith("data:") and line[5:].strip() == "[DONE]"
+
+
+class Cutoff:
+    """Trims a stream of deltas to a character and/or sentence budget."""
+
+    def __init__(self, max_chars: int | None = None, max_sentences: int | None = None):
+        self.max_chars = max_chars
+        self.max_sentences = max_sentences
+        self.text = ""
+        self.done = False
+
+    def feed(self, delta: str) -> str:
+        """Accept a delta and return the part of it that fits within the budget."""
+        if self.done:
+            return ""
+        candidate = self.text + delta
+        end = len(candidate)
+
+        if self.max_sentences is not None:
+            ends = [m.end() for m in _SENTENCE_END.finditer(candidate)]
+            if len(ends) >= self.max_sentences:
+                end = min(end, ends[self.max_sentences - 1])
+                self.done = True
+        if self.max_chars is not None and end >= self.max_chars:
+            end = self.max_chars
+            self.done = True
+
+        emitted = candidate[len(self.text):end]
+        self.text = candidate[:end]
+        return emitted
+
+
+class _BaseChatStream:
+    def __init__(
+        self,
+        max_chars: int | None = None,
+        max_sentences: int | None = None,
+        on_complete: Callable[[str], None] | None = None,
+    ):
+        self.cutoff = Cutoff(max_chars, max_sentences)
+        self.started_at: float | None = None
+        self.time_to_first_token: float | None = None
+        self.total_time: float | None = None
+        self.cached: str | None = None  # "exact" / "near" when replayed from the completion cache
+        self._on_complete = on_complete  # Called with the text once the stream finishes cleanly
+        self._complete = False
+        self._span = NOOP_SPAN
+        self._run = None
+        self._opened_at: float | None = None  # When the response headers arrived
+
+    def _start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._span = start_span("gateway.ai_chat_stream")
+        self._run = current_run()
+
+    @property
+    def text(self) -> str:
+        return self.cutoff.text
+
+    @property
+    def stopped_early(self) -> bool:
+        return self.cutoff.done
+
+    def _on_line(self, line: str) -> str | None:
+        delta = parse_sse_line(line)
+        if not delta:
+            return None
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self.started_at
+        return self.cutoff.feed(delta) or None
+
+    def _finish(self) -> None:
+        self.total_time = time.perf_counter() - self.started_at
+        self._span.set(**self.timings())
+        self._span.end()
+        if self._run is not None and self._opened_at is not None:
+            # The request itself was counted when it was opened; add the time spent on the body
+            self._run.note_call(CHAT_PATH, (time.perf_counter() - self._opened_at) * 1000, calls=0)
+        if self._complete and self.text and self._on_complete is not None:
+            self._on_complete(self.text)
+
+    def as_completion(self) -> dict:
+        """Shape the streamed text like a non-streaming chat completion response."""
+        return {"choices": [{"message": {"role": "assistant", "content": self.text}}]}
+
+    def timings(self) -> dict:
+        return {
+            "time_to_first_token": self.time_to_first_token,
+            "total_time": self.total_time,
+            "chars": len(self.text),
+            "stopped_early": self.stopped_early,
+            "cached": self.cached,
+        }
+
+
+class ChatStream(_BaseChatStream):
+    """Iterator over content deltas of a streamed chat completion.
+
+    Iteration stops once the cutoff is reached, closing the connection so the
+    gateway stops generating.
+    """
+
+    def __init__(self, open_stream: Callable, **cutoff):
+        super().__init__(**cutoff)
+        self._open_stream = open_stream
+
+    def __iter__(self) -> Iterator[str]:
+        self._start()
+        try:
+            with self._open_stream() as response:
+                response.raise_for_status()
+                self._opened_at = time.perf_counter()
+                for line in response.iter_lines():
+                    if is_done(line):
+                        break
+                    delta = self._on_line(line)
+                    if delta:
+                        yield delta
+                    if self.stopped_early:
+                        break
+            self._complete = True
+        except Exception as e:
+            self._span.fail(e)
+            raise
+        finally:
+            self._finish()
+
+    def read(self) -> str:
+        """Consume the stream and return the full (possibly cut off) text."""
+        for _ in self:
+            pass
+        return self.text
+
+    def read_completion(self) -> dict:
+        self.read()
+        return self.as_completion()
+
+
+class AsyncChatStream(_BaseChatStream):
+    """Async iterator counterpart of ChatStream."""
+
+    def __init__(self, open_stream: Callable, **cutoff):
+        super().__init__(**cutoff)
+        self._open_stream = open_stream
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self._start()
+        try:
+            async with self._open_stream() as response:
+                response.raise_for_status()
+                self._opened_at = time.perf_counter()
+                async for line in response.aiter_lines():
+                    if is_done(line):
+                        break
+                    delta = self._on_line(line)
+                    if delta:
+                        yield delta
+                    if self.stopped_early:
+                        break
+            self._complete = True
+        except Exception as e:
+            self._span.fail(e)
+            raise
+        finally:
+            self._finish()
+
+    async def read(self) -> str:
+        async for _ in self:
+            pass
+        return self.text
+
+    async def read_completion(self) -> dict:
+        await self.read()
+        return self.as_completion()
+
+
+class CachedChatStream(_BaseChatStream):
+    """Replays a cached completion through the ChatStream interface."""
+
+    def __init__(self, text: str, state: str):
+        super().__init__()
+        self.cutoff.text = text
+        self.cached = state
+        self.time_to_first_token = self.total_time = 0.0
+
+    def __iter__(self) -> Iterator[str]:
+        yield self.text
+
+    def read(self) -> str:
+        return self.text
+
+    def read_completion(self) -> dict:
+        return self.as_completion()
+
+
+class AsyncCachedChatStream(CachedChatStream):
+    """Replays a cached completion through the AsyncChatStream interface."""
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        yield self.text
+
+    async def read(self) -> str:
+        return self.text
+
+    async def read_completion(self) -> dict:
+        return self.as_completion()
@@ -0,0 +1,301 @@
+"""Incremental fetching: since-cursors and locally stored snapshots of gateway lists.
+
+A full sync fetches a list (emails, calendar events, tasks) and stores it with
+the ``cursor`` the gateway returned. Later syncs send ``since=<cursor>`` and
+get back only items added or changed since then, plus ``deleted`` IDs, which
+are merged into the snapshot by item ``id``. A frequent automation (e.g. an
+email check every 15 minutes) then transfers only what changed.
+
+Snapshots are kept per automation (the run in progress, see utils.history)
+in SQLite. A full sync happens when there is no snapshot, when the snapshot
+no longer covers the requested window, when the gateway answers 410 Gone or
+``"full": true``, or when the gateway does not return a cursor at all.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from .history import current_run
+
+
+@dataclass
+class Snapshot:
+    cursor: str | None
+    covers_until: float | None  # End of the window the last full sync fetched; None = open
+    items: list[dict]
+    updated_at: float
+
+
+def parse_time(value: Any) -> float | None:
+    """ISO 8601 timestamp (naive means local time) to epoch seconds, or None."""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def start_of_day(now: float) -> float:
+    """Local midnight at or before ``now`` (epoch seconds)."""
+    moment = datetime.fromtimestamp(now).astimezone()
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+@dataclass
+class SyncResource:
+    """How one list endpoint is fetched, merged and trimmed."""
+
+    path: str
+    list_key: str
+    params: dict  # Sent on every sync; identifies the snapshot
+    ahead: float | None = None  # Seconds ahead the caller needs; None for lookback lists
+    coverage: float | None = None  # Seconds ahead a full sync fetches
+    # Local window filter (item, now, seconds ahead); snapshots are only pruned of
+    # expired items, the requested span is applied to what is returned
+    keep: Callable[[dict, float, float], bool] | None = None
+    sort_key: Callable[[dict], Any] | None = None
+    newest_first: bool = False
+
+    @property
+    def key(self) -> str:
+        return f"{self.path}?{json.dumps(self.params, sort_keys=True)}"
+
+    def arrange(self, items: list[dict], now: float, ahead: float = math.inf) -> list[dict]:
+        if self.keep is not None:
+            items = [item for item in items if self.keep(item, now, ahead)]
+        if self.sort_key is not None:
+            items = sorted(items, key=self.sort_key, reverse=self.newest_first)
+        return items
+
+
+def email_resource(hours: int, window_days: int = 14) -> SyncResource:
+    """Messages received in the last ``hours``, newest first."""
+    field = "received_at"
+
+    def keep(item: dict, now: float, ahead: float) -> bool:
+        received = parse_time(item.get(field))
+        return received is None or received >= now - hours * 3600
+
+    return SyncResource(
+        "/email/recent", "messages", {"hours": hours},
+        keep=keep, sort_key=lambda m: m.get(field) or "", newest_first=True,
+    )
+
+
+def calendar_resource(days: int, window_days: int = 14) -> SyncResource:
+    """Events in the next ``days``.
+
+    Full syncs fetch ``window_days`` ahead (at least ``days``), and every span
+    within that window shares one snapshot. Delta syncs stay valid until the
+    requested span runs past the fetched window, since events entering the
+    window unchanged would not show up in a delta.
+    """
+    window_days = max(window_days, days)
+
+    def keep(item: dict, now: float, ahead: float) -> bool:
+        # Like /calendar/today, today's events stay listed after they have ended
+        today = start_of_day(now)
+        start = parse_time(item.get("start"))
+        end = parse_time(item.get("end")) or start
+        return start is None or (end >= today and start < today + ahead)
+
+    return SyncResource(
+        "/calendar/events", "events", {"days": window_days},
+        ahead=days * 86400, coverage=window_days * 86400,
+        keep=keep, sort_key=lambda e: e.get("start") or "",
+    )
+
+
+def tasks_resource(days: int, window_days: int = 14) -> SyncResource:
+    """Tasks due in the next ``days`` (or undated), windowed like calendar events."""
+    window_days = max(window_days, days)
+
+    def keep(item: dict, now: float, ahead: float) -> bool:
+        due = parse_time(item.get("due"))
+        return due is None or due < now + ahead
+
+    return SyncResource(
+        "/tasks/upcoming", "tasks", {"days": window_days},
+        ahead=days * 86400, coverage=window_days * 86400, keep=keep,
+    )
+
+
+RESOURCES = {"email": email_resource, "calendar": calendar_resource, "tasks": tasks_resource}
+
+
+class SyncStore:
+    """SQLite-backed snapshots and cursors, keyed by scope (automation) and resource."""
+
+    def __init__(self, path: str = ".cache/sync.sqlite", window_days: int = 14):
+        import sqlite3
+
+        self.path = Path(path)
+        self.window_days = window_days
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " scope TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " cursor TEXT,"
+            " covers_until REAL,"
+            " items TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (scope, key))"
+        )
+
+    def load(self, scope: str, key: str) -> Snapshot | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cursor, covers_until, items, updated_at FROM snapshots "
+                "WHERE scope = ? AND key = ?",
+                (scope, key),
+            ).fetchone()
+        if row is None:
+            return None
+        cursor, covers_until, items, updated_at = row
+        return Snapshot(cursor, covers_until, json.loads(items), updated_at)
+
+    def save(self, scope: str, key: str, snapshot: Snapshot) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (scope, key, cursor, covers_until, items, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, key, snapshot.cursor, snapshot.covers_until,
+                 json.dumps(snapshot.items), snapshot.updated_at),
+            )
+            self._conn.commit()
+
+    def reset(self, scope: str | None = None) -> None:
+        """Drop snapshots (all, or one scope's) so the next sync is a full one."""
+        with self._lock:
+            if scope is None:
+                self._conn.execute("DELETE FROM snapshots")
+            else:
+                self._conn.execute("DELETE FROM snapshots WHERE scope = ?", (scope,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_store: SyncStore | None = None
+_store_loaded = False
+_store_lock = threading.Lock()
+
+
+def get_sync_store(config: dict | None = None) -> SyncStore | None:
+    """Return the process-wide snapshot store, or None if disabled in config.yaml."""
+    global _store, _store_loaded
+    if _store_loaded:
+        return _store
+    with _store_lock:
+        if not _store_loaded:
+            if config is None:
+                from .config_loader import load_config
+
+                config = load_config()
+            sync_config = config.get("sync") or {}
+            if sync_config.get("enabled", True):
+                _store = SyncStore(
+                    sync_config.get("path", ".cache/sync.sqlite"),
+                    sync_config.get("window_days", 14),
+                )
+            _store_loaded = True
+        return _store
+
+
+def is_persistent(config: dict) -> bool:
+    """Whether snapshots survive between runs, so windowed sync_* calls pay off.
+
+    ``sync.persistent: auto`` (the default) is false on Cloud Run, where every
+    job execution starts with an empty filesystem and a sync would always be a
+    full fetch of ``window_days``; scripts then use the plain get_* calls.
+    """
+    sync_config = config.get("sync") or {}
+    if not sync_config.get("enabled", True):
+        return False
+    setting = sync_config.get("persistent", "auto")
+    if setting == "auto":
+        return not (os.getenv("CLOUD_RUN_JOB") or os.getenv("K_SERVICE"))
+    return bool(setting)
+
+
+def default_scope() -> str:
+    run = current_run()
+    return run.automation if run is not None else "default"
+
+
+def plan(
+    store: SyncStore | None, scope: str, resource: SyncResource
+) -> tuple[dict, Snapshot | None]:
+    """Request params for the next sync and the snapshot a delta would apply to."""
+    params = dict(resource.params)
+    snapshot = store.load(scope, resource.key) if store is not None else None
+    if snapshot is None or snapshot.cursor is None:
+        return params, None
+    if (
+        snapshot.covers_until is not None
+        and time.time() + (resource.ahead or 0) > snapshot.covers_until
+    ):
+        return params, None
+    params["since"] = snapshot.cursor
+    return params, snapshot
+
+
+def apply(
+    store: SyncStore | None,
+    scope: str,
+    resource: SyncResource,
+    snapshot: Snapshot | None,
+    body: dict,
+) -> dict:
+    """Merge a gateway response into the snapshot, persist it and return the list response."""
+    now = time.time()
+    received = body.get(resource.list_key) or []
+    delta = (
+        snapshot is not None
+        and not body.get("full")
+        and all("id" in item for item in received)
+    )
+    deleted = set(body.get("deleted") or ())
+
+    if delta:
+        merged = {item["id"]: item for item in snapshot.items}
+        for item_id in deleted:
+            merged.pop(item_id, None)
+        for item in received:
+            merged[item["id"]] = item
+        items = list(merged.values())
+        covers_until = snapshot.covers_until
+    else:
+        items = received
+        covers_until = now + resource.coverage if resource.coverage is not None else None
+
+    # Without a cursor or item IDs there is nothing to merge against next time
+    cursor = body.get("cursor")
+    if cursor is not None and not all("id" in item for item in items):
+        cursor = None
+    items = resource.arrange(items, now)
+
+    if store is not None:
+        store.save(scope, resource.key, Snapshot(cursor, covers_until, items, now))
+
+    result = {k: v for k, v in body.items() if k not in ("cursor", "deleted", "full")}
+    result[resource.list_key] = resource.arrange(items, now, resource.ahead or math.inf)
+    result["sync"] = {
+        "mode": "delta" if delta else "full",
+        "changed": len(received),
+        "deleted": len(deleted) if delta else 0,
+    }
+    return result
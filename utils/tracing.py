@@ -0,0 +1,264 @@
+"""Lightweight tracing: nested timed spans exported as JSON lines or OTLP/JSON.
+
+Spans nest through a context variable, so work done inside ``with span(...)``
+(including gateway calls and asyncio tasks started there) is recorded as its
+children. Tracing is off until configure() enables it; disabled spans cost a
+single check.
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def fail(self, error: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            for exporter in _exporters:
+                exporter.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "end": self.end_ns / 1e9 if self.end_ns else None,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def fail(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+_exporters: list = []
+
+
+class JsonlExporter:
+    """Appends each finished span to a JSON lines file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def flush(self) -> None:
+        pass
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: list[Span], service_name: str) -> dict:
+    """Encode spans as an OTLP/JSON ExportTraceServiceRequest."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": service_name}},
+        ]},
+        "scopeSpans": [{
+            "scope": {"name": "automations"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [
+                    {"key": k, "value": _otlp_value(v)}
+                    for k, v in s.attributes.items() if v is not None
+                ],
+                "status": {"code": 2, "message": s.error} if s.status == "error" else {"code": 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+class OtlpExporter:
+    """Buffers spans and POSTs them to an OTLP/HTTP collector when a trace finishes."""
+
+    def __init__(self, endpoint: str, service_name: str = "automations"):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+        if span.parent_id is None:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._spans = self._spans, []
+        if not spans:
+            return
+        import httpx
+
+        try:
+            httpx.post(self.url, json=to_otlp(spans, self.service_name), timeout=5.0)
+        except httpx.HTTPError:
+            pass  # Tracing must never fail a run
+
+
+def configure(config: dict | None = None, enabled: bool | None = None) -> bool:
+    """Set up exporters from the ``tracing`` section of config.yaml; return whether tracing is on.
+
+    Args:
+        config: Loaded configuration
+        enabled: Force tracing on or off regardless of config (e.g. runner.py --profile)
+    """
+    tracing_config = (config or {}).get("tracing") or {}
+    if enabled is None:
+        enabled = tracing_config.get("enabled", False)
+
+    flush()
+    _exporters.clear()
+    if enabled:
+        _exporters.append(JsonlExporter(tracing_config.get("path", ".cache/traces.jsonl")))
+        endpoint = tracing_config.get("otlp_endpoint") or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+        if endpoint:
+            _exporters.append(
+                OtlpExporter(endpoint, tracing_config.get("service_name", "automations"))
+            )
+    return enabled
+
+
+def is_enabled() -> bool:
+    return bool(_exporters)
+
+
+def flush() -> None:
+    for exporter in _exporters:
+        exporter.flush()
+
+
+atexit.register(flush)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def start_span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    """Start a child of the current span without making it current; call end() when done."""
+    if not _exporters:
+        return NOOP_SPAN
+    parent = _current.get()
+    return Span(
+        name=name,
+        trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+        span_id=os.urandom(8).hex(),
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes,
+    )
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """Time a block as a span nested under the current one."""
+    if not _exporters:
+        yield NOOP_SPAN
+        return
+
+    current = start_span(name, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def traced(name: str | None = None):
+    """Decorator recording each call of a sync or async function as a span."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _exporters:
+                    return await func(*args, **kwargs)
+                with span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _exporters:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator